@@ -1,10 +1,11 @@
 """
 FastAPI приложение GreMuiv
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from backend.config import setup_cors
-from backend.routes import groups, subjects, students, grades, stats, student
+from backend.routes import groups, subjects, students, grades, stats, student, ingest
 from backend.utils.auth import init_auth
+from ingest_events import check_generation, known_generation
 
 # Создаем FastAPI приложение
 app = FastAPI(
@@ -41,6 +42,18 @@ except Exception as e:
     # На Vercel это нормально - инициализация произойдет при первом запросе
     pass
 
+# После нового парсинга сбрасываем кэши этого процесса (воркера uvicorn):
+# парсер меняет файл-метку поколения, проверка - один os.stat() на запрос
+@app.middleware("http")
+async def ingest_generation_middleware(request: Request, call_next):
+    check_generation()
+    response = await call_next(request)
+    generation = known_generation()
+    if generation is not None:
+        response.headers["X-Data-Generation"] = str(generation)
+    return response
+
+
 # Подключаем роуты
 app.include_router(groups.router)
 app.include_router(subjects.router)
@@ -48,6 +61,7 @@ app.include_router(students.router)
 app.include_router(grades.router)
 app.include_router(stats.router)
 app.include_router(student.router)
+app.include_router(ingest.router)
 
 
 @app.get("/")
@@ -72,10 +86,13 @@ async def root():
             "groups": "/api/groups",
             "subjects": "/api/subjects",
             "students": "/api/students",
+            "students_search": "/api/students/search?q=",
             "grades": "/api/grades",
             "stats": "/api/stats",
             "rating_absences": "/api/stats/rating/absences",
-            "rating_grades": "/api/stats/rating/grades"
+            "rating_grades": "/api/stats/rating/grades",
+            "ingest_status": "/api/ingest/status",
+            "ingest_run": "/api/ingest/run (POST)"
         },
         "note": "Все эндпоинты (кроме / и /api/token) требуют токен доступа в заголовке Authorization: Bearer <token>"
     }
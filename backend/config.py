@@ -72,6 +72,14 @@ CORS_ORIGINS.append("https://*.fly.dev")
 SERVER_HOST = os.getenv("HOST", "0.0.0.0")
 SERVER_PORT = int(os.getenv("PORT", 5000))
 
+# Режим запуска start.py: "threads" - парсер и бот в потоках рядом с API,
+# "processes" - парсер, API и бот в отдельных процессах (process_supervisor.py)
+START_MODE = os.getenv("START_MODE", "threads")
+
+# Количество воркеров uvicorn (процессов API); кэши воркеров сбрасываются
+# после парсинга по файлу-метке поколения (parsing/ingest_events.py)
+API_WORKERS = max(1, int(os.getenv("API_WORKERS", "1")))
+
 def setup_cors(app):
     """Настройка CORS для приложения"""
     # Получаем список разрешенных доменов
@@ -14,6 +14,7 @@ if parsing_path_str not in sys.path:
     sys.path.insert(0, parsing_path_str)
 
 from database import get_db, Student, Grade
+from read_model import get_snapshot
 from backend.utils.helpers import date_to_str
 from backend.utils.auth import verify_token
 from typing import Optional
@@ -52,6 +53,11 @@ async def get_grades(subject_id: int, group_id: Optional[int] = None, token: str
         HTTPException 404: Если предмет не найден или группа не совпадает
         HTTPException 500: При ошибке базы данных
     """
+    # Снимок данных после парсинга (read_model.py) - без обращения к БД
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return _get_grades_from_snapshot(snapshot, subject_id, group_id)
+    
     db: Session = get_db()
     try:
         from database import Group, Subject
@@ -152,3 +158,31 @@ async def get_grades(subject_id: int, group_id: Optional[int] = None, token: str
         raise HTTPException(status_code=500, detail=f"Ошибка при получении данных: {str(e)}")
     finally:
         db.close()
+
+
+def _get_grades_from_snapshot(snapshot, subject_id: int, group_id: Optional[int]):
+    """Журнал предмета из снимка данных (те же проверки, что и для БД)"""
+    subject = snapshot.subject_info(subject_id)
+    if subject is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Предмет с ID {subject_id} не найден"
+        )
+    
+    if group_id is None:
+        group_id = subject["group_id"]
+    
+    if group_id != subject["group_id"]:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Предмет с ID {subject_id} не принадлежит группе {group_id}. Предмет принадлежит группе {subject['group_id']}"
+        )
+    
+    group = snapshot.group_by_id.get(group_id)
+    if group is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Группа с ID {group_id} не найдена"
+        )
+    
+    return snapshot.journal(group, snapshot.subject_by_id[subject_id])
@@ -16,6 +16,7 @@ if parsing_path_str not in sys.path:
 
 # Теперь импортируем из parsing
 from database import get_db, Group
+from read_model import get_snapshot
 from backend.utils.auth import verify_token
 
 router = APIRouter(prefix="/api/groups", tags=["groups"])
@@ -29,6 +30,11 @@ async def get_groups(token: str = Depends(verify_token)):
     Returns:
         List[dict]: Список групп с id и name
     """
+    # Снимок данных после парсинга (read_model.py) - без обращения к БД
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.group_list()
+    
     db: Session = get_db()
     try:
         # Используем параметризованные запросы SQLAlchemy для защиты от SQL инъекций
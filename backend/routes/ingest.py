@@ -0,0 +1,67 @@
+"""
+Роуты для управления парсингом (загрузкой журналов)
+
+Парсинг выполняет JobRunner процесса парсера (parsing/job_runner.py):
+состояние читается из файла INGEST_STATE_FILE, запрос запуска
+записывается в INGEST_TRIGGER_FILE - API и парсер могут работать
+в разных процессах
+"""
+from fastapi import APIRouter, HTTPException, Depends
+import sys
+from pathlib import Path
+
+# Добавляем путь к parsing для импорта (ВАЖНО: в начало списка!)
+project_root = Path(__file__).parent.parent.parent
+parsing_path = project_root / "parsing"
+parsing_path_str = str(parsing_path)
+if parsing_path_str not in sys.path:
+    sys.path.insert(0, parsing_path_str)
+
+from job_runner import read_state, request_run
+from backend.utils.auth import verify_token
+
+router = APIRouter(prefix="/api/ingest", tags=["ingest"])
+
+
+@router.get("/status")
+async def get_ingest_status(token: str = Depends(verify_token)):
+    """
+    Получить состояние парсинга
+
+    Returns:
+        dict: {
+            "running": False,         # выполняется ли парсинг
+            "current": None,          # текущий запуск (причины, начало)
+            "pending": None,          # ожидающий запрос запуска
+            "last_run": {...},        # прошлый запуск: начало, конец, длительность, статус
+            "next_run": "2026-10-19T15:00:00",  # следующий запуск по расписанию
+            "interval_seconds": 3600,
+            "runs": 3
+        }
+        Если парсер еще не запускался - {"running": False, "last_run": None, "next_run": None}
+    """
+    try:
+        state = read_state()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if state is None:
+        return {"running": False, "last_run": None, "next_run": None}
+    return state
+
+
+@router.post("/run", status_code=202)
+async def run_ingest(token: str = Depends(verify_token)):
+    """
+    Запустить парсинг вне расписания
+
+    Парсинг начнется сразу (или сразу после текущего запуска); повторные
+    запросы до начала запуска объединяются в один
+
+    Returns:
+        dict: {"accepted": True, "request": {"reasons": [...], "triggers": N}}
+    """
+    try:
+        request = request_run("api")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"accepted": True, "request": request}
@@ -16,6 +16,8 @@ if parsing_path_str not in sys.path:
     sys.path.insert(0, parsing_path_str)
 
 from database import get_db, Student, Grade, Group
+from read_model import get_snapshot
+from analytics import get_analytics
 from backend.utils.auth import verify_token
 
 router = APIRouter(prefix="/api/stats", tags=["stats"])
@@ -62,6 +64,11 @@ async def get_stats(group_id: int, subject_id: int, token: str = Depends(verify_
             ...
         ]
     """
+    # Массивы NumPy по снимку данных (analytics.py) - без обращения к БД
+    analytics = get_analytics()
+    if analytics is not None:
+        return analytics.subject_stats(group_id, subject_id)
+    
     db: Session = get_db()
     try:
         students = db.query(Student).filter(
@@ -121,6 +128,16 @@ async def get_absences_rating(
         HTTPException 422: Если group_id невалиден (не положительное число)
         HTTPException 500: При ошибке базы данных
     """
+    # Снимок данных после парсинга: массивы NumPy (analytics.py), без NumPy -
+    # данные снимка (read_model.py); без обращения к БД
+    analytics = get_analytics()
+    if analytics is not None:
+        group = _snapshot_group(analytics.snapshot, group_id)
+        return [AbsenceRatingItem(**item) for item in analytics.absence_rating(group)]
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return _absences_rating_from_snapshot(snapshot, group_id)
+    
     db: Session = get_db()
     try:
         # Проверяем существование группы
@@ -230,6 +247,16 @@ async def get_grades_rating(
         HTTPException 422: Если group_id невалиден (не положительное число)
         HTTPException 500: При ошибке базы данных
     """
+    # Снимок данных после парсинга: массивы NumPy (analytics.py), без NumPy -
+    # данные снимка (read_model.py); без обращения к БД
+    analytics = get_analytics()
+    if analytics is not None:
+        group = _snapshot_group(analytics.snapshot, group_id)
+        return [GradeRatingItem(**item) for item in analytics.grade_rating(group)]
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return _grades_rating_from_snapshot(snapshot, group_id)
+    
     db: Session = get_db()
     try:
         # Проверяем существование группы
@@ -333,3 +360,90 @@ async def get_grades_rating(
         raise HTTPException(status_code=500, detail=f"Ошибка при получении рейтинга: {str(e)}")
     finally:
         db.close()
+
+
+# --- Рейтинги из снимка данных (read_model.py), если NumPy не установлен ---
+
+def _is_absence(value: str) -> bool:
+    """Пропуск: пустое значение, 'пропуск', 'н', 'н/я', 'неявка'"""
+    if not value:
+        return True
+    value_lower = value.strip().lower()
+    return 'пропуск' in value_lower or value_lower in ['н', 'н/я', 'неявка']
+
+
+def _numeric_grade(value: str):
+    """Числовая оценка от 2 до 5 или None"""
+    if _is_absence(value):
+        return None
+    try:
+        grade_num = float(value.strip())
+    except ValueError:
+        return None
+    return grade_num if 2 <= grade_num <= 5 else None
+
+
+def _snapshot_group(snapshot, group_id: int):
+    group = snapshot.group_by_id.get(group_id)
+    if group is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Группа с ID {group_id} не найдена"
+        )
+    return group
+
+
+def _absences_rating_from_snapshot(snapshot, group_id: int) -> List[AbsenceRatingItem]:
+    """Рейтинг по пропускам из снимка (как из БД)"""
+    group = _snapshot_group(snapshot, group_id)
+    # Значения оценок в снимке - индексы общей таблицы строк: каждое
+    # значение проверяется один раз
+    absence_values = {}
+    rating = []
+    for student_info, grades in snapshot.group_grade_rows(group):
+        absences = 0
+        for _, _, value in grades:
+            is_absence = absence_values.get(value)
+            if is_absence is None:
+                is_absence = absence_values[value] = _is_absence(snapshot.string(value))
+            absences += is_absence
+        rating.append({
+            "id": student_info["id"],
+            "fio": student_info["fio"],
+            "absences": absences
+        })
+    
+    rating.sort(key=lambda x: (x["absences"], x["fio"]))
+    for i, item in enumerate(rating):
+        item["position"] = i + 1
+    return [AbsenceRatingItem(**item) for item in rating]
+
+
+def _grades_rating_from_snapshot(snapshot, group_id: int) -> List[GradeRatingItem]:
+    """Рейтинг по среднему баллу из снимка (как из БД)"""
+    group = _snapshot_group(snapshot, group_id)
+    numeric_values = {}
+    rating = []
+    for student_info, grades in snapshot.group_grade_rows(group):
+        # Уникальность по дате, предмету и оценке - как для БД
+        numeric_grades_set = set()
+        for subject, date_index, value in grades:
+            if value not in numeric_values:
+                numeric_values[value] = _numeric_grade(snapshot.string(value))
+            grade_num = numeric_values[value]
+            if grade_num is not None:
+                numeric_grades_set.add((date_index, subject, grade_num))
+        
+        numeric_grades = [g[2] for g in numeric_grades_set]
+        average_grade = sum(numeric_grades) / len(numeric_grades) if numeric_grades else 0.0
+        rating.append({
+            "id": student_info["id"],
+            "fio": student_info["fio"],
+            "average_grade": round(average_grade, 2),
+            "total_grades": len(numeric_grades)
+        })
+    
+    rating.sort(key=lambda x: (-x["average_grade"], -x["total_grades"], x["fio"]))
+    for i, item in enumerate(rating):
+        item["position"] = i + 1
+    return [GradeRatingItem(**item) for item in rating]
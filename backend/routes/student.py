@@ -16,6 +16,10 @@ if parsing_path_str not in sys.path:
     sys.path.insert(0, parsing_path_str)
 
 from database import get_db, Student, Subject, Grade, Group, TelegramUser
+from roster_index import get_roster_index
+from read_model import get_snapshot
+from analytics import get_analytics
+from fio_normalizer import normalize_fio_to_initials
 from backend.utils.helpers import date_to_str
 from backend.utils.auth import verify_token
 from backend.utils.telegram_auth import verify_telegram_user
@@ -55,16 +59,16 @@ def find_student_by_fio(db: Session, fio: str) -> Student:
         # Ищем по началу ФИО (фамилия и имя)
         parts = fio_normalized.split()
         if len(parts) >= 2:
-            # Пробуем найти по фамилии и инициалам (если в базе "Фамилия И.О.", а ищут "Фамилия Имя Отчество")
-            # Извлекаем фамилию и первую букву имени
-            surname = parts[0]
-            first_name_initial = parts[1][0].upper() if parts[1] else ''
+            # Если в базе "Фамилия И.О.", а ищут "Фамилия Имя Отчество" - нормализуем так же, как парсер
+            fio_initials = normalize_fio_to_initials(fio_normalized)
+            student = db.query(Student).filter(Student.fio == fio_initials).first()
             
             # Ищем по паттерну "Фамилия И.%"
-            search_pattern = f"{surname} {first_name_initial}%"
-            student = db.query(Student).filter(
-                func.lower(Student.fio).like(search_pattern.lower())
-            ).first()
+            if not student:
+                search_pattern = f"{fio_initials.split()[0]} {fio_initials.split()[1][0]}%"
+                student = db.query(Student).filter(
+                    func.lower(Student.fio).like(search_pattern.lower())
+                ).first()
             
             # Если не найдено, пробуем просто по фамилии и началу имени
             if not student:
@@ -74,25 +78,22 @@ def find_student_by_fio(db: Session, fio: str) -> Student:
                 ).first()
     
     if not student:
-        # Пробуем найти похожие ФИО для подсказки
-        parts = fio_normalized.split()
-        search_term = parts[0] if parts else fio_normalized
-        
-        # Ищем похожие ФИО
-        similar = db.query(Student).filter(
-            func.lower(Student.fio).like(f"%{search_term.lower()}%")
-        ).limit(10).all()
+        # Ищем похожие ФИО для подсказки по индексу в памяти (с учетом опечаток)
+        similar = get_roster_index(db).search(fio_normalized, limit=10)
         
         # Также получаем несколько случайных студентов для примера
         all_students = db.query(Student).limit(20).all()
         
-        similar_names = [s.fio for s in similar]
+        similar_names = []
+        for item in similar:
+            if item["fio"] not in similar_names:
+                similar_names.append(item["fio"])
         example_names = [s.fio for s in all_students[:5] if s.fio not in similar_names]
         
         error_detail = f"Студент с ФИО '{fio}' не найден в базе данных."
         
         if similar_names:
-            error_detail += f"\n\nПохожие ФИО (начинаются с '{search_term}'):\n" + "\n".join([f"  • {name}" for name in similar_names[:5]])
+            error_detail += f"\n\nПохожие ФИО:\n" + "\n".join([f"  • {name}" for name in similar_names[:5]])
         
         if example_names:
             error_detail += f"\n\nПримеры ФИО из базы данных:\n" + "\n".join([f"  • {name}" for name in example_names[:5]])
@@ -105,6 +106,16 @@ def find_student_by_fio(db: Session, fio: str) -> Student:
     return student
 
 
+def find_snapshot_student(snapshot, fio: str) -> Optional[int]:
+    """
+    Студент в снимке данных (read_model.py) по точному совпадению ФИО
+    после нормализации пробелов - индекс снимка или None (тогда поиск по БД)
+    """
+    if snapshot is None:
+        return None
+    return snapshot.find_student(' '.join(fio.strip().split()))
+
+
 @router.get("/by-fio")
 async def get_student_by_fio(
     fio: str = Query(..., description="ФИО студента"),
@@ -116,6 +127,12 @@ async def get_student_by_fio(
     Returns:
         dict: Информация о студенте с группами
     """
+    # Точное совпадение ФИО - из снимка данных (read_model.py), без БД
+    snapshot = get_snapshot()
+    student_index = find_snapshot_student(snapshot, fio)
+    if student_index is not None:
+        return snapshot.student_info(student_index)
+    
     db: Session = get_db()
     try:
         # Используем вспомогательную функцию для поиска
@@ -149,6 +166,12 @@ async def get_student_subjects(
     Returns:
         List[dict]: Список предметов с основной статистикой
     """
+    # Массивы NumPy по снимку данных (analytics.py) - без обращения к БД
+    analytics = get_analytics()
+    student_index = find_snapshot_student(analytics and analytics.snapshot, fio)
+    if student_index is not None:
+        return analytics.student_subjects(student_index)
+    
     db: Session = get_db()
     try:
         # Используем вспомогательную функцию для поиска
@@ -267,6 +290,12 @@ async def get_student_grades_by_subject(
             }
         }
     """
+    # Точное совпадение ФИО - из снимка данных (read_model.py), без БД
+    snapshot = get_snapshot()
+    student_index = find_snapshot_student(snapshot, fio)
+    if student_index is not None:
+        return _student_grades_from_snapshot(snapshot, student_index, subject_id)
+    
     db: Session = get_db()
     try:
         # Используем вспомогательную функцию для поиска
@@ -338,6 +367,46 @@ async def get_student_grades_by_subject(
         db.close()
 
 
+def _student_grades_from_snapshot(snapshot, student_index: int, subject_id: int):
+    """Оценки студента по предмету из снимка (как из БД)"""
+    student = snapshot.student_info(student_index)
+    subject = snapshot.subject_info(subject_id)
+    if subject is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"Предмет с ID {subject_id} не найден"
+        )
+    if subject["group_id"] != student["group_id"]:
+        raise HTTPException(
+            status_code=400,
+            detail="Предмет не принадлежит группе студента"
+        )
+    
+    grades_list = []
+    calendar_data = {}
+    for _, date_index, value in snapshot.student_grades(student_index, snapshot.subject_by_id[subject_id]):
+        grade_date = snapshot.date(date_index)
+        date_str = snapshot.date_str(date_index)
+        value_str = snapshot.string(value)
+        grades_list.append({"date": date_str, "value": value_str})
+        calendar_data.setdefault(grade_date.strftime("%Y-%m"), []).append({
+            "date": date_str,
+            "value": value_str,
+            "day": grade_date.day
+        })
+    
+    return {
+        "subject": subject,
+        "student": {
+            "id": student["id"],
+            "fio": student["fio"],
+            "group_id": student["group_id"]
+        },
+        "grades": grades_list,
+        "calendar": calendar_data
+    }
+
+
 @router.get("/stats")
 async def get_student_overall_stats(
     fio: str = Query(..., description="ФИО студента"),
@@ -349,6 +418,20 @@ async def get_student_overall_stats(
     Returns:
         dict: Общая статистика
     """
+    # Массивы NumPy по снимку данных (analytics.py) - без обращения к БД
+    analytics = get_analytics()
+    student_index = find_snapshot_student(analytics and analytics.snapshot, fio)
+    if student_index is not None:
+        student = analytics.snapshot.student_info(student_index)
+        return {
+            "student": {
+                "id": student["id"],
+                "fio": student["fio"],
+                "group_id": student["group_id"]
+            },
+            "stats": analytics.student_stats(student_index)
+        }
+    
     db: Session = get_db()
     try:
         # Используем вспомогательную функцию для поиска
@@ -449,6 +532,14 @@ async def get_subjects_ratings(
             ...
         ]
     """
+    # Массивы NumPy по снимку данных (analytics.py) - без обращения к БД
+    analytics = get_analytics()
+    student_index = find_snapshot_student(analytics and analytics.snapshot, fio)
+    if student_index is not None:
+        subjects_ratings = analytics.subjects_ratings(student_index)
+        add_overall_ratings(subjects_ratings)
+        return subjects_ratings
+    
     db: Session = get_db()
     try:
         # Находим студента
@@ -535,8 +626,9 @@ async def get_subjects_ratings(
             )
             
             # Добавляем позиции в рейтинге по оценкам - каждому студенту уникальное место (без повторений)
+            # (свой ключ: словари общие с рейтингом по посещаемости)
             for i, item in enumerate(grades_rating):
-                item["position"] = i + 1
+                item["grades_position"] = i + 1
             
             # Сортируем студентов по посещаемости (от большего к меньшему)
             attendance_rating = sorted(
@@ -546,7 +638,7 @@ async def get_subjects_ratings(
             
             # Добавляем позиции в рейтинге по посещаемости - каждому студенту уникальное место (без повторений)
             for i, item in enumerate(attendance_rating):
-                item["position"] = i + 1
+                item["attendance_position"] = i + 1
             
             # Находим позицию текущего студента (используем данные из student_stats по fio_key)
             student_stats_data = student_stats.get(student_fio_key)
@@ -563,46 +655,20 @@ async def get_subjects_ratings(
                 "name": str(subject.name),
                 "ratings": {
                     "by_grades": {
-                        "position": student_grades_data["position"] if student_grades_data else None,
+                        "position": student_grades_data["grades_position"] if student_grades_data else None,
                         "total_students": len(grades_rating),
                         "average_grade": student_grades_data["average_grade"] if student_grades_data else 0.0
                     },
                     "by_attendance": {
-                        "position": student_attendance_data["position"] if student_attendance_data else None,
+                        "position": student_attendance_data["attendance_position"] if student_attendance_data else None,
                         "total_students": len(attendance_rating),
                         "attendance": student_attendance_data["attendance"] if student_attendance_data else 0.0
                     }
                 }
             })
         
-        # Вычисляем общий рейтинг среди всех предметов
-        # Для этого вычисляем среднюю позицию по оценкам и посещаемости для каждого предмета
-        # и сортируем предметы по этой средней позиции
-        
-        # Сначала вычисляем среднюю позицию для каждого предмета
-        for subject_rating in subjects_ratings:
-            grades_pos = subject_rating["ratings"]["by_grades"]["position"]
-            attendance_pos = subject_rating["ratings"]["by_attendance"]["position"]
-            
-            # Если позиция None (нет данных), используем максимальное значение
-            if grades_pos is None:
-                grades_pos = subject_rating["ratings"]["by_grades"]["total_students"] + 1
-            if attendance_pos is None:
-                attendance_pos = subject_rating["ratings"]["by_attendance"]["total_students"] + 1
-            
-            # Средняя позиция (чем меньше, тем лучше)
-            avg_position = (grades_pos + attendance_pos) / 2
-            subject_rating["ratings"]["overall"] = {
-                "average_position": round(avg_position, 1)
-            }
-        
-        # Сортируем предметы по средней позиции (от меньшего к большему)
-        subjects_ratings.sort(key=lambda x: x["ratings"]["overall"]["average_position"])
-        
-        # Добавляем общий рейтинг (позицию среди всех предметов) - каждому предмету уникальное место (без повторений)
-        for i, subject_rating in enumerate(subjects_ratings):
-            subject_rating["ratings"]["overall"]["position"] = i + 1
-            subject_rating["ratings"]["overall"]["total_subjects"] = len(subjects_ratings)
+        # Общий рейтинг среди всех предметов
+        add_overall_ratings(subjects_ratings)
         
         return subjects_ratings
         
@@ -614,6 +680,37 @@ async def get_subjects_ratings(
         db.close()
 
 
+def add_overall_ratings(subjects_ratings: List[dict]):
+    """
+    Общий рейтинг среди всех предметов (ratings.overall): предметы
+    сортируются по средней позиции в рейтингах по оценкам и посещаемости
+    """
+    # Сначала вычисляем среднюю позицию для каждого предмета
+    for subject_rating in subjects_ratings:
+        grades_pos = subject_rating["ratings"]["by_grades"]["position"]
+        attendance_pos = subject_rating["ratings"]["by_attendance"]["position"]
+        
+        # Если позиция None (нет данных), используем максимальное значение
+        if grades_pos is None:
+            grades_pos = subject_rating["ratings"]["by_grades"]["total_students"] + 1
+        if attendance_pos is None:
+            attendance_pos = subject_rating["ratings"]["by_attendance"]["total_students"] + 1
+        
+        # Средняя позиция (чем меньше, тем лучше)
+        avg_position = (grades_pos + attendance_pos) / 2
+        subject_rating["ratings"]["overall"] = {
+            "average_position": round(avg_position, 1)
+        }
+    
+    # Сортируем предметы по средней позиции (от меньшего к большему)
+    subjects_ratings.sort(key=lambda x: x["ratings"]["overall"]["average_position"])
+    
+    # Добавляем общий рейтинг (позицию среди всех предметов) - каждому предмету уникальное место (без повторений)
+    for i, subject_rating in enumerate(subjects_ratings):
+        subject_rating["ratings"]["overall"]["position"] = i + 1
+        subject_rating["ratings"]["overall"]["total_subjects"] = len(subjects_ratings)
+
+
 @router.get("/fio-by-telegram-id")
 async def get_fio_by_telegram_id(
     telegram_user: dict = Depends(verify_telegram_user)
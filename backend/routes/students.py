@@ -1,7 +1,7 @@
 """
 Роуты для работы со студентами
 """
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 from typing import Optional
 import sys
@@ -15,6 +15,7 @@ if parsing_path_str not in sys.path:
     sys.path.insert(0, parsing_path_str)
 
 from database import get_db, Student
+from roster_index import get_roster_index
 from backend.utils.auth import verify_token
 
 router = APIRouter(prefix="/api/students", tags=["students"])
@@ -50,3 +51,39 @@ async def get_students(group_id: Optional[int] = None, token: str = Depends(veri
         raise HTTPException(status_code=500, detail="Ошибка при получении данных")
     finally:
         db.close()
+
+
+@router.get("/search")
+async def search_students(
+    q: str = Query(..., min_length=1, max_length=100, description="ФИО или его начало (допускаются опечатки)"),
+    limit: int = Query(10, ge=1, le=50, description="Максимальное количество результатов"),
+    group_id: Optional[int] = Query(None, gt=0, description="Опциональный ID группы для фильтрации"),
+    token: str = Depends(verify_token)
+):
+    """
+    Поиск студентов по ФИО для автодополнения и подсказок "возможно, вы имели в виду"
+    
+    Поиск идет по индексу в памяти (перестраивается после каждого парсинга):
+    - точное совпадение ФИО (полное ФИО приводится к формату "Фамилия И.О.")
+    - ФИО начинается с запроса
+    - фамилия с опечатками (1 опечатка для коротких фамилий, до 2 для длинных)
+    
+    Returns:
+        List[dict]: Найденные студенты, лучшие совпадения первыми:
+        [
+            {
+                "id": 1,
+                "fio": "Иванов И.И.",
+                "group_id": 1,
+                "group_name": "23-09.1",
+                "match": "exact" | "prefix" | "fuzzy",
+                "distance": 0
+            },
+            ...
+        ]
+    """
+    try:
+        index = get_roster_index()
+        return index.search(q, limit=limit, group_id=group_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail="Ошибка при поиске студентов")
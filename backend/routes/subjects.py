@@ -15,6 +15,7 @@ if parsing_path_str not in sys.path:
     sys.path.insert(0, parsing_path_str)
 
 from database import get_db, Subject
+from read_model import get_snapshot
 from backend.utils.auth import verify_token
 
 router = APIRouter(prefix="/api/subjects", tags=["subjects"])
@@ -31,6 +32,11 @@ async def get_subjects(group_id: Optional[int] = None, token: str = Depends(veri
     Returns:
         List[dict]: Список предметов с id, name и group_id
     """
+    # Снимок данных после парсинга (read_model.py) - без обращения к БД
+    snapshot = get_snapshot()
+    if snapshot is not None:
+        return snapshot.subject_list(group_id)
+    
     db: Session = get_db()
     try:
         query = db.query(Subject)
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """
 Запуск всего приложения: парсер + API сервер + Telegram бот
+
+START_MODE=processes - парсер, API и бот в отдельных процессах
+(process_supervisor.py), иначе - парсер и бот в потоках
 """
 import sys
 import time
@@ -12,7 +15,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from backend.config import SERVER_HOST, SERVER_PORT
+from backend.config import SERVER_HOST, SERVER_PORT, START_MODE, API_WORKERS
 
 # Импортируем систему логирования
 parsing_path = project_root / "parsing"
@@ -21,8 +24,8 @@ if str(parsing_path) not in sys.path:
 from logger import log_backend_info, log_backend_error
 
 
-def run_parser():
-    """Запуск парсера в отдельном потоке"""
+def run_parser(channel=None):
+    """Запуск парсера в отдельном потоке (channel - канал к супервизору процессов)"""
     try:
         # Добавляем папку parsing в путь
         parsing_path = project_root / "parsing"
@@ -30,6 +33,9 @@ def run_parser():
             sys.path.insert(0, str(parsing_path))
         
         from main import main
+        if channel is not None:
+            channel.forward_events()
+            channel.listen()
         print("📊 Парсер запущен, обновление каждые 15 минут...")
         log_backend_info(
             "Парсер запущен",
@@ -47,11 +53,14 @@ def run_parser():
         traceback.print_exc()
 
 
-def run_backend():
-    """Запуск FastAPI бэкенда"""
+def run_backend(channel=None):
+    """Запуск FastAPI бэкенда (channel - канал к супервизору процессов)"""
     import uvicorn
     import signal
     
+    if channel is not None:
+        channel.listen()
+    
     def signal_handler(sig, frame):
         """Обработчик сигнала для корректного завершения"""
         print("\n🛑 Получен сигнал остановки сервера...")
@@ -66,16 +75,22 @@ def run_backend():
     signal.signal(signal.SIGTERM, signal_handler)
     
     try:
+        if API_WORKERS > 1:
+            # Токен создается до запуска воркеров - иначе каждый создал бы свой
+            from backend.utils.auth import init_auth
+            init_auth()
+        
         log_backend_info(
             f"Запуск API сервера",
-            f"Сервер запускается на {SERVER_HOST}:{SERVER_PORT}"
+            f"Сервер запускается на {SERVER_HOST}:{SERVER_PORT}, воркеров: {API_WORKERS}"
         )
         uvicorn.run(
             "backend.app:app",
             host=SERVER_HOST,
             port=SERVER_PORT,
             reload=False,
-            log_level="info"
+            log_level="info",
+            workers=API_WORKERS
         )
     except KeyboardInterrupt:
         # Корректное завершение при Ctrl+C
@@ -95,9 +110,12 @@ def run_backend():
         traceback.print_exc()
 
 
-def run_telegram_bot():
-    """Запуск Telegram бота в отдельном потоке с собственным event loop"""
+def run_telegram_bot(channel=None):
+    """Запуск Telegram бота в отдельном потоке с собственным event loop (channel - канал к супервизору процессов)"""
     try:
+        if channel is not None:
+            channel.listen()
+        
         # Проверяем наличие токена перед запуском
         telegram_path = project_root / "telegram"
         if str(telegram_path) not in sys.path:
@@ -327,6 +345,17 @@ if __name__ == "__main__":
         "База данных инициализирована, все таблицы созданы"
     )
     
+    if START_MODE == "processes":
+        # Парсер, API и бот - отдельные процессы
+        from process_supervisor import ProcessSupervisor
+        from telegram.config import BOT_TOKEN
+        
+        roles = {"parser": run_parser, "api": run_backend}
+        if BOT_TOKEN and BOT_TOKEN != "вставьте_свой_токен_сюда":
+            roles["bot"] = run_telegram_bot
+        ProcessSupervisor(roles).run()
+        sys.exit(0)
+    
     # Запускаем парсер в отдельном потоке (daemon=True - не блокирует завершение)
     parser_thread = Thread(target=run_parser, daemon=True, name="ParserThread")
     parser_thread.start()
@@ -45,8 +45,12 @@ def save_tokens(tokens: dict):
     """Сохраняет токены в файл"""
     try:
         TOKEN_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(TOKEN_FILE, 'w', encoding='utf-8') as f:
+        # Через временный файл: несколько воркеров API читают файл одновременно
+        # и не должны увидеть его недописанным
+        tmp_file = TOKEN_FILE.with_name(f"{TOKEN_FILE.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(tokens, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, TOKEN_FILE)
     except Exception as e:
         # На Vercel может быть проблема с записью - логируем, но не падаем
         print(f"Warning: Could not save tokens: {e}")
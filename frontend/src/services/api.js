@@ -113,6 +113,9 @@ export const subjectsApi = {
 export const studentsApi = {
   getByGroup: (groupId) => 
     api.get('/students', { params: { group_id: groupId } }).then(res => res.data),
+  
+  search: (query, limit = 10) =>
+    api.get('/students/search', { params: { q: query, limit } }).then(res => res.data),
 }
 
 export const gradesApi = {
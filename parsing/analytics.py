@@ -0,0 +1,417 @@
+"""
+АНАЛИТИКА ОЦЕНОК (NumPy)
+========================
+
+Статистика и рейтинги API (/api/stats*, /api/student/*) считались циклами
+Python по объектам Grade на каждый запрос. Analytics строит по снимку данных
+(read_model.py) выровненные массивы NumPy - по элементу на оценку:
+
+    student  - индекс студента в снимке
+    subject  - индекс предмета
+    ordinal  - дата (date.toordinal())
+    score    - числовая оценка 2..5 (NaN - не оценка)
+    absent   - пропуск
+
+Индексы, даты и значения читаются из отображенного в память файла снимка
+без копирования (np.frombuffer). Значения оценок хранятся в таблице строк
+снимка, поэтому каждое различное значение разбирается один раз, а массивы
+флагов получаются индексированием. Статистика студентов и предметов группы
+считается сгруппированными суммами (np.bincount), рейтинги - сортировкой
+(np.lexsort); оценки группы и студента лежат в массивах подряд
+(np.searchsorted).
+
+Массивы строятся один раз для каждого снимка - после каждого парсинга,
+изменившего данные (событие ingest_finished или первый запрос к новому
+снимку). NumPy указан в requirements.txt; если он все же не установлен
+или снимка нет, get_analytics() возвращает None и API считает статистику
+как раньше.
+
+Правила подсчета (что считать пропуском, какие оценки учитывать) у разных
+роутов исторически немного различаются - здесь они повторены как есть,
+чтобы ответы не зависели от того, откуда посчитаны данные.
+"""
+
+import threading
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy API считает статистику как раньше
+    np = None
+
+from ingest_events import INGEST_FINISHED, subscribe
+from read_model import (
+    get_snapshot,
+    G_ID, G_SUBJECT_START, G_SUBJECT_COUNT,
+    S_ID, S_FIO, S_GROUP, SUB_ID, SUB_NAME,
+    R_STUDENT, R_SUBJECT, R_DATE, R_VALUE,
+)
+
+# Значения, которые считаются пропуском
+ABSENCE_VALUES = ['н', 'н/я', 'неявка']
+# Пропуски для статистики студента (/api/student/*)
+STUDENT_ABSENCE_VALUES = ['пропуск', 'н', 'н/я']
+
+
+def _score(value):
+    """Числовая оценка 2..5 или None"""
+    text = value.strip()
+    if not text or text.lower() in ABSENCE_VALUES or 'пропуск' in text.lower():
+        return None
+    try:
+        score = float(text)
+    except ValueError:
+        return None
+    return score if 2 <= score <= 5 else None
+
+
+def _classify(value):
+    """
+    Флаги значения оценки:
+    (оценка, пропуск для /api/stats, пропуск для рейтинга,
+     присутствие и пропуск для /api/student/*)
+    """
+    lower = value.lower()
+    stripped = value.strip().lower()
+    score = _score(value)
+    return (
+        score if score is not None else np.nan,
+        'пропуск' in lower or lower in ABSENCE_VALUES,
+        not value or 'пропуск' in stripped or stripped in ABSENCE_VALUES,
+        bool(value.strip()) and lower not in STUDENT_ABSENCE_VALUES,
+        bool(value) and (lower in STUDENT_ABSENCE_VALUES or not value.strip()),
+    )
+
+
+def _round(values, digits):
+    """Округление значений ответа API (до digits знаков после запятой)"""
+    return np.round(np.asarray(values, dtype=np.float64), digits)
+
+
+class Analytics:
+    """Массивы оценок одного снимка и запросы статистики"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        grades = np.frombuffer(snapshot.grades, dtype=np.uint32).reshape(-1, 4)
+        students = np.frombuffer(snapshot.students, dtype=np.uint32).reshape(-1, 5)
+        ordinals = np.frombuffer(snapshot.dates, dtype=np.uint32)
+
+        self.student = grades[:, R_STUDENT]
+        self.subject = grades[:, R_SUBJECT]
+        self.date = grades[:, R_DATE]
+        self.ordinal = ordinals[self.date]
+        self.subject_count = len(snapshot.subjects) // 3
+        self.date_count = len(ordinals)
+        # День месяца каждой даты (итоговая оценка - 10 число)
+        day_of_month = np.array([snapshot.date(i).day for i in range(len(ordinals))], dtype=np.uint8)
+        self.day = day_of_month[self.date]
+
+        # Каждое различное значение оценки разбирается один раз
+        values = grades[:, R_VALUE]
+        distinct = np.unique(values)
+        size = int(distinct[-1]) + 1 if len(distinct) else 0
+        score = np.full(size, np.nan)
+        stats_absent = np.zeros(size, dtype=bool)
+        rating_absent = np.zeros(size, dtype=bool)
+        student_present = np.zeros(size, dtype=bool)
+        student_absent = np.zeros(size, dtype=bool)
+        for value in distinct.tolist():
+            (score[value], stats_absent[value], rating_absent[value],
+             student_present[value], student_absent[value]) = _classify(snapshot.string(value))
+        self.score = score[values]
+        self.absent = rating_absent[values]
+        self.stats_absent = stats_absent[values]
+        self.student_present = student_present[values]
+        self.student_absent = student_absent[values]
+
+        # Студенты группы с одинаковым ФИО (без пробелов по краям) считаются
+        # одним студентом: индекс первого из них
+        self.representative = np.arange(len(students), dtype=np.int64)
+        for group in range(len(snapshot.groups) // 6):
+            for item in snapshot.students_by_fio(group).values():
+                self.representative[item["students"]] = item["students"][0]
+
+    # --- Диапазоны ---
+
+    def _grade_range(self, first_student, end_student):
+        """Оценки студентов first_student..end_student-1 (лежат подряд)"""
+        start, end = np.searchsorted(self.student, [first_student, end_student])
+        return slice(int(start), int(end))
+
+    def _group(self, group):
+        students = self.snapshot.group_students(group)
+        return students, self._grade_range(students.start, students.stop)
+
+    def _group_subjects(self, group):
+        record = self.snapshot.group(group)
+        return range(record[G_SUBJECT_START], record[G_SUBJECT_START] + record[G_SUBJECT_COUNT])
+
+    def _representatives(self, students):
+        """Индексы (от начала группы) студентов, объединенных по ФИО, в порядке ФИО"""
+        local = self.representative[students.start:students.stop] - students.start
+        return np.flatnonzero(local == np.arange(len(students)))
+
+    def _student_info(self, index):
+        return {
+            "id": int(self.snapshot.student(index)[S_ID]),
+            "fio": self.snapshot.string(self.snapshot.student(index)[S_FIO]),
+        }
+
+    # --- Группа ---
+
+    def subject_stats(self, group_id, subject_id):
+        """Посещаемость студентов группы по предмету (как GET /api/stats)"""
+        group = self.snapshot.group_by_id.get(group_id)
+        if group is None:
+            return []
+        students, grades = self._group(group)
+        subject = self.snapshot.subject_by_id.get(subject_id)
+        if subject is None:
+            mask = np.zeros(grades.stop - grades.start, dtype=bool)
+        else:
+            mask = self.subject[grades] == subject
+        local = self.student[grades][mask].astype(np.int64) - students.start
+        totals = np.bincount(local, minlength=len(students))
+        absences = np.bincount(local, weights=self.stats_absent[grades][mask], minlength=len(students)).astype(np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            attendance = _round((totals - absences) / totals * 100, 1)
+
+        stats = []
+        for i, student in enumerate(students):
+            total = int(totals[i])
+            stats.append(dict(
+                self._student_info(student),
+                total=total,
+                absences=int(absences[i]),
+                grades=total - int(absences[i]),
+                attendance=float(attendance[i]) if total > 0 else 0,
+            ))
+        return stats
+
+    def absence_rating(self, group):
+        """Рейтинг группы по пропускам: [{'id', 'fio', 'absences', 'position'}]"""
+        students, grades = self._group(group)
+        local = self.representative[self.student[grades]] - students.start
+        absences = np.bincount(local, weights=self.absent[grades], minlength=len(students)).astype(np.int64)
+        representatives = self._representatives(students)
+        absences = absences[representatives]
+        order = np.lexsort((representatives, absences))
+        return [
+            dict(
+                self._student_info(students.start + int(representatives[i])),
+                absences=int(absences[i]),
+                position=position,
+            )
+            for position, i in enumerate(order.tolist(), start=1)
+        ]
+
+    def grade_rating(self, group):
+        """
+        Рейтинг группы по среднему баллу:
+        [{'id', 'fio', 'average_grade', 'total_grades', 'position'}]
+
+        Одинаковые оценки на одну дату по одному предмету (дубликаты
+        студента) учитываются один раз
+        """
+        students, grades = self._group(group)
+        scores = self.score[grades]
+        numeric = ~np.isnan(scores)
+        local = self.representative[self.student[grades][numeric]] - students.start
+        score_values, score_codes = np.unique(scores[numeric], return_inverse=True)
+        # Уникальные (студент, предмет, дата, оценка) одним ключом
+        key = local
+        for column, size in (
+            (self.subject[grades][numeric], self.subject_count),
+            (self.date[grades][numeric], self.date_count),
+            (score_codes.ravel(), len(score_values)),
+        ):
+            key = key * max(size, 1) + column.astype(np.int64)
+        key = np.unique(key)
+        score_count = max(len(score_values), 1)
+        per_student = max(self.subject_count, 1) * max(self.date_count, 1) * score_count
+        key_student = key // per_student
+        key_scores = score_values[key % score_count] if len(score_values) else np.zeros(0)
+
+        totals = np.bincount(key_student, minlength=len(students))
+        sums = np.bincount(key_student, weights=key_scores, minlength=len(students))
+        representatives = self._representatives(students)
+        totals = totals[representatives]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            averages = np.where(totals > 0, _round(sums[representatives] / totals, 2), 0.0)
+        order = np.lexsort((representatives, -totals, -averages))
+        return [
+            dict(
+                self._student_info(students.start + int(representatives[i])),
+                average_grade=float(averages[i]),
+                total_grades=int(totals[i]),
+                position=position,
+            )
+            for position, i in enumerate(order.tolist(), start=1)
+        ]
+
+    # --- Студент ---
+
+    def student_subjects(self, student):
+        """Предметы студента со статистикой (как GET /api/student/subjects)"""
+        record = self.snapshot.student(student)
+        grades = self._grade_range(student, student + 1)
+        subjects = self._group_subjects(record[S_GROUP])
+        first = subjects.start
+        # Оценки предметов других групп не учитываются
+        subject = self.subject[grades].astype(np.int64) - first
+        in_group = (subject >= 0) & (subject < len(subjects))
+        subject = subject[in_group]
+        totals = np.bincount(subject, minlength=len(subjects))
+        present = np.bincount(subject, weights=self.student_present[grades][in_group], minlength=len(subjects)).astype(np.int64)
+        absences = np.bincount(subject, weights=self.student_absent[grades][in_group], minlength=len(subjects)).astype(np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            attendance = np.where(totals > 0, _round(present / totals * 100, 1), 0.0)
+
+        # Итоговая оценка - первая числовая оценка на 10 число (оценки
+        # предмета упорядочены по дате)
+        final = in_group.copy()
+        final[in_group] = (self.day[grades][in_group] == 10) & ~np.isnan(self.score[grades][in_group])
+        final_subjects, final_positions = np.unique(self.subject[grades][final], return_index=True)
+        final_positions = np.flatnonzero(final)[final_positions] + grades.start
+        finals = dict(zip((final_subjects - first).tolist(), final_positions.tolist()))
+
+        group_id = int(self.snapshot.group(record[S_GROUP])[G_ID])
+        subjects_data = []
+        for i, index in enumerate(subjects):
+            subject_record = self.snapshot.subject(index)
+            subject_data = {
+                "id": int(subject_record[SUB_ID]),
+                "name": self.snapshot.string(subject_record[SUB_NAME]),
+                "group_id": group_id,
+                "stats": {
+                    "total": int(totals[i]),
+                    "grades": int(present[i]),
+                    "absences": int(absences[i]),
+                    "attendance": float(attendance[i]),
+                }
+            }
+            position = finals.get(i)
+            if position is not None:
+                subject_data["final_grade"] = float(self.score[position])
+                subject_data["final_grade_date"] = self.snapshot.date(int(self.date[position])).isoformat()
+            subjects_data.append(subject_data)
+        return subjects_data
+
+    def student_stats(self, student):
+        """Общая статистика студента (как GET /api/student/stats)"""
+        record = self.snapshot.student(student)
+        grades = self._grade_range(student, student + 1)
+        total = grades.stop - grades.start
+        grades_count = int(np.count_nonzero(self.student_present[grades]))
+        scores = self.score[grades]
+        scores = scores[~np.isnan(scores)]
+        return {
+            "total_subjects": int(self.snapshot.group(record[S_GROUP])[G_SUBJECT_COUNT]),
+            "total_lessons": total,
+            "grades": grades_count,
+            "absences": int(np.count_nonzero(self.student_absent[grades])),
+            "attendance": float(_round(grades_count / total * 100, 1)) if total > 0 else 0.0,
+            "average_grade": float(_round(scores.mean(), 2)) if len(scores) else 0.0,
+        }
+
+    def subjects_ratings(self, student):
+        """
+        Позиция студента в рейтингах группы по каждому предмету (средний
+        балл и посещаемость); без общего рейтинга среди предметов
+        """
+        record = self.snapshot.student(student)
+        group = record[S_GROUP]
+        students, grades = self._group(group)
+        subjects = self._group_subjects(group)
+        representatives = self._representatives(students)
+        # Номер студента среди объединенных по ФИО (в порядке ФИО)
+        rank = np.full(len(students), -1, dtype=np.int64)
+        rank[representatives] = np.arange(len(representatives))
+        count = len(representatives)
+
+        subject = self.subject[grades].astype(np.int64) - subjects.start
+        in_group = (subject >= 0) & (subject < len(subjects))
+        row = rank[self.representative[self.student[grades][in_group]] - students.start]
+        cell = row * len(subjects) + subject[in_group]
+        size = count * len(subjects)
+        scores = self.score[grades][in_group]
+        numeric = ~np.isnan(scores)
+
+        def table(weights=None, mask=None):
+            cells = cell if mask is None else cell[mask]
+            if weights is not None and mask is not None:
+                weights = weights[mask]
+            return np.bincount(cells, weights=weights, minlength=size).reshape(count, len(subjects))
+
+        totals = table()
+        present = table(self.student_present[grades][in_group].astype(np.float64))
+        numeric_count = table(mask=numeric)
+        numeric_sum = table(scores, numeric)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            attendance = np.where(totals > 0, _round(present / totals * 100, 1), 0.0)
+            averages = np.where(numeric_count > 0, _round(numeric_sum / numeric_count, 2), 0.0)
+
+        # Место = 1 + число студентов выше (больше значение, при равенстве - раньше по ФИО)
+        own = rank[self.representative[student] - students.start]
+        earlier = (np.arange(count) < own)[:, None]
+
+        def positions(values):
+            above = (values > values[own]) | ((values == values[own]) & earlier)
+            return np.count_nonzero(above, axis=0) + 1
+
+        grade_positions = positions(averages)
+        attendance_positions = positions(attendance)
+
+        subjects_ratings = []
+        for i, index in enumerate(subjects):
+            subject_record = self.snapshot.subject(index)
+            subjects_ratings.append({
+                "id": int(subject_record[SUB_ID]),
+                "name": self.snapshot.string(subject_record[SUB_NAME]),
+                "ratings": {
+                    "by_grades": {
+                        "position": int(grade_positions[i]),
+                        "total_students": count,
+                        "average_grade": float(averages[own, i])
+                    },
+                    "by_attendance": {
+                        "position": int(attendance_positions[i]),
+                        "total_students": count,
+                        "attendance": float(attendance[own, i])
+                    }
+                }
+            })
+        return subjects_ratings
+
+
+_analytics = None
+_analytics_lock = threading.Lock()
+
+
+def get_analytics():
+    """
+    Аналитика текущего снимка данных или None (NumPy не установлен или
+    снимка нет - тогда API считает статистику как раньше)
+    """
+    global _analytics
+    if np is None:
+        return None
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    analytics = _analytics
+    if analytics is not None and analytics.snapshot is snapshot:
+        return analytics
+    with _analytics_lock:
+        if _analytics is None or _analytics.snapshot is not snapshot:
+            _analytics = Analytics(snapshot)
+        return _analytics
+
+
+def _on_ingest_finished(event):
+    # Массивы строятся сразу после парсинга, а не на первом запросе
+    if event.get("event") == INGEST_FINISHED:
+        get_analytics()
+
+
+subscribe(_on_ingest_finished)
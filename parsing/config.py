@@ -34,12 +34,47 @@ TARGET_FILES = [
     "Испп 23-09.2.xlsx"
 ]
 
+# Скачивание: сколько файлов скачивать одновременно (1 - по очереди)
+DOWNLOAD_WORKERS = int(os.getenv("DOWNLOAD_WORKERS", "4"))
+# HTTP-запросы скачивания (downloaders/http_session.py): таймаут запроса,
+# повторы при 429/5xx и сетевых ошибках (пауза растет экспоненциально
+# со случайным разбросом) и общий срок на все скачивание за запуск (0 - без срока)
+DOWNLOAD_TIMEOUT_SECONDS = float(os.getenv("DOWNLOAD_TIMEOUT_SECONDS", "30"))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+DOWNLOAD_BACKOFF_SECONDS = float(os.getenv("DOWNLOAD_BACKOFF_SECONDS", "1"))
+DOWNLOAD_BACKOFF_MAX_SECONDS = float(os.getenv("DOWNLOAD_BACKOFF_MAX_SECONDS", "30"))
+DOWNLOAD_DEADLINE_SECONDS = float(os.getenv("DOWNLOAD_DEADLINE_SECONDS", "300"))
+# Адреса скачивания ({file_id} - ID файла); переопределяются, например,
+# для проверки на локальном HTTP-сервере
+SHEETS_EXPORT_URL = os.getenv(
+    "SHEETS_EXPORT_URL", "https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
+)
+DRIVE_DOWNLOAD_URL = os.getenv(
+    "DRIVE_DOWNLOAD_URL", "https://drive.google.com/uc?export=download&id={file_id}"
+)
+
 # ID папки Google Drive (для автоматического поиска файлов, если есть доступ)
 GOOGLE_DRIVE_FOLDER_ID = "1Vte1-RAsucB6WLRiQRAUN1Yq37k7GpQb"
 
 # Настройки парсинга
 SKIP_FIRST_SHEETS = 3  # Пропускаем первые 3 вкладки
 STOP_SHEET_NAME = "УП технической разработки"  # Останавливаемся на этой вкладке
+# Движок чтения Excel: "openpyxl" или "xml" (быстрое чтение XML вкладок напрямую,
+# при проблемах - автоматически openpyxl)
+PARSER_ENGINE = os.getenv("PARSER_ENGINE", "openpyxl")
+# Лимиты парсинга (0 - без лимита): вкладка, превысившая лимит, пропускается
+SHEET_TIME_BUDGET_SECONDS = float(os.getenv("SHEET_TIME_BUDGET_SECONDS", "60"))  # Время на вкладку
+SHEET_CELL_BUDGET = int(os.getenv("SHEET_CELL_BUDGET", "2000000"))  # Прочитанных ячеек на вкладку
+FILE_TIME_BUDGET_SECONDS = float(os.getenv("FILE_TIME_BUDGET_SECONDS", "300"))  # Время на файл
+# Конвейер скачивание → парсинг → проверка → запись (pipeline.py):
+# размер очередей между этапами; при заполнении предыдущий этап ждет
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+# Файл, содержимое которого уже записано в БД (той же версией парсера),
+# не парсится и не записывается повторно
+SKIP_UNCHANGED_FILES = os.getenv("SKIP_UNCHANGED_FILES", "1") != "0"
+# Инкрементальная запись: перезаписываются только новые и изменившиеся
+# колонки журнала (по контрольным суммам в БД), а не вся группа
+INCREMENTAL_INGEST = os.getenv("INCREMENTAL_INGEST", "1") != "0"
 
 # База данных
 # Путь относительно корня проекта
@@ -47,6 +82,38 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASE_PATH = os.path.join(BASE_DIR, "data", "students.db")
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DATABASE_PATH}")
 
-# Расписание
-PARSE_INTERVAL_MINUTES = 60  # Парсинг раз в час
+# Источник файлов (downloaders/sources.py): "google_drive" - скачивание
+# файлов из списка выше, "local" - файлы .xlsx из папки LOCAL_SOURCE_DIR
+INGEST_SOURCE = os.getenv("INGEST_SOURCE", "google_drive")
+LOCAL_SOURCE_DIR = os.getenv("LOCAL_SOURCE_DIR", os.path.join(BASE_DIR, "data", "local_source"))
+# Отслеживание папки (только для "local"): "auto" - inotify, если доступен,
+# иначе опрос; "inotify"; "poll" - опрос раз в WATCH_POLL_SECONDS.
+# Измененные файлы парсятся, когда WATCH_SETTLE_SECONDS не было новых изменений
+WATCH_BACKEND = os.getenv("WATCH_BACKEND", "auto")
+WATCH_POLL_SECONDS = float(os.getenv("WATCH_POLL_SECONDS", "2"))
+WATCH_SETTLE_SECONDS = float(os.getenv("WATCH_SETTLE_SECONDS", "1"))
+
+# Кэш результатов парсинга (parse_cache.py, reingest.py)
+PARSE_CACHE_ENABLED = os.getenv("PARSE_CACHE_ENABLED", "1") != "0"
+PARSE_CACHE_DIR = os.getenv("PARSE_CACHE_DIR", os.path.join(BASE_DIR, "data", "parse_cache"))
+PARSE_CACHE_MAX_AGE_DAYS = float(os.getenv("PARSE_CACHE_MAX_AGE_DAYS", "30"))  # Удалять записи старше (0 - не удалять)
+PARSE_CACHE_MAX_MB = float(os.getenv("PARSE_CACHE_MAX_MB", "200"))  # Общий размер кэша (0 - без ограничения)
+
+# Расписание (job_runner.py)
+PARSE_INTERVAL_MINUTES = float(os.getenv("PARSE_INTERVAL_MINUTES", "60"))  # Парсинг раз в час
+# Запуск в начале интервала (для часа - в 00 минут), иначе - через интервал после прошлого
+PARSE_ALIGN_TO_INTERVAL = os.getenv("PARSE_ALIGN_TO_INTERVAL", "1") != "0"
+# Случайная задержка запуска по расписанию (0..PARSE_JITTER_SECONDS сек)
+PARSE_JITTER_SECONDS = float(os.getenv("PARSE_JITTER_SECONDS", "0"))
+# Состояние запусков (для API) и файл-запрос внеочередного запуска
+INGEST_STATE_FILE = os.getenv("INGEST_STATE_FILE", os.path.join(BASE_DIR, "data", "ingest_state.json"))
+INGEST_TRIGGER_FILE = os.getenv("INGEST_TRIGGER_FILE", os.path.join(BASE_DIR, "data", "ingest_trigger.json"))
+# Файл-метка поколения данных: меняется после каждого парсинга, изменившего
+# данные; по нему воркеры API сбрасывают кэши (ingest_events.py)
+INGEST_GENERATION_FILE = os.getenv("INGEST_GENERATION_FILE", os.path.join(BASE_DIR, "data", "ingest_generation"))
+# Снимок данных для чтения API (read_model.py): файл, отображаемый в память
+READ_MODEL_ENABLED = os.getenv("READ_MODEL_ENABLED", "1") != "0"
+READ_MODEL_FILE = os.getenv("READ_MODEL_FILE", os.path.join(BASE_DIR, "data", "read_model.snap"))
 
+# Индекс студентов для поиска (API и бот)
+ROSTER_REFRESH_SECONDS = 5  # Как часто проверять, не обновились ли данные
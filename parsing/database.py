@@ -9,13 +9,16 @@
 - Student (студенты)
 - Subject (предметы)
 - Grade (оценки/пропуски)
+- SubjectColumn (контрольные суммы колонок журнала для инкрементальной записи)
+- UpdateLog (записанные в БД версии файлов)
 
 Логика:
-- init_db() - создает таблицы в БД
+- init_db() - создает таблицы в БД (и добавляет новые колонки в старые таблицы)
 - get_db() - возвращает сессию для работы с БД
+- get_data_version() - версия данных (меняется после каждого парсинга)
 """
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Date, ForeignKey, UniqueConstraint
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Date, ForeignKey, UniqueConstraint, func, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -45,6 +48,10 @@ class UpdateLog(Base):
     id = Column(Integer, primary_key=True)
     file_name = Column(String, unique=True, nullable=False)  # Имя файла
     last_update_time = Column(DateTime, nullable=False, default=datetime.now)  # Время последнего обновления
+    # Записанная в БД версия файла: SHA-256 содержимого и отпечаток парсера
+    # (файл с тем же содержимым можно не парсить и не записывать повторно)
+    content_sha256 = Column(String, nullable=True)
+    parser = Column(String, nullable=True)
 
 
 class ParseLog(Base):
@@ -57,6 +64,7 @@ class ParseLog(Base):
     groups_updated = Column(String, nullable=True)  # Список обновленных групп (JSON строка)
     status = Column(String, nullable=False, default="success")  # Статус: success, error
     error_message = Column(String, nullable=True)  # Сообщение об ошибке, если есть
+    details = Column(String, nullable=True)  # Метрики запуска (JSON строка): этапы конвейера, очереди, отчет парсинга
 
 
 class Group(Base):
@@ -94,6 +102,9 @@ class Subject(Base):
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)  # Название предмета
     group_id = Column(Integer, ForeignKey('groups.id'), nullable=False)
+    # Контрольная сумма тем (для инкрементальной записи, см. SubjectColumn);
+    # None - контрольные суммы предмета неизвестны, группа записывается целиком
+    topics_checksum = Column(String, nullable=True)
     
     group = relationship("Group", back_populates="subjects")
     grades = relationship("Grade", back_populates="subject", cascade="all, delete-orphan")
@@ -132,6 +143,25 @@ class Grade(Base):
     subject = relationship("Subject", back_populates="grades")
 
 
+class SubjectColumn(Base):
+    """
+    Контрольная сумма колонки журнала (все оценки предмета на одну дату)
+    
+    Записывается вместе с оценками; при следующем парсинге перезаписываются
+    только колонки, у которых сумма изменилась (db_writer.write_group)
+    """
+    __tablename__ = 'subject_columns'
+    
+    id = Column(Integer, primary_key=True)
+    subject_id = Column(Integer, ForeignKey('subjects.id'), nullable=False)
+    date = Column(Date, nullable=False)  # Дата (колонка журнала)
+    checksum = Column(String, nullable=False)  # Контрольная сумма оценок колонки
+    
+    __table_args__ = (
+        UniqueConstraint('subject_id', 'date', name='uq_subject_column_date'),
+    )
+
+
 class TelegramUser(Base):
     """Модель пользователя Telegram бота"""
     __tablename__ = 'telegram_users'
@@ -166,12 +196,49 @@ engine = create_engine(DATABASE_URL, echo=False)
 SessionLocal = sessionmaker(bind=engine)
 
 
+# Колонки, добавленные в существующие таблицы после их создания:
+# create_all() не меняет уже созданные таблицы, поэтому они добавляются через ALTER TABLE
+ADDED_COLUMNS = {
+    'parse_log': {'details': 'VARCHAR'},
+    'subjects': {'topics_checksum': 'VARCHAR'},
+    'update_log': {'content_sha256': 'VARCHAR', 'parser': 'VARCHAR'},
+}
+
+
 def init_db():
-    """Инициализация базы данных - создает все таблицы"""
+    """Инициализация базы данных - создает все таблицы и добавляет новые колонки"""
     Base.metadata.create_all(engine)
+    
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table_name, columns in ADDED_COLUMNS.items():
+            existing = {column['name'] for column in inspector.get_columns(table_name)}
+            for column_name, column_type in columns.items():
+                if column_name not in existing:
+                    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
 
 
 def get_db():
     """Получение сессии БД для выполнения запросов"""
     return SessionLocal()
 
+
+def get_data_version(db):
+    """
+    Версия данных в БД - меняется после каждого успешного парсинга
+
+    Используется кэшами (индекс студентов и т.д.) для определения момента перестройки.
+    MAX(Student.id) берется по первичному ключу. Столбец groups_updated не
+    индексирован, поэтому parse_log просматривается с конца по первичному
+    ключу (ORDER BY id DESC LIMIT 1): обычно последний парсинг и обновил
+    группы, и читается одна строка; просмотр дольше, только если подряд
+    шли запуски без обновлений.
+
+    Returns:
+        tuple: (ID последнего парсинга с обновлением групп, максимальный ID студента)
+    """
+    last_parse_id = db.query(ParseLog.id).filter(
+        ParseLog.groups_updated.isnot(None)
+    ).order_by(ParseLog.id.desc()).limit(1).scalar()
+    last_student_id = db.query(func.max(Student.id)).scalar()
+    return (last_parse_id or 0, last_student_id or 0)
@@ -0,0 +1,500 @@
+"""
+ЗАПИСЬ РАСПАРСЕННЫХ ДАННЫХ В БД
+===============================
+
+Запись одной группы делится на два шага:
+1. prepare_group() - проверка и удаление дубликатов (без БД):
+   SheetBatch вкладок группы -> студенты, темы и оценки, готовые к записи
+2. write_group() - удаление старых данных группы и запись новых
+
+Инкрементальная запись: журналы растут вправо (каждое занятие - новая
+колонка-дата), старые колонки меняются редко. prepare_group() считает
+контрольную сумму каждой колонки (все оценки предмета на одну дату) и тем;
+суммы хранятся в БД (SubjectColumn, Subject.topics_checksum) вместе с данными.
+write_group(incremental=True) перезаписывает только новые и изменившиеся
+колонки (и темы), остальное не трогает. Если сумм в БД нет (группа записана
+старой версией или слиянием двух файлов) - группа записывается целиком.
+
+Шаги независимы, поэтому конвейер (pipeline.py) выполняет их в разных
+потоках: пока одна группа записывается, следующая уже проверяется.
+
+Функции:
+- is_valid_student() - запись - студент, а не строка заголовка
+- prepare_group() - проверка/дедупликация данных группы
+- column_checksums() / topics_checksum() - контрольные суммы колонок и тем
+- delete_group_data() - удаление старых данных группы
+- write_group() - запись данных группы в сессию БД (без commit)
+- ingested_files() / mark_file_ingested() - какие версии файлов уже записаны
+"""
+
+import hashlib
+from datetime import datetime
+
+from database import Group, Student, Subject, Grade, Topic, SubjectColumn, UpdateLog
+from fio_normalizer import normalize_fio_to_initials
+
+# Заголовки, которые не являются студентами
+HEADER_KEYWORDS = [
+    'месяц/число', 'фио обучающихся', 'фио', 'кол-во часов',
+    'количество часов', 'часы', 'студент', 'обучающийся'
+]
+
+
+def is_valid_student(fio):
+    """Проверяет, является ли запись валидным студентом"""
+    if not fio:
+        return False
+    fio_lower = str(fio).lower().strip()
+    if any(keyword in fio_lower for keyword in HEADER_KEYWORDS):
+        return False
+    if len(fio_lower) < 3:
+        return False
+    return True
+
+
+def normalize_student(fio):
+    """ФИО студента в формате "Фамилия И.О." или None, если это не студент"""
+    if not is_valid_student(fio) or str(fio).strip() == '':
+        return None
+    fio_normalized = normalize_fio_to_initials(str(fio).strip())
+    if not fio_normalized or len(fio_normalized) < 3:
+        return None
+    return fio_normalized
+
+
+def is_valid_grade_date(date):
+    """Дата оценки валидна (год 2000-2100, месяц 1-12, день 1-31)"""
+    if not date or not hasattr(date, 'year'):
+        return False
+    if date.year < 2000 or date.year > 2100:
+        return False
+    if date.month < 1 or date.month > 12:
+        return False
+    if date.day < 1 or date.day > 31:
+        return False
+    return True
+
+
+def _checksum(lines):
+    digest = hashlib.sha1()
+    for line in lines:
+        digest.update(line.encode('utf-8'))
+        digest.update(b'\n')
+    return digest.hexdigest()[:16]
+
+
+def column_checksums(grades):
+    """
+    Контрольные суммы колонок журнала: {дата: сумма}
+
+    grades - [(fio, date, value), ...]; сумма колонки не зависит от порядка строк
+    """
+    columns = {}
+    for fio, date, value in grades:
+        columns.setdefault(date, []).append(f"{fio}\t{value}")
+    return {date: _checksum(sorted(lines)) for date, lines in columns.items()}
+
+
+def topics_checksum(topics):
+    """Контрольная сумма тем предмета: [(name, hours, date), ...]"""
+    return _checksum(f"{name}\t{hours}\t{date}" for name, hours, date in topics)
+
+
+def prepare_group(group_name, batches):
+    """
+    Проверка и дедупликация данных группы
+
+    batches - SheetBatch вкладок группы (вкладки с одинаковым названием
+    объединяются в один предмет)
+
+    Проверки (валидность студента, даты, оценки) выполняются один раз на
+    элемент таблиц SheetBatch (students/dates/values), а не на каждую оценку.
+    Повторы отбрасываются: одна тема с одним названием и одна оценка на
+    студента и дату в предмете (остается первая).
+
+    Returns:
+        dict: {
+            'group': название группы,
+            'students': [ФИО, ...] - все студенты группы,
+            'subjects': [{'name', 'topics': [(name, hours, date)], 'grades': [(fio, date, value)],
+                          'columns': {date: сумма}, 'topics_checksum'}],
+            'grades_count', 'topics_count' - количество записей к сохранению
+        }
+    """
+    students = {}  # ФИО -> None (упорядоченное множество)
+    subjects = {}  # предмет -> {'name', 'topics', 'grades'} + множества для дедупликации
+
+    for batch in batches:
+        # Сначала собираем всех уникальных студентов группы
+        batch_students = [normalize_student(fio) for fio in batch.students]
+        for fio in batch_students:
+            if fio:
+                students.setdefault(fio)
+
+        subject = subjects.get(batch.subject)
+        if subject is None:
+            subject = subjects[batch.subject] = {
+                'name': batch.subject,
+                'topics': [],
+                'grades': [],
+                'topic_names': set(),
+                'grade_keys': set(),
+            }
+
+        # Темы занятий (без повторов названий)
+        for topic_name, hours, topic_date in batch.topics:
+            topic_name = (topic_name or '').strip()
+            if topic_name and len(topic_name) >= 3 and topic_name not in subject['topic_names']:
+                subject['topic_names'].add(topic_name)
+                subject['topics'].append((topic_name, hours, topic_date))
+
+        # КРИТИЧЕСКИ ВАЖНО: Строгие проверки валидности данных
+        dates = [date if is_valid_grade_date(date) else None for date in batch.dates]
+        values = [
+            str(value) if value and str(value).strip() != '' else None
+            for value in batch.values
+        ]
+
+        # Оценки: одна на студента и дату (первая)
+        for student_idx, date_idx, value_code in zip(batch.student_idx, batch.date_idx, batch.value_code):
+            fio = batch_students[student_idx]
+            date = dates[date_idx]
+            value = values[value_code]
+            if fio is None or date is None or value is None:
+                continue
+            if (fio, date) in subject['grade_keys']:
+                continue
+            subject['grade_keys'].add((fio, date))
+            subject['grades'].append((fio, date, value))
+
+    prepared_subjects = [
+        {
+            'name': subject['name'],
+            'topics': subject['topics'],
+            'grades': subject['grades'],
+            'columns': column_checksums(subject['grades']),
+            'topics_checksum': topics_checksum(subject['topics']),
+        }
+        for subject in subjects.values()
+    ]
+    return {
+        'group': group_name,
+        'students': list(students),
+        'subjects': prepared_subjects,
+        'grades_count': sum(len(subject['grades']) for subject in prepared_subjects),
+        'topics_count': sum(len(subject['topics']) for subject in prepared_subjects),
+    }
+
+
+def delete_group_data(db, group_name):
+    """Удаляет группу со всеми оценками, студентами, темами и предметами"""
+    group = db.query(Group).filter(Group.name == group_name).first()
+    if not group:
+        return
+
+    # Удаляем все оценки студентов этой группы
+    students_in_group = db.query(Student).filter(Student.group_id == group.id).all()
+    for student in students_in_group:
+        db.query(Grade).filter(Grade.student_id == student.id).delete()
+
+    # Удаляем всех студентов группы
+    db.query(Student).filter(Student.group_id == group.id).delete()
+
+    # Удаляем все темы и контрольные суммы колонок предметов группы
+    subjects_in_group = db.query(Subject).filter(Subject.group_id == group.id).all()
+    for subject in subjects_in_group:
+        db.query(Topic).filter(Topic.subject_id == subject.id).delete()
+        db.query(SubjectColumn).filter(SubjectColumn.subject_id == subject.id).delete()
+
+    # Удаляем все предметы группы
+    db.query(Subject).filter(Subject.group_id == group.id).delete()
+
+    # Удаляем саму группу
+    db.delete(group)
+    db.flush()
+
+
+def _has_column_state(db, group):
+    """У всех предметов группы в БД есть контрольные суммы"""
+    missing = db.query(Subject.id).filter(
+        Subject.group_id == group.id,
+        Subject.topics_checksum.is_(None)
+    ).first()
+    return missing is None
+
+
+def write_group(db, prepared, replace=True, incremental=False):
+    """
+    Записывает данные группы (результат prepare_group) в сессию БД
+
+    replace=True - старые данные группы заменяются новыми:
+      - incremental=True и в БД есть контрольные суммы группы - перезаписываются
+        только изменившиеся колонки, темы, предметы и студенты
+      - иначе группа удаляется и записывается целиком (с контрольными суммами)
+    replace=False - данные добавляются к уже записанным (та же группа пришла
+    из второго файла в этом же запуске): существующие студенты, предметы,
+    темы и оценки не дублируются. Контрольные суммы группы сбрасываются -
+    следующая запись будет полной.
+
+    commit не выполняется - его делает вызывающий код.
+
+    Returns:
+        dict: {'mode': 'full' | 'delta' | 'merge', 'rows_added', 'rows_deleted',
+               'columns_total', 'columns_written'}
+    """
+    group_name = prepared['group']
+    if replace and incremental:
+        group = db.query(Group).filter(Group.name == group_name).first()
+        if group is not None and _has_column_state(db, group):
+            return _write_group_delta(db, prepared, group)
+
+    result = {
+        'mode': 'full' if replace else 'merge',
+        'rows_added': 0,
+        'rows_deleted': 0,
+        'columns_total': 0,
+        'columns_written': 0,
+    }
+
+    if replace:
+        delete_group_data(db, group_name)
+        group = None
+    else:
+        group = db.query(Group).filter(Group.name == group_name).first()
+
+    if group is None:
+        # Создаем новую группу
+        group = Group(name=group_name)
+        db.add(group)
+        db.flush()
+        students_map = {}
+    else:
+        students_map = {
+            student.fio: student
+            for student in db.query(Student).filter(Student.group_id == group.id)
+        }
+
+    # Создаем всех студентов группы один раз
+    for fio in prepared['students']:
+        if fio not in students_map:
+            student = Student(fio=fio, group_id=group.id)
+            db.add(student)
+            students_map[fio] = student
+            result['rows_added'] += 1
+
+    db.flush()  # Сохраняем всех студентов перед созданием оценок
+
+    # Теперь обрабатываем предметы и оценки
+    for prepared_subject in prepared['subjects']:
+        result['columns_total'] += len(prepared_subject['columns'])
+        subject = None
+        if not replace:
+            subject = db.query(Subject).filter(
+                Subject.group_id == group.id,
+                Subject.name == prepared_subject['name']
+            ).first()
+
+        if subject is None:
+            # Создаем новый предмет
+            subject = Subject(name=prepared_subject['name'], group_id=group.id)
+            db.add(subject)
+            db.flush()
+            saved_topics = set()
+            saved_grades = set()
+        else:
+            saved_topics = {
+                name for (name,) in db.query(Topic.name).filter(Topic.subject_id == subject.id)
+            }
+            saved_grades = {
+                (student_id, date)
+                for student_id, date in db.query(Grade.student_id, Grade.date).filter(Grade.subject_id == subject.id)
+            }
+
+        # Сохраняем темы занятий
+        for topic_name, hours, topic_date in prepared_subject['topics']:
+            if topic_name in saved_topics:
+                continue
+            db.add(Topic(
+                subject_id=subject.id,
+                name=topic_name,
+                hours=hours,
+                date=topic_date
+            ))
+            result['rows_added'] += 1
+
+        db.flush()
+
+        # Сохраняем оценки
+        for fio, date, value in prepared_subject['grades']:
+            student = students_map[fio]
+            if (student.id, date) in saved_grades:
+                continue
+            db.add(Grade(
+                student_id=student.id,
+                subject_id=subject.id,
+                date=date,
+                value=value
+            ))
+            result['rows_added'] += 1
+
+        # Контрольные суммы колонок и тем (для следующей инкрементальной записи)
+        if replace:
+            for date, checksum in prepared_subject['columns'].items():
+                db.add(SubjectColumn(subject_id=subject.id, date=date, checksum=checksum))
+            subject.topics_checksum = prepared_subject['topics_checksum']
+            result['columns_written'] += len(prepared_subject['columns'])
+
+    if not replace:
+        # После слияния суммы не соответствуют данным - следующая запись полная
+        db.query(Subject).filter(Subject.group_id == group.id).update(
+            {Subject.topics_checksum: None}, synchronize_session=False
+        )
+
+    db.flush()
+    return result
+
+
+def _write_group_delta(db, prepared, group):
+    """
+    Инкрементальная запись группы: только новые/изменившиеся колонки и темы
+
+    Результат в БД тот же, что при полной записи (write_group без incremental).
+    """
+    result = {
+        'mode': 'delta',
+        'rows_added': 0,
+        'rows_deleted': 0,
+        'columns_total': 0,
+        'columns_written': 0,
+    }
+
+    # Студенты: добавляем новых, лишних удаляем в конце (после их оценок)
+    students_map = {
+        student.fio: student
+        for student in db.query(Student).filter(Student.group_id == group.id)
+    }
+    prepared_students = set(prepared['students'])
+    removed_students = [
+        student for fio, student in students_map.items() if fio not in prepared_students
+    ]
+    for fio in prepared['students']:
+        if fio not in students_map:
+            student = Student(fio=fio, group_id=group.id)
+            db.add(student)
+            students_map[fio] = student
+            result['rows_added'] += 1
+    db.flush()
+
+    # Предметы, которых больше нет в файле
+    subjects_map = {
+        subject.name: subject
+        for subject in db.query(Subject).filter(Subject.group_id == group.id)
+    }
+    prepared_names = {prepared_subject['name'] for prepared_subject in prepared['subjects']}
+    for name, subject in subjects_map.items():
+        if name in prepared_names:
+            continue
+        result['rows_deleted'] += db.query(Grade).filter(Grade.subject_id == subject.id).delete()
+        result['rows_deleted'] += db.query(Topic).filter(Topic.subject_id == subject.id).delete()
+        db.query(SubjectColumn).filter(SubjectColumn.subject_id == subject.id).delete()
+        db.delete(subject)
+        result['rows_deleted'] += 1
+
+    for prepared_subject in prepared['subjects']:
+        columns = prepared_subject['columns']
+        result['columns_total'] += len(columns)
+
+        subject = subjects_map.get(prepared_subject['name'])
+        if subject is None:
+            # Новый предмет (новая вкладка)
+            subject = Subject(name=prepared_subject['name'], group_id=group.id)
+            db.add(subject)
+            db.flush()
+            stored = {}
+        else:
+            stored = dict(
+                db.query(SubjectColumn.date, SubjectColumn.checksum).filter(SubjectColumn.subject_id == subject.id)
+            )
+
+        # Темы перезаписываются целиком, если изменились
+        if subject.topics_checksum != prepared_subject['topics_checksum']:
+            result['rows_deleted'] += db.query(Topic).filter(Topic.subject_id == subject.id).delete()
+            for topic_name, hours, topic_date in prepared_subject['topics']:
+                db.add(Topic(
+                    subject_id=subject.id,
+                    name=topic_name,
+                    hours=hours,
+                    date=topic_date
+                ))
+                result['rows_added'] += 1
+            subject.topics_checksum = prepared_subject['topics_checksum']
+
+        # Колонки: новые, изменившиеся и исчезнувшие
+        changed = {
+            date for date in columns.keys() | stored.keys()
+            if columns.get(date) != stored.get(date)
+        }
+        if not changed:
+            continue
+
+        changed_dates = list(changed)
+        result['rows_deleted'] += db.query(Grade).filter(
+            Grade.subject_id == subject.id,
+            Grade.date.in_(changed_dates)
+        ).delete(synchronize_session=False)
+        db.query(SubjectColumn).filter(
+            SubjectColumn.subject_id == subject.id,
+            SubjectColumn.date.in_(changed_dates)
+        ).delete(synchronize_session=False)
+
+        for fio, date, value in prepared_subject['grades']:
+            if date not in changed:
+                continue
+            db.add(Grade(
+                student_id=students_map[fio].id,
+                subject_id=subject.id,
+                date=date,
+                value=value
+            ))
+            result['rows_added'] += 1
+        for date in changed:
+            if date in columns:
+                db.add(SubjectColumn(subject_id=subject.id, date=date, checksum=columns[date]))
+                result['columns_written'] += 1
+
+    # Студенты, которых больше нет в файле (их оценки уже в изменившихся колонках)
+    for student in removed_students:
+        result['rows_deleted'] += db.query(Grade).filter(Grade.student_id == student.id).delete()
+        db.delete(student)
+        result['rows_deleted'] += 1
+
+    db.flush()
+    return result
+
+
+def ingested_files(db):
+    """
+    Записанные в БД версии файлов
+
+    Returns:
+        dict: {имя файла: (SHA-256 содержимого, отпечаток парсера)}
+    """
+    return {
+        row.file_name: (row.content_sha256, row.parser)
+        for row in db.query(UpdateLog).all()
+        if row.content_sha256
+    }
+
+
+def mark_file_ingested(db, file_name, content_sha256, parser):
+    """
+    Отмечает, что все группы файла с этим содержимым записаны в БД
+    (в той же транзакции, что и данные последней группы файла)
+    """
+    row = db.query(UpdateLog).filter(UpdateLog.file_name == file_name).first()
+    if row is None:
+        row = UpdateLog(file_name=file_name)
+        db.add(row)
+    row.last_update_time = datetime.now()
+    row.content_sha256 = content_sha256
+    row.parser = parser
@@ -2,5 +2,6 @@
 Модули для скачивания файлов из различных источников.
 
 google_drive.py - скачивание файлов с Google Drive через прямые ссылки
+http_session.py - общая HTTP-сессия, повторы запросов и срок скачивания
 """
 
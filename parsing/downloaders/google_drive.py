@@ -10,26 +10,242 @@
 3. Сохраняет файлы во временную папку с префиксом "temp_"
 4. Возвращает список путей к скачанным файлам
 
+Файлы скачиваются параллельно (до DOWNLOAD_WORKERS одновременно), но
+отдаются в порядке из config.py. Ошибка скачивания одного файла не
+влияет на остальные - этот файл просто пропускается.
+
+Скачанные файлы не удаляются между запусками. Для каждого файла в
+downloaded_files/.download_state.json хранятся ETag, Last-Modified и SHA-256
+содержимого (DownloadState); следующий запрос условный (If-None-Match /
+If-Modified-Since) - на ответ 304 файл не скачивается заново.
+
+Файл скачивается потоком (по DOWNLOAD_CHUNK_SIZE байт, без загрузки в
+память целиком) во временный файл <имя>.part в той же папке, SHA-256
+считается по ходу скачивания. Старая копия заменяется (os.replace -
+атомарно) только если скачанный файл - xlsx (zip-архив, XLSX_MAGIC):
+парсер никогда не увидит недокачанный файл или HTML-страницу ошибки.
+
+Запросы идут через общую HTTP-сессию с повторами при 429/5xx и общим
+сроком на запуск (http_session.py; срок проверяется и между частями
+ответа - недокачанный .part удаляется); попытки, повторы и время скачивания
+каждого файла собираются в DownloadRun.
+
 Функции:
 - download_target_files() - главная функция, скачивает все файлы
+- iter_target_files() - то же по одному файлу (для конвейера pipeline.py)
+- target_downloads() - список файлов для скачивания (из config.py)
+- download_files() - параллельное скачивание списка файлов
 - download_file_by_id() - скачивание по ID файла
 - download_file_by_link() - скачивание по прямой ссылке
+- known_sha256() - SHA-256 скачанного файла (из метаданных, без чтения файла)
 - extract_file_id_from_url() - извлечение ID из URL
 """
 
+import hashlib
+import json
 import os
+import threading
+import time
 import warnings
-import requests
+from concurrent.futures import ThreadPoolExecutor
 import gdown
 from bs4 import XMLParsedAsHTMLWarning
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import FILE_IDS, DOWNLOAD_LINKS, TARGET_FILES, GOOGLE_DRIVE_FOLDER_ID
+from config import (
+    FILE_IDS, DOWNLOAD_LINKS, TARGET_FILES, GOOGLE_DRIVE_FOLDER_ID,
+    DOWNLOAD_WORKERS, SHEETS_EXPORT_URL, DRIVE_DOWNLOAD_URL
+)
+from downloaders.http_session import DownloadRun, DownloadDeadlineExceeded, get_with_retry
 
 # Подавляем предупреждение о парсинге XML как HTML
 warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 
+# Метаданные скачанных файлов (в папке downloaded_files)
+DOWNLOAD_STATE_FILE = ".download_state.json"
+# Суффикс временного файла, пока файл скачивается
+PARTIAL_SUFFIX = ".part"
+# Начало xlsx-файла (zip-архив)
+XLSX_MAGIC = b"PK\x03\x04"
+# Минимальный размер файла (меньше - не файл, а ответ с ошибкой)
+MIN_FILE_SIZE = 1000
+# Размер части при потоковом скачивании
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def default_download_dir():
+    """Папка для скачанных файлов (относительно корня проекта)"""
+    base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return os.path.join(base_dir, "data", "downloaded_files")
+
+
+class DownloadState:
+    """
+    Метаданные скачанных файлов папки: {имя файла: {'etag', 'last_modified',
+    'sha256', 'size', 'mtime_ns', 'status', 'checked'}}
+
+    Сохраняются в DOWNLOAD_STATE_FILE после каждого изменения; потоки
+    скачивания обновляют общий объект (см. get_download_state)
+    """
+
+    def __init__(self, download_dir):
+        self.path = os.path.join(download_dir, DOWNLOAD_STATE_FILE)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.files = json.load(f)
+        except (OSError, ValueError):
+            self.files = {}
+
+    def get(self, file_name):
+        with self._lock:
+            return dict(self.files.get(file_name) or {})
+
+    def update(self, file_name, **fields):
+        with self._lock:
+            self.files.setdefault(file_name, {}).update(fields)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self.files, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, self.path)
+            except OSError:
+                pass
+
+
+_states = {}
+_states_lock = threading.Lock()
+
+
+def get_download_state(download_dir=None):
+    """Общий DownloadState папки (один на процесс)"""
+    download_dir = os.path.abspath(download_dir or default_download_dir())
+    with _states_lock:
+        if download_dir not in _states:
+            _states[download_dir] = DownloadState(download_dir)
+        return _states[download_dir]
+
+
+def _file_sha256(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def known_sha256(file_path):
+    """
+    SHA-256 скачанного файла из метаданных (None - файл не из папки
+    скачивания или изменен после скачивания)
+    """
+    entry = get_download_state(os.path.dirname(file_path)).get(os.path.basename(file_path))
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+        return entry.get('sha256')
+    return None
+
+
+def _previous_copy(state, file_name, local_path):
+    """Метаданные прошлой копии файла, если она на месте и не изменена"""
+    if known_sha256(local_path) is None:
+        return {}
+    return state.get(file_name)
+
+
+def _conditional_headers(previous):
+    """Заголовки условного запроса по метаданным прошлой копии"""
+    headers = {}
+    if previous.get('etag'):
+        headers['If-None-Match'] = previous['etag']
+    if previous.get('last_modified'):
+        headers['If-Modified-Since'] = previous['last_modified']
+    return headers
+
+
+def _stream_to_file(response, partial_path, run=None, file_name=None):
+    """
+    Записывает тело ответа во временный файл по частям
+
+    run - запуск скачивания (DownloadRun): срок проверяется между частями,
+    медленный ответ не держит запуск дольше срока
+
+    Returns:
+        tuple: (размер в байтах, SHA-256 содержимого)
+
+    Raises:
+        DownloadDeadlineExceeded: срок истек во время скачивания
+        (недокачанный файл остается - его удаляет вызывающий код)
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(partial_path, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+            if run is not None and run.expired():
+                run.record(file_name, deadline_exceeded=True)
+                raise DownloadDeadlineExceeded(f"истек срок скачивания ({size} байт получено)")
+            if chunk:
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+        f.flush()
+        os.fsync(f.fileno())
+    return size, digest.hexdigest()
+
+
+def _is_xlsx(file_path):
+    """Файл начинается как xlsx (zip-архив)"""
+    with open(file_path, 'rb') as f:
+        return f.read(len(XLSX_MAGIC)) == XLSX_MAGIC
+
+
+def _replace_file(state, file_name, partial_path, local_path, previous,
+                  etag=None, last_modified=None, sha256=None):
+    """
+    Заменяет файл скачанной копией и сохраняет метаданные
+
+    sha256 - хэш, посчитанный при скачивании (иначе считается по файлу)
+
+    Returns:
+        str: 'downloaded' - новое содержимое, 'unchanged' - то же, что было,
+        None - скачанный файл не xlsx (удаляется, старая копия остается)
+    """
+    if not _is_xlsx(partial_path):
+        _remove_partial(partial_path)
+        print(f"  ✗ Скачанный файл не является xlsx: {file_name}")
+        return None
+    if sha256 is None:
+        sha256 = _file_sha256(partial_path)
+    os.replace(partial_path, local_path)
+    status = 'unchanged' if previous.get('sha256') == sha256 else 'downloaded'
+    stat = os.stat(local_path)
+    state.update(
+        file_name,
+        etag=etag, last_modified=last_modified, sha256=sha256,
+        size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+        status=status, checked=time.time()
+    )
+    return status
+
+
+def _remove_partial(partial_path):
+    try:
+        os.remove(partial_path)
+    except OSError:
+        pass
+
+
+def _print_result(status, file_name, local_path, source=""):
+    if status == 'unchanged':
+        print(f"  = Не изменился: {file_name}")
+    else:
+        file_size = os.path.getsize(local_path) / 1024  # размер в KB
+        print(f"  ✓ Скачан{source}: {file_name} ({file_size:.1f} KB)")
+
 
 def extract_file_id_from_url(url):
     """
@@ -58,7 +274,7 @@ def extract_file_id_from_url(url):
     return file_id
 
 
-def download_file_by_id(file_id, file_name, download_dir=None):
+def download_file_by_id(file_id, file_name, download_dir=None, run=None):
     """
     Скачивание файла по ID через gdown
     
@@ -68,85 +284,134 @@ def download_file_by_id(file_id, file_name, download_dir=None):
     3. Использует gdown для скачивания
     4. Сохраняет в downloaded_files/<имя_файла>
     5. Проверяет, что файл скачан и не пустой
+    
+    Если прошлая копия файла на месте - запрос условный: на ответ 304
+    возвращается прошлая копия без скачивания
+    
+    run - запуск скачивания (DownloadRun): общий срок и метрики
     """
     if download_dir is None:
-        # Путь относительно корня проекта
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        download_dir = os.path.join(base_dir, "data", "downloaded_files")
+        download_dir = default_download_dir()
+    if run is None:
+        run = DownloadRun()
     try:
         # Создаем папку для скачанных файлов
         os.makedirs(download_dir, exist_ok=True)
         
         local_path = os.path.join(download_dir, file_name)
+        partial_path = local_path + PARTIAL_SUFFIX
+        state = get_download_state(download_dir)
+        previous = _previous_copy(state, file_name, local_path)
         
         print(f"  Скачивание: {file_name}...")
         
         # Пробуем сначала как Google Sheets (экспорт в Excel)
         # Формат: https://docs.google.com/spreadsheets/d/{ID}/export?format=xlsx
-        sheets_url = f"https://docs.google.com/spreadsheets/d/{file_id}/export?format=xlsx"
+        sheets_url = SHEETS_EXPORT_URL.format(file_id=file_id)
         
         try:
-            # Пытаемся скачать как Google Sheets
-            response = requests.get(sheets_url, allow_redirects=True, timeout=30)
-            
-            if response.status_code == 200 and len(response.content) > 1000:  # Минимум 1KB
-                with open(local_path, 'wb') as f:
-                    f.write(response.content)
-                file_size = os.path.getsize(local_path) / 1024
-                print(f"  ✓ Скачан (Google Sheets): {file_name} ({file_size:.1f} KB)")
-                return local_path
+            # Пытаемся скачать как Google Sheets (потоком во временный файл)
+            with get_with_retry(
+                sheets_url, run, file_name, headers=_conditional_headers(previous)
+            ) as response:
+                run.record(file_name, source='sheets', http_status=response.status_code)
+                if response.status_code == 304 and previous:
+                    state.update(file_name, status='not_modified', checked=time.time())
+                    print(f"  = Не изменился (304): {file_name}")
+                    return local_path
+                
+                if response.status_code == 200:
+                    size, sha256 = _stream_to_file(response, partial_path, run, file_name)
+                    if size > MIN_FILE_SIZE:  # Минимум 1KB
+                        status = _replace_file(
+                            state, file_name, partial_path, local_path, previous,
+                            etag=response.headers.get('ETag'),
+                            last_modified=response.headers.get('Last-Modified'),
+                            sha256=sha256
+                        )
+                        if status:
+                            _print_result(status, file_name, local_path, " (Google Sheets)")
+                            return local_path
+                    _remove_partial(partial_path)
         except Exception as sheets_error:
             # Если не получилось как Google Sheets, пробуем как обычный файл Drive
-            pass
+            _remove_partial(partial_path)
+        
+        # После срока скачивания к медленному gdown не переходим
+        if run.expired():
+            run.record(file_name, deadline_exceeded=True)
+            print(f"  ✗ Истек срок скачивания: {file_name}")
+            return None
         
         # Пробуем как обычный файл Google Drive
-        download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
+        download_url = DRIVE_DOWNLOAD_URL.format(file_id=file_id)
+        run.record(file_name, source='drive')
         
         try:
-            gdown.download(download_url, local_path, quiet=True, fuzzy=True)
+            gdown.download(download_url, partial_path, quiet=True, fuzzy=True)
         except Exception as gdown_error:
+            _remove_partial(partial_path)
             return None
         
-        if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
-            file_size = os.path.getsize(local_path) / 1024  # размер в KB
-            print(f"  ✓ Скачан: {file_name} ({file_size:.1f} KB)")
+        if os.path.exists(partial_path) and os.path.getsize(partial_path) > 0:
+            # gdown не поддерживает условные запросы - сравниваем содержимое
+            status = _replace_file(state, file_name, partial_path, local_path, previous)
+            if status is None:
+                return None
+            _print_result(status, file_name, local_path)
             return local_path
         else:
+            _remove_partial(partial_path)
             return None
             
     except Exception as e:
         return None
 
 
-def download_file_by_link(download_link, file_name, download_dir=None):
+def download_file_by_link(download_link, file_name, download_dir=None, run=None):
     """
     Скачивание файла по прямой ссылке
     
     Аналогично download_file_by_id, но использует готовую ссылку
+    (gdown не поддерживает условные запросы - изменение файла
+    определяется по SHA-256 содержимого)
     """
     if download_dir is None:
-        # Путь относительно корня проекта
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        download_dir = os.path.join(base_dir, "data", "downloaded_files")
+        download_dir = default_download_dir()
+    if run is None:
+        run = DownloadRun()
     try:
         # Создаем папку для скачанных файлов
         os.makedirs(download_dir, exist_ok=True)
         
         local_path = os.path.join(download_dir, file_name)
+        partial_path = local_path + PARTIAL_SUFFIX
+        state = get_download_state(download_dir)
+        previous = _previous_copy(state, file_name, local_path)
+        
+        if run.expired():
+            run.record(file_name, deadline_exceeded=True)
+            print(f"  ✗ Истек срок скачивания: {file_name}")
+            return None
         
         print(f"  Скачивание: {file_name}...")
+        run.record(file_name, source='link')
         
         # Используем gdown (quiet=True для уменьшения вывода)
         try:
-            gdown.download(download_link, local_path, quiet=True, fuzzy=True)
+            gdown.download(download_link, partial_path, quiet=True, fuzzy=True)
         except Exception as gdown_error:
+            _remove_partial(partial_path)
             return None
         
-        if os.path.exists(local_path) and os.path.getsize(local_path) > 0:
-            file_size = os.path.getsize(local_path) / 1024
-            print(f"  ✓ Скачан: {file_name} ({file_size:.1f} KB)")
+        if os.path.exists(partial_path) and os.path.getsize(partial_path) > 0:
+            status = _replace_file(state, file_name, partial_path, local_path, previous)
+            if status is None:
+                return None
+            _print_result(status, file_name, local_path)
             return local_path
         else:
+            _remove_partial(partial_path)
             return None
             
     except Exception as e:
@@ -158,60 +423,131 @@ def download_file_by_link(download_link, file_name, download_dir=None):
         return None
 
 
-def download_target_files(download_dir=None):
+def target_downloads():
     """
-    Скачивание всех целевых файлов
+    Список файлов для скачивания в порядке из config.py
+
+    1. DOWNLOAD_LINKS (приоритет 1)
+    2. Если нет, FILE_IDS (приоритет 2)
+
+    Returns:
+        list: [(функция скачивания, ссылка или ID, имя файла), ...]
+    """
+    downloads = []
+    # Вариант 1: Используем прямые ссылки на скачивание
+    if DOWNLOAD_LINKS and any(DOWNLOAD_LINKS):
+        for i, link in enumerate(DOWNLOAD_LINKS):
+            if link and link.strip() and i < len(TARGET_FILES):
+                downloads.append((download_file_by_link, link.strip(), TARGET_FILES[i]))
+
+    # Вариант 2: Используем ID файлов
+    elif FILE_IDS and any(FILE_IDS):
+        for i, file_id in enumerate(FILE_IDS):
+            if file_id and file_id.strip() and i < len(TARGET_FILES):
+                # Извлекаем ID из URL, если это ссылка
+                clean_id = extract_file_id_from_url(file_id.strip())
+                downloads.append((download_file_by_id, clean_id, TARGET_FILES[i]))
+    return downloads
+
+
+def _download_one(download, source, file_name, download_dir, run):
+    """Скачивание одного файла: любая ошибка - файл пропускается (None)"""
+    started = time.monotonic()
+    try:
+        file_path = download(source, file_name, download_dir, run)
+    except Exception as e:
+        print(f"  ✗ Ошибка скачивания {file_name}: {e}")
+        file_path = None
+    status = get_download_state(download_dir).get(file_name).get('status') if file_path else 'failed'
+    run.record(file_name, status=status, latency_seconds=round(time.monotonic() - started, 3))
+    return file_path
+
+
+def download_files(downloads, download_dir, max_workers=None, run=None):
+    """
+    Параллельное скачивание файлов (генератор)
+
+    Args:
+        downloads: [(функция скачивания, ссылка или ID, имя файла), ...]
+            (см. target_downloads)
+        download_dir: папка для файлов
+        max_workers: сколько файлов скачивать одновременно
+            (по умолчанию DOWNLOAD_WORKERS, 1 - по очереди)
+        run: запуск скачивания (DownloadRun) - общий срок и метрики по файлам
+
+    Отдает пути к скачанным файлам в порядке downloads: следующий файл
+    отдается, как только скачаны он и все файлы перед ним. Нескачанные
+    файлы пропускаются.
+    """
+    if not downloads:
+        return
+    if max_workers is None:
+        max_workers = DOWNLOAD_WORKERS
+    max_workers = max(1, min(max_workers, len(downloads)))
+    if run is None:
+        run = DownloadRun()
+
+    pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+    futures = [
+        pool.submit(_download_one, download, source, file_name, download_dir, run)
+        for download, source, file_name in downloads
+    ]
+    try:
+        for future in futures:
+            file_path = future.result()
+            if file_path:
+                yield file_path
+    finally:
+        # Если файлы больше не нужны (генератор закрыт) - не начинаем новые скачивания
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=True)
+
+
+def iter_target_files(download_dir=None, max_workers=None, run=None):
+    """
+    Скачивание целевых файлов по одному (генератор)
     
     Логика работы:
-    1. Удаляет старые файлы из папки downloaded_files
-    2. Проверяет DOWNLOAD_LINKS (приоритет 1)
-    3. Если нет, проверяет FILE_IDS (приоритет 2)
-    4. Возвращает список путей к скачанным файлам
+    1. Удаляет из папки downloaded_files файлы, которых нет в списке
+       (прошлые копии нужных файлов остаются - для условных запросов)
+    2. Берет список файлов из config.py (target_downloads)
+    3. Скачивает до max_workers файлов одновременно (download_files)
+    4. Отдает путь к каждому файлу в порядке из config.py, сразу как он
+       скачан - файл можно парсить, пока скачиваются следующие
+    
+    run - запуск скачивания (DownloadRun): общий срок и метрики по файлам
     
     Требования:
     - В config.py должны быть указаны DOWNLOAD_LINKS или FILE_IDS
     - Файлы должны быть доступны по ссылке на Google Drive
     """
     if download_dir is None:
-        # Путь относительно корня проекта
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        download_dir = os.path.join(base_dir, "data", "downloaded_files")
+        download_dir = default_download_dir()
     # Создаем папку для скачанных файлов
     os.makedirs(download_dir, exist_ok=True)
     
-    # Удаляем старые файлы из папки
+    downloads = target_downloads()
+    keep = {file_name for _, _, file_name in downloads}
+    keep.add(DOWNLOAD_STATE_FILE)
+    
+    # Удаляем старые файлы, которых больше нет в списке (и недокачанные)
     try:
         for old_file in os.listdir(download_dir):
             old_path = os.path.join(download_dir, old_file)
-            if os.path.isfile(old_path):
+            if old_file not in keep and os.path.isfile(old_path):
                 os.remove(old_path)
                 print(f"  Удален старый файл: {old_file}")
     except Exception as e:
         pass
     
-    downloaded_files = []
-    
-    # Вариант 1: Используем прямые ссылки на скачивание
-    if DOWNLOAD_LINKS and any(DOWNLOAD_LINKS):
-        for i, link in enumerate(DOWNLOAD_LINKS):
-            if link and link.strip():
-                if i < len(TARGET_FILES):
-                    file_name = TARGET_FILES[i]
-                    file_path = download_file_by_link(link.strip(), file_name, download_dir)
-                    if file_path:
-                        downloaded_files.append(file_path)
-    
-    # Вариант 2: Используем ID файлов
-    elif FILE_IDS and any(FILE_IDS):
-        for i, file_id in enumerate(FILE_IDS):
-            if file_id and file_id.strip():
-                if i < len(TARGET_FILES):
-                    file_name = TARGET_FILES[i]
-                    # Извлекаем ID из URL, если это ссылка
-                    clean_id = extract_file_id_from_url(file_id.strip())
-                    file_path = download_file_by_id(clean_id, file_name, download_dir)
-                    if file_path:
-                        downloaded_files.append(file_path)
-    
-    return downloaded_files
+    yield from download_files(downloads, download_dir, max_workers, run)
+
 
+def download_target_files(download_dir=None, max_workers=None, run=None):
+    """
+    Скачивание всех целевых файлов
+    
+    Возвращает список путей к скачанным файлам (см. iter_target_files)
+    """
+    return list(iter_target_files(download_dir, max_workers, run))
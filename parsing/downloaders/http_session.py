@@ -0,0 +1,162 @@
+"""
+HTTP-ЗАПРОСЫ СКАЧИВАНИЯ
+=======================
+
+Раньше каждое скачивание открывало новое соединение (requests.get) и при
+временной ошибке сразу переходило к медленному gdown или файл пропускался
+до следующего запуска. Теперь:
+
+1. Все запросы идут через одну requests.Session (get_session) - соединения
+   с сервером переиспользуются (keep-alive), пул на DOWNLOAD_WORKERS потоков
+2. Ответы 429/5xx и сетевые ошибки повторяются (get_with_retry) до
+   DOWNLOAD_RETRIES раз; пауза растет экспоненциально
+   (DOWNLOAD_BACKOFF_SECONDS * 2^попытка, не больше DOWNLOAD_BACKOFF_MAX_SECONDS)
+   со случайным разбросом, чтобы потоки не повторяли запросы одновременно;
+   заголовок Retry-After учитывается
+3. У всего скачивания за запуск есть общий срок (DownloadRun,
+   DOWNLOAD_DEADLINE_SECONDS): таймауты и паузы не выходят за него, после
+   срока новые запросы не делаются
+
+DownloadRun собирает метрики по файлам (попытки, повторы, HTTP-статус,
+время) - конвейер сохраняет их в ParseLog.details.
+"""
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from config import (
+    DOWNLOAD_WORKERS, DOWNLOAD_TIMEOUT_SECONDS, DOWNLOAD_RETRIES,
+    DOWNLOAD_BACKOFF_SECONDS, DOWNLOAD_BACKOFF_MAX_SECONDS, DOWNLOAD_DEADLINE_SECONDS
+)
+
+# Ответы, после которых запрос повторяется
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class DownloadDeadlineExceeded(Exception):
+    """Истек общий срок скачивания (DOWNLOAD_DEADLINE_SECONDS)"""
+
+
+class DownloadRun:
+    """
+    Один запуск скачивания: общий срок и метрики по файлам
+
+    Метрики файла: attempts, retries, http_status, source, status,
+    latency_seconds, deadline_exceeded
+    """
+
+    def __init__(self, deadline_seconds=None):
+        if deadline_seconds is None:
+            deadline_seconds = DOWNLOAD_DEADLINE_SECONDS
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline_seconds if deadline_seconds else None
+        self.files = {}
+        self._lock = threading.Lock()
+
+    def remaining(self):
+        """Секунд до срока (None - без срока)"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.monotonic()
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def record(self, file_name, **fields):
+        with self._lock:
+            self.files.setdefault(file_name, {}).update(fields)
+
+    def count(self, file_name, name, value=1):
+        with self._lock:
+            metrics = self.files.setdefault(file_name, {})
+            metrics[name] = metrics.get(name, 0) + value
+
+    def metrics(self):
+        """Метрики для ParseLog.details"""
+        with self._lock:
+            files = {name: dict(metrics) for name, metrics in self.files.items()}
+        return {
+            "duration_seconds": round(time.monotonic() - self.started, 3),
+            "retries": sum(metrics.get('retries', 0) for metrics in files.values()),
+            "deadline_exceeded": any(metrics.get('deadline_exceeded') for metrics in files.values()),
+            "files": files,
+        }
+
+
+def get_session():
+    """Общая HTTP-сессия (одна на процесс, пул соединений на DOWNLOAD_WORKERS потоков)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            pool_size = max(1, DOWNLOAD_WORKERS)
+            # Повторы - в get_with_retry (с паузами и общим сроком)
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _backoff_delay(attempt, response=None):
+    """Пауза перед повтором: Retry-After или экспонента со случайным разбросом"""
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), DOWNLOAD_BACKOFF_MAX_SECONDS)
+    delay = min(DOWNLOAD_BACKOFF_MAX_SECONDS, DOWNLOAD_BACKOFF_SECONDS * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def get_with_retry(url, run, file_name, headers=None):
+    """
+    GET-запрос (stream=True) с повторами при 429/5xx и сетевых ошибках
+
+    Попытки и повторы учитываются в run (метрики файла file_name).
+    Если повторы закончились - возвращается последний ответ (или
+    пробрасывается последняя сетевая ошибка).
+
+    Raises:
+        DownloadDeadlineExceeded: истек общий срок скачивания
+    """
+    attempt = 0
+    while True:
+        remaining = run.remaining()
+        if remaining is not None and remaining <= 0:
+            run.record(file_name, deadline_exceeded=True)
+            raise DownloadDeadlineExceeded(f"истек срок скачивания ({DOWNLOAD_DEADLINE_SECONDS:g} сек)")
+        timeout = DOWNLOAD_TIMEOUT_SECONDS if remaining is None else min(DOWNLOAD_TIMEOUT_SECONDS, remaining)
+
+        run.count(file_name, 'attempts')
+        error = None
+        response = None
+        try:
+            response = get_session().get(
+                url, headers=headers, allow_redirects=True, timeout=timeout, stream=True
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            error = e
+
+        if response is not None and response.status_code not in RETRY_STATUSES:
+            return response
+
+        delay = _backoff_delay(attempt, response)
+        remaining = run.remaining()
+        if attempt >= DOWNLOAD_RETRIES or (remaining is not None and delay >= remaining):
+            if response is not None:
+                return response
+            raise error
+
+        if response is not None:
+            response.close()
+        run.count(file_name, 'retries')
+        time.sleep(delay)
+        attempt += 1
@@ -0,0 +1,168 @@
+"""
+ИСТОЧНИКИ ФАЙЛОВ ДЛЯ ЗАГРУЗКИ
+=============================
+
+Конвейер (pipeline.py) получает файлы от источника (INGEST_SOURCE):
+
+- GoogleDriveSource ("google_drive") - скачивание файлов из config.py
+  (google_drive.py); запуск - по расписанию
+- LocalDirectorySource ("local") - файлы .xlsx из папки LOCAL_SOURCE_DIR
+  (например, синхронизируемой с диском); кроме запуска по расписанию,
+  папка отслеживается (watcher.py) и измененный файл парсится через
+  несколько секунд после появления - без ожидания следующего часа
+
+Источник отдает:
+- iter_files() - пути ко всем файлам для обычного запуска
+- file_names() - имена всех файлов источника (нужны конвейеру, чтобы
+  понять, какие группы собираются из нескольких файлов)
+- related_files(paths) - файлы для частичного запуска: измененные файлы
+  и все файлы тех же групп (группа записывается целиком из всех своих файлов)
+- watch(stop) - наборы измененных файлов (только для отслеживаемых источников)
+- metrics() - метрики последнего iter_files() (для ParseLog.details)
+
+Функции:
+- get_source() - источник по настройкам (INGEST_SOURCE)
+"""
+
+import os
+
+from config import INGEST_SOURCE, LOCAL_SOURCE_DIR
+from downloaders.google_drive import iter_target_files, target_downloads, default_download_dir
+from downloaders.http_session import DownloadRun
+from downloaders.watcher import DirectoryWatcher
+from parsers.excel_parser import group_name_from_file
+
+# Расширения файлов журналов
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm', '.xslm')
+
+
+def is_workbook_name(file_name):
+    """Файл журнала (не временный файл Excel '~$...' и не скрытый файл)"""
+    return (
+        file_name.lower().endswith(WORKBOOK_EXTENSIONS)
+        and not file_name.startswith(('~$', '.'))
+    )
+
+
+class IngestSource:
+    """Источник файлов для конвейера"""
+
+    name = None
+    watchable = False  # поддерживает watch()
+
+    def describe(self):
+        """Описание источника для логов"""
+        return self.name
+
+    def iter_files(self):
+        raise NotImplementedError
+
+    def file_names(self):
+        raise NotImplementedError
+
+    def related_files(self, paths):
+        """
+        Файлы для частичного запуска: paths и остальные файлы их групп
+        (в порядке источника)
+        """
+        groups = {group_name_from_file(os.path.basename(path)) for path in paths}
+        wanted = set(paths)
+        return [
+            path for path in self._all_paths()
+            if path in wanted or group_name_from_file(os.path.basename(path)) in groups
+        ]
+
+    def _all_paths(self):
+        raise NotImplementedError
+
+    def watch(self, stop):
+        raise NotImplementedError(f"Источник {self.name} не отслеживает изменения")
+
+    def metrics(self):
+        return None
+
+
+class GoogleDriveSource(IngestSource):
+    """Файлы Google Drive из config.py (FILE_IDS / DOWNLOAD_LINKS)"""
+
+    name = "google_drive"
+
+    def __init__(self, download_dir=None, max_workers=None):
+        self.download_dir = download_dir or default_download_dir()
+        self.max_workers = max_workers
+        self._run = None
+
+    def describe(self):
+        return "Google Drive"
+
+    def iter_files(self):
+        self._run = DownloadRun()
+        return iter_target_files(self.download_dir, self.max_workers, self._run)
+
+    def file_names(self):
+        return [file_name for _, _, file_name in target_downloads()]
+
+    def _all_paths(self):
+        # Частичный запуск (related_files) - по уже скачанным файлам
+        paths = [os.path.join(self.download_dir, file_name) for file_name in self.file_names()]
+        return [path for path in paths if os.path.isfile(path)]
+
+    def metrics(self):
+        return self._run.metrics() if self._run is not None else None
+
+
+class LocalDirectorySource(IngestSource):
+    """Файлы журналов из локальной папки (LOCAL_SOURCE_DIR)"""
+
+    name = "local"
+    watchable = True
+
+    def __init__(self, path=None, watch_backend=None):
+        self.path = os.path.abspath(path or LOCAL_SOURCE_DIR)
+        self.watch_backend = watch_backend
+
+    def describe(self):
+        return f"папка {self.path}"
+
+    def _all_paths(self):
+        try:
+            names = sorted(name for name in os.listdir(self.path) if is_workbook_name(name))
+        except OSError:
+            return []
+        return [
+            os.path.join(self.path, name) for name in names
+            if os.path.isfile(os.path.join(self.path, name))
+        ]
+
+    def iter_files(self):
+        return iter(self._all_paths())
+
+    def file_names(self):
+        return [os.path.basename(path) for path in self._all_paths()]
+
+    def watch(self, stop):
+        """
+        Генератор списков путей измененных файлов, пока не установлен stop
+        """
+        os.makedirs(self.path, exist_ok=True)
+        watcher = DirectoryWatcher(self.path, accept=is_workbook_name, backend=self.watch_backend)
+        print(f"👀 [PARSER] Отслеживание изменений: {self.path} ({watcher.backend.name})", flush=True)
+        try:
+            for names in watcher.changes(stop):
+                yield [os.path.join(self.path, name) for name in sorted(names)]
+        finally:
+            watcher.close()
+
+
+SOURCES = {
+    GoogleDriveSource.name: GoogleDriveSource,
+    LocalDirectorySource.name: LocalDirectorySource,
+}
+
+
+def get_source(name=None):
+    """Источник файлов по названию (по умолчанию INGEST_SOURCE)"""
+    name = name or INGEST_SOURCE
+    if name not in SOURCES:
+        raise ValueError(f"Неизвестный источник файлов: {name} (доступны: {', '.join(SOURCES)})")
+    return SOURCES[name]()
@@ -0,0 +1,169 @@
+"""
+ОТСЛЕЖИВАНИЕ ИЗМЕНЕНИЙ ФАЙЛОВ В ПАПКЕ
+====================================
+
+DirectoryWatcher сообщает, какие файлы папки появились или изменились:
+
+1. inotify (Linux, через ctypes - без дополнительных библиотек): события
+   IN_CLOSE_WRITE / IN_MOVED_TO приходят, когда файл дописан или перемещен
+   в папку (так сохраняют файлы Excel и программы синхронизации)
+2. Если inotify недоступен - опрос папки раз в WATCH_POLL_SECONDS
+   (сравнение времени изменения и размера файлов)
+
+Изменения собираются, пока в папке есть активность: набор файлов отдается,
+когда WATCH_SETTLE_SECONDS не было новых событий (файл, который еще
+пишется, не попадет в парсинг недописанным).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+from config import WATCH_BACKEND, WATCH_POLL_SECONDS, WATCH_SETTLE_SECONDS
+
+# Флаги inotify (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+# struct inotify_event: int wd; uint32 mask, cookie, len; char name[len]
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _InotifyBackend:
+    """События файлов папки через inotify (Linux)"""
+
+    name = "inotify"
+
+    def __init__(self, path):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify недоступен")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch")
+
+    def wait(self, timeout):
+        """Имена файлов с событиями за время ожидания (пустое множество - событий не было)"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _PollingBackend:
+    """Изменения файлов папки опросом (время изменения и размер)"""
+
+    name = "poll"
+
+    def __init__(self, path, interval=None):
+        self.path = path
+        self.interval = interval or WATCH_POLL_SECONDS
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        try:
+            with os.scandir(self.path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            snapshot[entry.name] = (stat.st_mtime_ns, stat.st_size)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return snapshot
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {
+            name for name, signature in snapshot.items()
+            if self.snapshot.get(name) != signature
+        }
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class DirectoryWatcher:
+    """
+    Появившиеся и измененные файлы папки
+
+    accept - функция имя файла -> bool (какие файлы учитывать)
+    backend - "inotify", "poll" или "auto" (inotify, если доступен);
+    по умолчанию WATCH_BACKEND
+    """
+
+    def __init__(self, path, accept=None, backend=None):
+        self.path = path
+        self.accept = accept or (lambda name: True)
+        backend = backend or WATCH_BACKEND
+        self.backend = None
+        if backend in ("auto", "inotify"):
+            try:
+                self.backend = _InotifyBackend(path)
+            except (OSError, AttributeError) as e:
+                if backend == "inotify":
+                    raise
+                print(f"⚠️ inotify недоступен ({e}), изменения папки проверяются опросом", flush=True)
+        if self.backend is None:
+            self.backend = _PollingBackend(path)
+
+    def changes(self, stop, settle_seconds=None):
+        """
+        Генератор наборов измененных файлов (множества имен), пока не
+        установлен stop (threading.Event)
+
+        Набор отдается, когда settle_seconds не было новых событий
+        """
+        if settle_seconds is None:
+            settle_seconds = WATCH_SETTLE_SECONDS
+        pending = set()
+        last_event = None
+        while not stop.is_set():
+            timeout = 1.0 if not pending else max(0.05, settle_seconds - (time.monotonic() - last_event))
+            names = {name for name in self.backend.wait(timeout) if self.accept(name)}
+            if names:
+                pending |= names
+                last_event = time.monotonic()
+                continue
+            if pending and time.monotonic() - last_event >= settle_seconds:
+                ready = {name for name in pending if os.path.isfile(os.path.join(self.path, name))}
+                pending = set()
+                if ready:
+                    yield ready
+
+    def close(self):
+        self.backend.close()
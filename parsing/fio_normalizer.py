@@ -0,0 +1,124 @@
+"""
+НОРМАЛИЗАЦИЯ ФИО
+================
+
+Единая реализация для парсера, API и Telegram бота: ключи студентов при
+парсинге, поиске и регистрации должны совпадать байт в байт.
+
+Логика:
+- Регулярное выражение компилируется один раз при импорте
+- Результаты кэшируются (LRU): в журнале одни и те же ФИО повторяются
+  на каждой вкладке, а сохранение в БД нормализует их повторно
+
+Функции:
+- normalize_fio_to_initials() - преобразует ФИО в формат "Фамилия И.О."
+
+Микробенчмарк (без кэша / с кэшем):
+    python fio_normalizer.py
+"""
+
+import re
+from functools import lru_cache
+
+# ФИО уже в формате "Фамилия И.О." или "Фамилия И.О"
+FIO_INITIALS_PATTERN = re.compile(r'^[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.\s*[А-ЯЁ]?\.?$')
+
+# Размер кэша: с запасом на все ФИО всех групп
+FIO_CACHE_SIZE = 8192
+
+
+def _normalize_fio_to_initials(fio: str) -> str:
+    """Нормализация без кэша (см. normalize_fio_to_initials)"""
+    # Убираем лишние пробелы
+    fio = ' '.join(fio.strip().split())
+
+    # Если уже в формате "Фамилия И.О." или "Фамилия И.О", оставляем как есть
+    if FIO_INITIALS_PATTERN.match(fio):
+        return fio
+
+    # Разбиваем на части
+    parts = fio.split()
+
+    if len(parts) == 0:
+        return fio
+
+    # Фамилия - первая часть
+    surname = parts[0]
+
+    # Имя - вторая часть (если есть)
+    if len(parts) >= 2:
+        first_name_initial = parts[1][0].upper() if parts[1] else ''
+    else:
+        first_name_initial = ''
+
+    # Отчество - третья часть (если есть)
+    if len(parts) >= 3:
+        last_name_initial = parts[2][0].upper() if parts[2] else ''
+    else:
+        last_name_initial = ''
+
+    # Формируем результат
+    if first_name_initial and last_name_initial:
+        return f"{surname} {first_name_initial}.{last_name_initial}."
+    elif first_name_initial:
+        return f"{surname} {first_name_initial}."
+    else:
+        return surname
+
+
+_normalize_cached = lru_cache(maxsize=FIO_CACHE_SIZE)(_normalize_fio_to_initials)
+
+
+def normalize_fio_to_initials(fio: str) -> str:
+    """
+    Преобразует ФИО в формат "Фамилия И.О."
+
+    Примеры:
+    - "Иванов Иван Иванович" -> "Иванов И.И."
+    - "Петров Петр" -> "Петров П."
+    - "Сидоров С.С." -> "Сидоров С.С." (уже в нужном формате)
+    - "Ельченинов Владислав Антонович" -> "Ельченинов В.А."
+
+    Args:
+        fio: Полное ФИО или ФИО в любом формате
+
+    Returns:
+        str: ФИО в формате "Фамилия И.О."
+    """
+    if not fio:
+        return fio
+    return _normalize_cached(fio)
+
+
+def benchmark(iterations: int = 200000):
+    """
+    Микробенчмарк: пропускная способность без кэша и с кэшем
+
+    Набор ФИО повторяется, как в реальном журнале (одна группа - десятки ФИО
+    на каждой вкладке).
+    """
+    import time
+
+    sample = [
+        "Иванов Иван Иванович", "Петров  Петр", "Сидоров С.С.",
+        "Ельченинов Владислав Антонович", "Петров-Водкин Кузьма Сергеевич",
+        "Кузнецова Анна Олеговна", "Смирнов А.И.", "Федоров  Дмитрий  Петрович",
+    ] * 4
+    values = [sample[i % len(sample)] for i in range(iterations)]
+
+    results = {}
+    for name, func in (("без кэша", _normalize_fio_to_initials), ("с кэшем", normalize_fio_to_initials)):
+        _normalize_cached.cache_clear()
+        start = time.perf_counter()
+        for value in values:
+            func(value)
+        elapsed = time.perf_counter() - start
+        results[name] = iterations / elapsed
+        print(f"{name:>10}: {results[name]:,.0f} ФИО/сек ({elapsed * 1000:.1f} мс на {iterations:,})")
+
+    print(f"Ускорение: x{results['с кэшем'] / results['без кэша']:.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
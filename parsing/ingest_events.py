@@ -0,0 +1,207 @@
+"""
+СОБЫТИЯ ЗАВЕРШЕНИЯ ПАРСИНГА
+===========================
+
+Запуск парсинга, который изменил данные в БД, получает номер поколения
+(generation, job_runner.py) и рассылает событие:
+
+    {"event": "ingest_finished", "generation": N, "groups": [...], "finished": "..."}
+
+Внутри процесса событие получают подписчики (subscribe) - например, кэши
+API, которые нужно сбросить после обновления данных.
+
+Если парсер, API и бот работают в отдельных процессах (START_MODE=processes,
+process_supervisor.py), события передаются через каналы (multiprocessing Pipe)
+к супервизору, а он пересылает их остальным процессам:
+
+    парсер --ProcessChannel--> супервизор --ProcessChannel--> API, бот
+
+Процессы, которые не связаны с парсером каналом (воркеры uvicorn при
+API_WORKERS > 1), узнают о новом поколении по файлу-метке
+INGEST_GENERATION_FILE: парсер записывает в него номер поколения, а
+check_generation() на каждый запрос API проверяет время изменения файла
+(os.stat) и, если поколение выросло, оповещает подписчиков своего процесса.
+
+Функции:
+- subscribe(callback) - callback(event) для каждого события в этом процессе
+- publish(event) - оповестить подписчиков этого процесса
+- write_generation_stamp(generation) - записать файл-метку поколения
+- check_generation() - проверить файл-метку (дешево, на каждый запрос)
+- ProcessChannel - канал процесса к супервизору
+"""
+
+import os
+import signal
+import threading
+
+# config.py парсера - через database (в процессе бота "config" - конфигурация бота)
+from database import parsing_config
+
+INGEST_GENERATION_FILE = parsing_config.INGEST_GENERATION_FILE
+
+INGEST_FINISHED = "ingest_finished"
+
+_subscribers = []
+_subscribers_lock = threading.Lock()
+# Последнее поколение, о котором знают подписчики этого процесса
+_known_generation = None
+
+
+def subscribe(callback):
+    """Подписка на события этого процесса: callback(event)"""
+    with _subscribers_lock:
+        _subscribers.append(callback)
+    return callback
+
+
+def unsubscribe(callback):
+    with _subscribers_lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+def publish(event):
+    """Оповещает подписчиков этого процесса (ошибка подписчика не мешает остальным)"""
+    global _known_generation
+    with _subscribers_lock:
+        generation = event.get("generation")
+        if generation is not None:
+            _known_generation = max(_known_generation or 0, generation)
+        callbacks = list(_subscribers)
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception as e:
+            print(f"⚠️ Ошибка обработчика события {event.get('event')}: {e}", flush=True)
+
+
+def known_generation():
+    """Последнее поколение данных, известное этому процессу (None - неизвестно)"""
+    if _known_generation is None:
+        check_generation()
+    return _known_generation
+
+
+def write_generation_stamp(generation, path=None):
+    """Записывает номер поколения в файл-метку (атомарно)"""
+    path = path or INGEST_GENERATION_FILE
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(str(generation))
+    os.replace(tmp_path, path)
+
+
+class _GenerationStamp:
+    """Файл-метка поколения: содержимое читается, только если файл изменился"""
+
+    _UNSET = object()
+
+    def __init__(self, path):
+        self.path = path
+        self.signature = self._UNSET
+        self.lock = threading.Lock()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None  # парсер еще не записывал метку
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def check(self):
+        global _known_generation
+        signature = self._signature()
+        if signature == self.signature:
+            return None
+        with self.lock:
+            if signature == self.signature:
+                return None
+            first_check = self.signature is self._UNSET
+            generation = None
+            if signature is not None:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        generation = int(f.read().strip() or 0)
+                except (OSError, ValueError):
+                    return None
+            self.signature = signature
+        if generation is None:
+            return None
+        if first_check and _known_generation is None:
+            # Процесс только запущен - кэши еще пусты, сбрасывать нечего
+            _known_generation = generation
+            return None
+        if generation > (_known_generation or 0):
+            publish({"event": INGEST_FINISHED, "generation": generation, "relayed": True})
+            return generation
+        return None
+
+
+_stamp = None
+
+
+def check_generation():
+    """
+    Проверяет файл-метку INGEST_GENERATION_FILE; если поколение выросло -
+    оповещает подписчиков этого процесса (сброс кэшей)
+
+    Обычно стоит один os.stat(), поэтому вызывается на каждый запрос API
+
+    Returns:
+        int или None: новое поколение (None - не изменилось)
+    """
+    global _stamp
+    if _stamp is None:
+        _stamp = _GenerationStamp(INGEST_GENERATION_FILE)
+    return _stamp.check()
+
+
+class ProcessChannel:
+    """
+    Канал процесса к супервизору (конец multiprocessing Pipe)
+
+    - forward_events() - отправлять супервизору события этого процесса
+      (процесс парсера)
+    - listen() - получать события от супервизора и передавать подписчикам
+      этого процесса (процессы API и бота); если супервизор завершился
+      (канал закрыт), процесс завершается - без супервизора его никто не
+      перезапустит и не остановит
+    """
+
+    def __init__(self, conn, name=None):
+        self.conn = conn
+        self.name = name
+        self._send_lock = threading.Lock()
+
+    def send(self, event):
+        with self._send_lock:
+            try:
+                self.conn.send(event)
+            except (OSError, EOFError, BrokenPipeError):
+                pass
+
+    def forward_events(self):
+        def forward(event):
+            # События, полученные от супервизора, обратно не отправляются
+            if not event.get("relayed"):
+                self.send(event)
+        subscribe(forward)
+
+    def listen(self):
+        thread = threading.Thread(target=self._listen, name=f"{self.name or 'process'}-events", daemon=True)
+        thread.start()
+        return thread
+
+    def _listen(self):
+        while True:
+            try:
+                event = self.conn.recv()
+            except (OSError, EOFError):
+                # Супервизор завершился
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+            if isinstance(event, dict):
+                publish(dict(event, relayed=True))
@@ -0,0 +1,376 @@
+"""
+ЗАПУСК ПАРСИНГА ПО РАСПИСАНИЮ И ПО ЗАПРОСУ
+==========================================
+
+Раньше парсинг запускался через schedule.every().hour.at(":00") с
+проверкой раз в минуту (time.sleep(60)): запуск опаздывал до минуты,
+запуски могли накладываться, а запустить парсинг вне расписания было нельзя.
+
+JobRunner:
+1. Запускает задачу по расписанию: раз в PARSE_INTERVAL_MINUTES (в начале
+   интервала, если PARSE_ALIGN_TO_INTERVAL) плюс случайная задержка
+   0..PARSE_JITTER_SECONDS; ждет точно до нужного времени
+2. Запускает задачу сразу по запросу (trigger): из этого процесса
+   (отслеживание папки) или из другого (request_run() - файл-запрос
+   INGEST_TRIGGER_FILE, например из API)
+3. Запуски не накладываются: задача выполняется в одном потоке, а между
+   процессами - под блокировкой файла (fcntl, где доступен)
+4. Повторные запросы объединяются: пока задача выполняется или ждет,
+   все запросы превращаются в один следующий запуск (полный запуск
+   поглощает частичные, списки файлов частичных объединяются)
+5. Сохраняет состояние (выполняется ли задача, длительность прошлого
+   запуска, время следующего) в INGEST_STATE_FILE - read_state()
+6. Запуск, который изменил данные (задача вернула непустой результат),
+   получает следующий номер поколения (generation); номер записывается в
+   INGEST_GENERATION_FILE, событие "ingest_finished" рассылается
+   подписчикам (ingest_events.py)
+
+Функции:
+- read_state() - состояние запусков (для API)
+- request_run() - запрос внеочередного запуска
+"""
+
+import json
+import os
+import random
+import threading
+import time
+import traceback
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from ingest_events import INGEST_FINISHED, publish, write_generation_stamp
+from config import (
+    PARSE_INTERVAL_MINUTES, PARSE_ALIGN_TO_INTERVAL, PARSE_JITTER_SECONDS,
+    INGEST_STATE_FILE, INGEST_TRIGGER_FILE
+)
+
+# Как часто ожидающий JobRunner проверяет файл-запрос (сек)
+TRIGGER_POLL_SECONDS = 1.0
+
+# JobRunner этого процесса (request_run будит его сразу)
+_active_runner = None
+
+
+def _iso(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds')
+
+
+def _write_json(path, data):
+    """Атомарная запись JSON (через временный файл)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class _Request:
+    """Запрос запуска (несколько запросов объединяются в один)"""
+
+    def __init__(self):
+        self.reasons = []
+        self.paths = set()  # None - полный запуск
+        self.triggers = 0
+
+    def add(self, reason, paths=None):
+        if reason not in self.reasons:
+            self.reasons.append(reason)
+        if paths is None or self.paths is None:
+            self.paths = None
+        else:
+            self.paths.update(paths)
+        self.triggers += 1
+
+    def to_dict(self):
+        return {
+            "reasons": self.reasons,
+            "paths": sorted(self.paths) if self.paths is not None else None,
+            "triggers": self.triggers,
+        }
+
+
+class JobRunner:
+    """
+    Запуск задачи job(paths) по расписанию и по запросу
+
+    paths - None для полного запуска или список файлов для частичного;
+    job возвращает измененные данные (например, список обновленных групп) -
+    непустой результат означает новое поколение данных
+    """
+
+    def __init__(self, job, name="ingest", interval_seconds=None, jitter_seconds=None,
+                 align=None, state_file=None, trigger_file=None):
+        self.job = job
+        self.name = name
+        self.interval_seconds = interval_seconds if interval_seconds is not None else PARSE_INTERVAL_MINUTES * 60
+        self.jitter_seconds = jitter_seconds if jitter_seconds is not None else PARSE_JITTER_SECONDS
+        self.align = align if align is not None else PARSE_ALIGN_TO_INTERVAL
+        self.state_file = state_file or INGEST_STATE_FILE
+        self.trigger_file = trigger_file or INGEST_TRIGGER_FILE
+
+        self._cond = threading.Condition()
+        self._pending = None  # _Request
+        self._current = None  # {'reasons', 'paths', 'started'}
+        self._last = None  # итог прошлого запуска
+        self.next_run = None  # время следующего запуска по расписанию (time.time())
+        self.runs = 0
+        # Номер поколения данных (продолжается после перезапуска)
+        previous = read_state(self.state_file) or {}
+        self.generation = previous.get("generation") or 0
+
+    # --- Запросы ---
+
+    def trigger(self, reason="manual", paths=None):
+        """
+        Запрос запуска (сразу, как только завершится текущий запуск)
+
+        Returns:
+            dict: {'running', 'coalesced'} - выполняется ли задача сейчас и
+            объединен ли запрос с уже ожидающим
+        """
+        with self._cond:
+            coalesced = self._pending is not None
+            if self._pending is None:
+                self._pending = _Request()
+            self._pending.add(reason, paths)
+            running = self._current is not None
+            self._cond.notify_all()
+        self._save_state()
+        return {"running": running, "coalesced": coalesced}
+
+    def _check_trigger_file(self):
+        """Забирает запрос из файла INGEST_TRIGGER_FILE (от другого процесса)"""
+        if not os.path.exists(self.trigger_file):
+            return
+        claimed = f"{self.trigger_file}.{os.getpid()}.claimed"
+        try:
+            os.replace(self.trigger_file, claimed)
+        except OSError:
+            return
+        request = _read_json(claimed) or {}
+        try:
+            os.remove(claimed)
+        except OSError:
+            pass
+        for reason in request.get("reasons") or ["request"]:
+            self.trigger(reason, request.get("paths"))
+
+    # --- Расписание ---
+
+    def _schedule_next(self, now=None):
+        now = now or time.time()
+        interval = max(1.0, self.interval_seconds)
+        if self.align:
+            base = (now // interval + 1) * interval
+        else:
+            base = now + interval
+        jitter = random.uniform(0, self.jitter_seconds) if self.jitter_seconds > 0 else 0.0
+        self.next_run = base + jitter
+
+    def _wait_for_request(self, stop):
+        """Ждет запроса или времени запуска по расписанию; None - остановлен"""
+        with self._cond:
+            while not stop.is_set():
+                if self._pending is not None:
+                    break
+                now = time.time()
+                if now >= self.next_run:
+                    self._pending = _Request()
+                    self._pending.add("schedule")
+                    break
+                self._cond.wait(timeout=min(TRIGGER_POLL_SECONDS, self.next_run - now))
+                self._check_trigger_file()
+            else:
+                return None
+            request, self._pending = self._pending, None
+            if "schedule" in request.reasons:
+                self._schedule_next()
+            self._current = {
+                "reasons": request.reasons,
+                "paths": sorted(request.paths) if request.paths is not None else None,
+                "triggers": request.triggers,
+                "started": time.time(),
+            }
+            return request
+
+    # --- Запуск ---
+
+    def run_forever(self, stop=None, run_immediately=True):
+        """
+        Основной цикл (блокирующий): ждет запроса или расписания и выполняет
+        задачу; завершается, когда установлен stop (threading.Event)
+        """
+        global _active_runner
+        stop = stop or threading.Event()
+        _active_runner = self
+        self._schedule_next()
+        if run_immediately:
+            self.trigger("startup")
+        try:
+            while not stop.is_set():
+                request = self._wait_for_request(stop)
+                if request is None:
+                    break
+                self._run(request)
+        finally:
+            if _active_runner is self:
+                _active_runner = None
+
+    def _run(self, request):
+        self._save_state()
+        started = time.monotonic()
+        status = "success"
+        error = None
+        result = None
+        lock = self._acquire_process_lock()
+        if lock is False:
+            status = "skipped"
+            error = "задача уже выполняется в другом процессе"
+        else:
+            try:
+                result = self.job(sorted(request.paths) if request.paths is not None else None)
+            except Exception as e:
+                status = "error"
+                error = str(e)
+                traceback.print_exc()
+            finally:
+                self._release_process_lock(lock)
+
+        duration = time.monotonic() - started
+        event = None
+        with self._cond:
+            if status == "success" and result:
+                self.generation += 1
+                event = {
+                    "event": INGEST_FINISHED,
+                    "generation": self.generation,
+                    "groups": list(result) if isinstance(result, (list, tuple, set)) else None,
+                    "finished": _iso(time.time()),
+                }
+            self._last = {
+                "reasons": request.reasons,
+                "paths": self._current["paths"],
+                "triggers": request.triggers,
+                "started": _iso(self._current["started"]),
+                "finished": _iso(time.time()),
+                "duration_seconds": round(duration, 3),
+                "status": status,
+                "error": error,
+                "generation": self.generation if event else None,
+            }
+            self._current = None
+            self.runs += 1
+        self._save_state()
+        if event:
+            try:
+                write_generation_stamp(self.generation)
+            except OSError as e:
+                print(f"⚠️ Не удалось записать метку поколения: {e}", flush=True)
+            publish(event)
+
+    def _acquire_process_lock(self):
+        """Блокировка между процессами: файл, None - без блокировки, False - занято"""
+        if fcntl is None:
+            return None
+        try:
+            handle = open(self.state_file + ".lock", 'a')
+        except OSError:
+            return None
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        return handle
+
+    @staticmethod
+    def _release_process_lock(handle):
+        if handle:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+            handle.close()
+
+    # --- Состояние ---
+
+    def state(self):
+        """Состояние запусков"""
+        with self._cond:
+            current = None
+            if self._current is not None:
+                current = dict(self._current)
+                current["running_seconds"] = round(time.time() - current["started"], 1)
+                current["started"] = _iso(current["started"])
+            return {
+                "name": self.name,
+                "pid": os.getpid(),
+                "running": self._current is not None,
+                "current": current,
+                "pending": self._pending.to_dict() if self._pending is not None else None,
+                "last_run": self._last,
+                "next_run": _iso(self.next_run),
+                "interval_seconds": self.interval_seconds,
+                "jitter_seconds": self.jitter_seconds,
+                "runs": self.runs,
+                "generation": self.generation,
+                "updated": _iso(time.time()),
+            }
+
+    def _save_state(self):
+        try:
+            _write_json(self.state_file, self.state())
+        except OSError:
+            pass
+
+
+def read_state(state_file=None):
+    """
+    Состояние запусков (из INGEST_STATE_FILE - работает и в другом процессе)
+
+    Returns:
+        dict или None (парсер еще не запускался)
+    """
+    return _read_json(state_file or INGEST_STATE_FILE)
+
+
+def request_run(reason="request", paths=None, trigger_file=None):
+    """
+    Запрос внеочередного запуска парсинга (из любого процесса)
+
+    Запрос записывается в INGEST_TRIGGER_FILE (повторные запросы до запуска
+    объединяются); JobRunner этого процесса запускает задачу сразу,
+    JobRunner другого процесса - в течение TRIGGER_POLL_SECONDS
+
+    Returns:
+        dict: объединенный запрос {'reasons', 'paths', 'triggers'}
+    """
+    trigger_file = trigger_file or INGEST_TRIGGER_FILE
+    runner = _active_runner
+    if runner is not None and os.path.abspath(runner.trigger_file) == os.path.abspath(trigger_file):
+        runner.trigger(reason, paths)
+        return runner.state()["pending"] or {"reasons": [reason], "paths": paths, "triggers": 1}
+
+    request = _Request()
+    existing = _read_json(trigger_file)
+    if existing:
+        request.reasons = list(existing.get("reasons") or [])
+        request.paths = set(existing["paths"]) if existing.get("paths") is not None else None
+        request.triggers = existing.get("triggers", 0)
+    request.add(reason, paths)
+    _write_json(trigger_file, request.to_dict())
+    return request.to_dict()
@@ -3,14 +3,19 @@
 ========================
 
 Логика работы:
-1. Скачивает файлы с Google Drive
+1. Скачивает файлы с Google Drive (или берет из локальной папки -
+   источник INGEST_SOURCE, downloaders/sources.py)
 2. Парсит Excel файлы (извлечение данных о студентах, оценках, датах)
 3. Удаляет старые данные для обновляемых групп
 4. Сохраняет новые данные в БД
+   (шаги 1-4 - конвейер pipeline.py: группа записывается сразу после
+   парсинга всех своих файлов, одной транзакцией)
 5. Сохраняет информацию о парсинге в таблицу ParseLog
 6. Выводит сообщение о завершении парсинга в консоль
 7. Автоматически обновляется раз в час
-   (в 00 минут каждого часа)
+   (в 00 минут каждого часа - job_runner.py); локальная папка к тому же
+   отслеживается - измененный файл парсится сразу; внеочередной запуск -
+   POST /api/ingest/run
 
 Точка входа: main()
 """
@@ -19,227 +24,45 @@ import os
 import sys
 import re
 import json
-import schedule
-import time
+import threading
 from datetime import datetime, timedelta
 
 # Добавляем папку parsing в путь для импортов
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from database import init_db, get_db, Group, Student, Subject, Grade, Topic, ParseLog
-from downloaders.google_drive import download_target_files
-from parsers.excel_parser import parse_excel_file
+from database import init_db, get_db, ParseLog
+from db_writer import prepare_group, write_group
+from pipeline import run_pipeline
+from downloaders.sources import get_source
+from job_runner import JobRunner
+from read_model import publish_snapshot, remove_snapshot, READ_MODEL_ENABLED, READ_MODEL_FILE
 from logger import log_parser_info, log_parser_error
 
 
 def save_to_database(parsed_data_per_file):
     """
-    Сохраняет распарсенные данные в БД
+    Сохраняет распарсенные данные в БД (одной транзакцией)
+    
+    parsed_data_per_file: {имя_файла: [SheetBatch, ...]} (см. parse_excel_batches)
     
     Логика:
     1. Собирает все группы, которые будут обновлены
-    2. Удаляет все старые данные (оценки, студентов, предметы) для этих групп
-    3. Сохраняет новые данные
+    2. Для каждой группы проверяет данные и убирает дубликаты (prepare_group)
+    3. Удаляет старые данные группы и сохраняет новые (write_group)
+    
+    Обычный запуск парсинга использует конвейер (pipeline.py), который
+    записывает каждую группу сразу после парсинга.
     """
     db = get_db()
     try:
-        # Заголовки, которые не являются студентами
-        header_keywords = [
-            'месяц/число', 'фио обучающихся', 'фио', 'кол-во часов', 
-            'количество часов', 'часы', 'студент', 'обучающийся'
-        ]
-        
-        def is_valid_student(fio):
-            """Проверяет, является ли запись валидным студентом"""
-            if not fio:
-                return False
-            fio_lower = str(fio).lower().strip()
-            if any(keyword in fio_lower for keyword in header_keywords):
-                return False
-            if len(fio_lower) < 3:
-                return False
-            return True
+        # Группируем вкладки по группам
+        groups_data = {}  # группа -> [SheetBatch, ...]
+        for file_name, batches in parsed_data_per_file.items():
+            for batch in batches or []:
+                groups_data.setdefault(batch.group, []).append(batch)
         
-        # Сначала собираем все группы, которые будут обновлены
-        groups_to_update = set()
-        groups_data = {}
-        
-        for file_name, all_data in parsed_data_per_file.items():
-            if not all_data:
-                continue
-            
-            # Группируем данные по группам
-            for item in all_data:
-                group_name = item['group']
-                groups_to_update.add(group_name)
-                
-                if group_name not in groups_data:
-                    groups_data[group_name] = {}
-                
-                subject_name = item['subject']
-                if subject_name not in groups_data[group_name]:
-                    groups_data[group_name][subject_name] = []
-                
-                # Добавляем все элементы (включая темы, статистику, даже если нет ФИО)
-                # Для тем и статистики проверка is_valid_student не нужна
-                if item.get('type') == 'topic' or item.get('type') == 'statistics' or is_valid_student(item.get('fio')):
-                    groups_data[group_name][subject_name].append(item)
-        
-        # Удаляем все старые данные для обновляемых групп
-        for group_name in groups_to_update:
-            group = db.query(Group).filter(Group.name == group_name).first()
-            if group:
-                # Удаляем все оценки студентов этой группы
-                students_in_group = db.query(Student).filter(Student.group_id == group.id).all()
-                for student in students_in_group:
-                    db.query(Grade).filter(Grade.student_id == student.id).delete()
-                
-                # Удаляем всех студентов группы
-                db.query(Student).filter(Student.group_id == group.id).delete()
-                
-                # Удаляем все темы предметов группы
-                subjects_in_group = db.query(Subject).filter(Subject.group_id == group.id).all()
-                for subject in subjects_in_group:
-                    db.query(Topic).filter(Topic.subject_id == subject.id).delete()
-                
-                # Удаляем все предметы группы
-                db.query(Subject).filter(Subject.group_id == group.id).delete()
-                
-                # Удаляем саму группу
-                db.delete(group)
-        
-        db.flush()
-        
-        # Сохраняем новые данные
-        for group_name, subjects_data in groups_data.items():
-            # Создаем новую группу
-            group = Group(name=group_name)
-            db.add(group)
-            db.flush()
-            
-            # Импортируем функцию нормализации ФИО
-            from parsers.excel_parser import normalize_fio_to_initials
-            
-            # Сначала собираем всех уникальных студентов для группы
-            # Это нужно сделать до обработки предметов, чтобы не создавать дубликаты
-            all_students_fio = set()
-            for subject_name, items in subjects_data.items():
-                for item in items:
-                    fio = item.get('fio', '')
-                    if fio:
-                        fio_normalized = normalize_fio_to_initials(str(fio).strip())
-                        if fio_normalized and len(fio_normalized) >= 3:
-                            all_students_fio.add(fio_normalized)
-            
-            # Создаем всех студентов группы один раз
-            students_map = {}  # ФИО -> Student объект
-            for fio_normalized in all_students_fio:
-                # Проверяем, не существует ли уже такой студент (на случай если БД не пересоздана)
-                existing_student = db.query(Student).filter(
-                    Student.fio == fio_normalized,
-                    Student.group_id == group.id
-                ).first()
-                
-                if existing_student:
-                    students_map[fio_normalized] = existing_student
-                else:
-                    student = Student(fio=fio_normalized, group_id=group.id)
-                    db.add(student)
-                    students_map[fio_normalized] = student
-            
-            db.flush()  # Сохраняем всех студентов перед созданием оценок
-            
-            # Теперь обрабатываем предметы и оценки
-            for subject_name, items in subjects_data.items():
-                # Создаем новый предмет
-                subject = Subject(name=subject_name, group_id=group.id)
-                db.add(subject)
-                db.flush()
-                
-                # Отделяем темы от оценок и статистики
-                topics_items = [item for item in items if item.get('type') == 'topic']
-                statistics_items = [item for item in items if item.get('type') == 'statistics']
-                grades_items = [item for item in items if item.get('type') != 'topic' and item.get('type') != 'statistics' and item.get('fio')]
-                
-                # Сохраняем темы занятий
-                for topic_item in topics_items:
-                    topic_name = topic_item.get('topic', '').strip()
-                    if topic_name and len(topic_name) >= 3:
-                        # Проверяем, не существует ли уже такая тема
-                        existing_topic = db.query(Topic).filter(
-                            Topic.subject_id == subject.id,
-                            Topic.name == topic_name
-                        ).first()
-                        
-                        if not existing_topic:
-                            topic = Topic(
-                                subject_id=subject.id,
-                                name=topic_name,
-                                hours=topic_item.get('hours', 2),
-                                date=topic_item.get('date')
-                            )
-                            db.add(topic)
-                
-                db.flush()
-                
-                # Обрабатываем оценки (только те, что не являются темами)
-                for item in grades_items:
-                    fio = item.get('fio', '')
-                    date = item.get('date')
-                    grade_value = item.get('grade', '')
-                    
-                    # КРИТИЧЕСКИ ВАЖНО: Строгие проверки валидности данных
-                    # Пропускаем некорректные даты
-                    if not date:
-                        continue
-                    
-                    # Проверяем, что дата валидна (год >= 2000, месяц 1-12, день 1-31)
-                    if hasattr(date, 'year'):
-                        if date.year < 2000 or date.year > 2100:
-                            continue
-                        if date.month < 1 or date.month > 12:
-                            continue
-                        if date.day < 1 or date.day > 31:
-                            continue
-                    else:
-                        continue
-                    
-                    # Проверяем, что оценка не пустая
-                    if not grade_value or str(grade_value).strip() == '':
-                        continue
-                    
-                    # Проверяем, что ФИО не пустое
-                    if not fio or str(fio).strip() == '':
-                        continue
-                    
-                    # Нормализуем ФИО в формат "Фамилия И.О."
-                    fio_normalized = normalize_fio_to_initials(str(fio).strip())
-                    
-                    # Проверяем, что нормализованное ФИО валидно
-                    if not fio_normalized or len(fio_normalized) < 3:
-                        continue
-                    
-                    # Получаем студента из словаря (он уже должен быть создан)
-                    student = students_map.get(fio_normalized)
-                    if not student:
-                        continue  # Пропускаем если студент не найден (не должен случиться)
-                    
-                    # Проверяем, не существует ли уже такая оценка (на случай дубликатов)
-                    existing_grade = db.query(Grade).filter(
-                        Grade.student_id == student.id,
-                        Grade.subject_id == subject.id,
-                        Grade.date == date
-                    ).first()
-                    
-                    if not existing_grade:
-                        # Создаем оценку только если её еще нет
-                        grade = Grade(
-                            student_id=student.id,
-                            subject_id=subject.id,
-                            date=date,
-                            value=str(grade_value)
-                        )
-                        db.add(grade)
+        for group_name, batches in groups_data.items():
+            write_group(db, prepare_group(group_name, batches))
         
         db.commit()
     except Exception as e:
@@ -248,21 +71,39 @@ def save_to_database(parsed_data_per_file):
         db.close()
 
 
-def parse_and_save():
+def parse_and_save(paths=None):
     """
     Основная функция парсинга и сохранения
     
-    Логика работы:
-    1. Скачивает новые файлы с Google Drive
+    paths - только эти файлы источника (измененные файлы отслеживаемой
+    папки) и остальные файлы их групп; None - все файлы
+    
+    Логика работы (конвейер pipeline.py, этапы работают одновременно):
+    1. Скачивает новые файлы с Google Drive или берет из локальной папки
+       (неизменившиеся файлы не парсятся и не записываются)
     2. Парсит Excel файлы
-    3. Удаляет старые данные и сохраняет новые в БД
+    3. Удаляет старые данные и сохраняет новые в БД (группа за группой)
     4. Сохраняет информацию о парсинге в таблицу ParseLog
+       (метрики этапов и очередей - в ParseLog.details)
+
+    Запуски не накладываются - их выполняет JobRunner (job_runner.py)
+
+    Returns:
+        list: обновленные группы (пустой список/None - данные не изменились)
     """
+    return _parse_and_save(get_source(), paths)
+
+
+def _parse_and_save(source, paths):
+    """Запуск парсинга (см. parse_and_save)"""
     parse_start_time = datetime.now()
     files_processed = 0
     groups_updated_list = []
     status = "success"
     error_message = None
+    # Отчет о парсинге: счетчики по всем файлам (см. parse_sheet)
+    parse_report = {"empty_rows_skipped": 0}
+    pipeline_details = None
     
     try:
         print("=" * 60, flush=True)
@@ -270,87 +111,91 @@ def parse_and_save():
         print("=" * 60, flush=True)
         log_parser_info(
             "Начало парсинга",
-            "Запуск процесса парсинга Excel файлов с Google Drive"
+            f"Запуск процесса парсинга Excel файлов ({source.describe()})"
+            + (f", измененные файлы: {', '.join(os.path.basename(path) for path in paths)}" if paths else "")
         )
         
-        # Скачиваем файлы
-        print("📥 [PARSER] Скачивание файлов с Google Drive...", flush=True)
-        downloaded_files = download_target_files()
+        # Скачиваем, парсим и сохраняем файлы конвейером (pipeline.py):
+        # каждая группа записывается в БД сразу после парсинга своего файла
+        print(f"📥 [PARSER] Получение файлов ({source.describe()}) и парсинг...", flush=True)
+        
+        def on_file_parsed(file_name, records_count, file_report):
+            print(f"   ✅ [PARSER] Файл обработан: {file_name} (записей: {records_count}, пустых строк пропущено: {file_report.get('empty_rows_skipped', 0)})", flush=True)
+            log_parser_info(
+                f"Файл обработан: {file_name}",
+                f"Найдено записей: {records_count}",
+                details=file_report
+            )
+            
+            # Вкладки, пропущенные из-за лимитов времени/ячеек
+            aborted_sheets = file_report.get('aborted_sheets', [])
+            if aborted_sheets:
+                print(f"   ⚠️ [PARSER] Пропущено вкладок (превышен лимит): {len(aborted_sheets)}", flush=True)
+                log_parser_error(
+                    f"Вкладки пропущены (превышен лимит): {file_name}",
+                    description=", ".join(
+                        f"{item['sheet']} ({item['reason']}, {item['elapsed_seconds']} сек, ячеек: {item['cells']})"
+                        for item in aborted_sheets
+                    ),
+                    details={"aborted_sheets": aborted_sheets}
+                )
+        
+        def on_group_written(group_name, prepared, write_result):
+            print(
+                f"   💾 [PARSER] Группа сохранена в БД: {group_name} (оценок: {prepared['grades_count']}, тем: {prepared['topics_count']}, "
+                f"запись: {write_result['mode']}, колонок перезаписано: {write_result['columns_written']}/{write_result['columns_total']})",
+                flush=True
+            )
         
-        if not downloaded_files:
+        pipeline_result = run_pipeline(
+            on_file_parsed=on_file_parsed, on_group_written=on_group_written,
+            source=source, paths=paths
+        )
+        files_processed = pipeline_result.files_processed
+        groups_updated_list = pipeline_result.groups_updated
+        parse_report = pipeline_result.parse_report
+        pipeline_details = pipeline_result.details()
+        
+        if not pipeline_result.downloaded_files and paths:
+            # Измененные файлы успели удалить - обрабатывать нечего
+            print("   [PARSER] Измененных файлов больше нет", flush=True)
+            return
+        
+        if not pipeline_result.downloaded_files:
             status = "error"
             error_message = "Файлы не были скачаны"
             print("❌ [PARSER] Файлы не были скачаны", flush=True)
             log_parser_error(
                 "Файлы не были скачаны",
-                description="Не удалось скачать файлы с Google Drive"
+                description=f"Не удалось получить файлы ({source.describe()})"
             )
             return
         
-        print(f"✅ [PARSER] Скачано файлов: {len(downloaded_files)}", flush=True)
-        for f in downloaded_files:
-            print(f"   📄 [PARSER] - {os.path.basename(f)}", flush=True)
         log_parser_info(
-            f"Скачано файлов: {len(downloaded_files)}",
-            f"Файлы: {', '.join([os.path.basename(f) for f in downloaded_files])}"
+            f"Скачано файлов: {len(pipeline_result.downloaded_files)}",
+            f"Файлы: {', '.join(pipeline_result.downloaded_files)}"
         )
-        
-        # Парсим файлы
-        print("📊 [PARSER] Начало парсинга Excel файлов...", flush=True)
-        parsed_data_per_file = {}
-        for file_path in downloaded_files:
-            try:
-                file_name = os.path.basename(file_path)
-                print(f"   🔍 [PARSER] Обработка файла: {file_name}...", flush=True)
-                log_parser_info(
-                    f"Парсинг файла: {file_name}",
-                    f"Обработка Excel файла"
-                )
-                
-                data = parse_excel_file(file_path)
-                parsed_data_per_file[file_name] = data
-                files_processed += 1
-                
-                print(f"   ✅ [PARSER] Файл обработан: {file_name} (записей: {len(data)})", flush=True)
-                log_parser_info(
-                    f"Файл обработан: {file_name}",
-                    f"Найдено записей: {len(data)}"
-                )
-            except Exception as e:
-                error_message = f"Ошибка при парсинге {file_path}: {str(e)}"
-                log_parser_error(
-                    f"Ошибка при парсинге {os.path.basename(file_path)}",
-                    error=e,
-                    description=f"Не удалось распарсить файл: {file_path}"
-                )
-        
-        # Сохраняем данные в БД
-        if parsed_data_per_file:
-            # Получаем список обновленных групп
-            groups_updated_list = list(set(
-                item.get('group') 
-                for file_data in parsed_data_per_file.values() 
-                for item in file_data 
-                if item.get('group')
-            ))
-            
-            print(f"💾 [PARSER] Сохранение данных в БД...", flush=True)
-            print(f"   👥 [PARSER] Групп для обновления: {len(groups_updated_list)}", flush=True)
-            if groups_updated_list:
-                print(f"   📋 [PARSER] Группы: {', '.join(groups_updated_list)}", flush=True)
+        if pipeline_result.unchanged_files:
             log_parser_info(
-                f"Сохранение данных в БД",
-                f"Обновление групп: {', '.join(groups_updated_list) if groups_updated_list else 'нет'}"
+                f"Без изменений: {len(pipeline_result.unchanged_files)}",
+                f"Файлы не обрабатывались: {', '.join(pipeline_result.unchanged_files)}"
             )
-            
-            save_to_database(parsed_data_per_file)
-            
-            print(f"✅ [PARSER] Данные сохранены в БД", flush=True)
-            log_parser_info(
-                f"Данные сохранены в БД",
-                f"Обновлено групп: {len(groups_updated_list)}"
+        
+        # Ошибки отдельных файлов/групп (остальные сохранены)
+        for error in pipeline_result.errors:
+            error_message = f"Ошибка на этапе {error['stage']} ({error['name']}): {error['error']}"
+            log_parser_error(
+                f"Ошибка при обработке {error['name']}",
+                description=error_message
             )
         
+        print(f"✅ [PARSER] Данные сохранены в БД", flush=True)
+        log_parser_info(
+            f"Данные сохранены в БД",
+            f"Обновлено групп: {len(groups_updated_list)}",
+            details=pipeline_details["pipeline"]
+        )
+        
         # Сохраняем информацию о парсинге в таблицу
         db = get_db()
         try:
@@ -359,7 +204,8 @@ def parse_and_save():
                 files_processed=files_processed,
                 groups_updated=json.dumps(groups_updated_list, ensure_ascii=False) if groups_updated_list else None,
                 status=status,
-                error_message=error_message
+                error_message=error_message,
+                details=json.dumps(pipeline_details, ensure_ascii=False, default=str)
             )
             db.add(parse_log)
             db.commit()
@@ -368,6 +214,9 @@ def parse_and_save():
         finally:
             db.close()
         
+        # Снимок данных для API - до того, как API узнает о новом поколении данных
+        update_read_model(changed=bool(groups_updated_list))
+        
         # Выводим сообщение о завершении парсинга
         parse_end_time = datetime.now()
         duration = (parse_end_time - parse_start_time).total_seconds()
@@ -380,7 +229,8 @@ def parse_and_save():
                 "files_processed": files_processed,
                 "groups_count": len(groups_updated_list),
                 "groups": groups_updated_list,
-                "duration_seconds": duration
+                "duration_seconds": duration,
+                "parse_report": parse_report
             }
         )
         
@@ -389,7 +239,10 @@ def parse_and_save():
         print(f"   📅 [PARSER] Время: {parse_end_time.strftime('%Y-%m-%d %H:%M:%S')}", flush=True)
         print(f"   ⏱️  [PARSER] Длительность: {duration:.2f} сек", flush=True)
         print(f"   📁 [PARSER] Файлов обработано: {files_processed}", flush=True)
+        if pipeline_result.unchanged_files:
+            print(f"   ⏭️  [PARSER] Файлов без изменений: {len(pipeline_result.unchanged_files)}", flush=True)
         print(f"   👥 [PARSER] Групп обновлено: {len(groups_updated_list)} ({groups_str})", flush=True)
+        print(f"   📄 [PARSER] Пустых строк пропущено: {parse_report['empty_rows_skipped']}", flush=True)
         print(f"   💾 [PARSER] Данные сохранены в БД", flush=True)
         print("=" * 60, flush=True)
         print("", flush=True)
@@ -445,6 +298,50 @@ def parse_and_save():
         print(f"❌ [PARSER] Ошибка при парсинге: {error_message}", flush=True)
         print("=" * 60, flush=True)
         print("", flush=True)
+    
+    return groups_updated_list
+
+
+def update_read_model(changed=True):
+    """
+    Обновляет снимок данных для чтения API (read_model.py): после записи
+    новых данных или если снимка еще нет
+    """
+    if not changed and (not READ_MODEL_ENABLED or os.path.exists(READ_MODEL_FILE)):
+        return
+    try:
+        info = publish_snapshot()
+    except Exception as e:
+        # Старый снимок не отдаем: без файла API читает из БД, а следующий
+        # запуск (даже без изменений) построит снимок заново
+        remove_snapshot()
+        log_parser_error(
+            "Не удалось обновить снимок данных",
+            error=e,
+            description="API читает данные из БД, пока снимок не обновится"
+        )
+        return
+    if info:
+        print(f"   🗂️  [PARSER] Снимок данных обновлен: оценок {info['grades']}, {info['bytes'] // 1024} КБ, {info['duration_seconds']} сек", flush=True)
+
+
+def watch_source(source, runner, stop):
+    """
+    Запросы парсинга измененных файлов отслеживаемого источника (в отдельном
+    потоке), пока не установлен stop
+
+    Пока идет парсинг, изменения копятся и парсятся одним следующим запуском
+    """
+    try:
+        for paths in source.watch(stop):
+            print(f"👀 [PARSER] Изменены файлы: {', '.join(os.path.basename(path) for path in paths)}", flush=True)
+            runner.trigger("watch", paths)
+    except Exception as e:
+        log_parser_error(
+            "Отслеживание изменений файлов остановлено",
+            error=e,
+            description=source.describe()
+        )
 
 
 def main():
@@ -453,24 +350,25 @@ def main():
     
     Логика:
     1. Инициализация БД
-    2. Первый запуск парсинга
-    3. Настройка автоматического обновления раз в час
-       (в 00 минут каждого часа)
-    4. Запуск планировщика
+    2. Для локальной папки - отслеживание изменений (измененный файл
+       парсится сразу, в отдельном потоке)
+    3. Запуск JobRunner: первый парсинг сразу, затем раз в
+       PARSE_INTERVAL_MINUTES (в 00 минут каждого часа) и по запросам
+       (изменения папки, POST /api/ingest/run)
     """
     init_db()
     
-    # Выполняем первый парсинг сразу (без вывода)
-    parse_and_save()
+    runner = JobRunner(parse_and_save)
     
-    # Настраиваем автоматический запуск раз в час
-    # Запуск в 00 минут каждого часа
-    schedule.every().hour.at(":00").do(parse_and_save)
+    source = get_source()
+    if source.watchable:
+        threading.Thread(
+            target=watch_source, args=(source, runner, threading.Event()),
+            name="parser-watch", daemon=True
+        ).start()
     
-    # Запускаем планировщик
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Проверяем каждую минуту
+    # Первый парсинг сразу, дальше - по расписанию и по запросам
+    runner.run_forever()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,353 @@
+"""
+КЭШ РЕЗУЛЬТАТОВ ПАРСИНГА
+========================
+
+Результат парсинга каждого файла (список SheetBatch + отчет) сохраняется
+в data/parse_cache/ в компактном двоичном виде. Ключ - SHA-256 содержимого
+файла (вместе с именем файла - из него берется название группы), поэтому:
+
+1. Неизменившийся файл не парсится заново (конвейер берет данные из кэша,
+   если код парсера с тех пор не менялся - см. parser_fingerprint)
+2. После изменения логики записи или неудачной записи в БД данные можно
+   перезаписать из кэша за секунды, без скачивания и парсинга (reingest.py)
+
+Формат файла <ключ>.bin:
+- MAGIC (8 байт)
+- uint32 длина + JSON метаданных (имя файла, группы, время, отчет парсинга)
+- zlib: uint32 длина + JSON таблиц вкладок (студенты, даты, значения, темы,
+  статистика), затем массивы номеров student_idx/date_idx/value_code (uint32 LE)
+
+Старые записи удаляются по возрасту (PARSE_CACHE_MAX_AGE_DAYS) и по общему
+размеру (PARSE_CACHE_MAX_MB) - сначала самые старые.
+
+Функции:
+- file_sha256() - хэш содержимого файла
+- cache_key() - ключ записи кэша для файла
+- parser_fingerprint() - отпечаток кода парсера
+- save_parsed() / load_parsed() - запись и чтение результата парсинга
+- list_entries() / latest_entries() - записи кэша (для reingest.py)
+- evict() - удаление старых записей
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from datetime import date as date_type
+
+from config import (
+    SKIP_FIRST_SHEETS, STOP_SHEET_NAME,
+    PARSE_CACHE_DIR, PARSE_CACHE_MAX_AGE_DAYS, PARSE_CACHE_MAX_MB
+)
+from parsers.sheet_batch import SheetBatch
+
+MAGIC = b'SBCACHE1'
+CACHE_EXTENSION = '.bin'
+
+# Файлы, от которых зависит результат парсинга (для parser_fingerprint)
+PARSER_SOURCES = ('parsers', 'fio_normalizer.py')
+
+_fingerprint = None
+
+
+def file_sha256(file_path):
+    """SHA-256 содержимого файла (hex)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(file_path):
+    """
+    Ключ записи кэша: SHA-256 имени и содержимого файла (hex)
+
+    Название группы берется из имени файла, поэтому одинаковое содержимое
+    под разными именами - разные записи
+    """
+    digest = hashlib.sha256()
+    digest.update(os.path.basename(file_path).encode('utf-8') + b'\0')
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parser_fingerprint():
+    """
+    Отпечаток кода парсера: хэш исходников parsers/ и fio_normalizer.py
+    и настроек выбора вкладок. Если парсер изменился - записи кэша
+    не используются вместо парсинга (но остаются доступны reingest.py)
+    """
+    global _fingerprint
+    if _fingerprint is None:
+        parsing_dir = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        digest.update(f"{SKIP_FIRST_SHEETS}|{STOP_SHEET_NAME}".encode('utf-8'))
+        for source in PARSER_SOURCES:
+            path = os.path.join(parsing_dir, source)
+            if os.path.isdir(path):
+                files = sorted(
+                    os.path.join(path, name) for name in os.listdir(path) if name.endswith('.py')
+                )
+            else:
+                files = [path]
+            for file_path in files:
+                digest.update(os.path.relpath(file_path, parsing_dir).encode('utf-8'))
+                with open(file_path, 'rb') as f:
+                    digest.update(f.read())
+        _fingerprint = digest.hexdigest()[:16]
+    return _fingerprint
+
+
+def _entry_path(key, cache_dir=None):
+    return os.path.join(cache_dir or PARSE_CACHE_DIR, key + CACHE_EXTENSION)
+
+
+def _array_bytes(values):
+    """Массив номеров -> uint32 little-endian"""
+    data = array('I', values)
+    if sys.byteorder == 'big':
+        data.byteswap()
+    return data.tobytes()
+
+
+def _bytes_array(data):
+    """uint32 little-endian -> array('I')"""
+    values = array('I')
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _date_code(value):
+    return value.toordinal() if value is not None else None
+
+
+def _code_date(value):
+    return date_type.fromordinal(value) if value is not None else None
+
+
+def encode_batches(batches):
+    """Список SheetBatch -> bytes (тело записи кэша, без сжатия)"""
+    tables = []
+    blobs = []
+    for batch in batches:
+        tables.append({
+            'group': batch.group,
+            'subject': batch.subject,
+            'students': batch.students,
+            'dates': [_date_code(value) for value in batch.dates],
+            'values': batch.values,
+            'topics': [[topic, hours, _date_code(value)] for topic, hours, value in batch.topics],
+            'statistics': batch.statistics,
+            'grades': batch.grades_count,
+        })
+        blobs.append(_array_bytes(batch.student_idx))
+        blobs.append(_array_bytes(batch.date_idx))
+        blobs.append(_array_bytes(batch.value_code))
+
+    header = json.dumps(tables, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return struct.pack('<I', len(header)) + header + b''.join(blobs)
+
+
+def decode_batches(data, groups=None):
+    """
+    bytes -> список SheetBatch (обратно encode_batches)
+
+    groups - если указано, возвращаются только вкладки этих групп
+    """
+    (header_len,) = struct.unpack_from('<I', data, 0)
+    offset = 4 + header_len
+    tables = json.loads(data[4:offset].decode('utf-8'))
+
+    batches = []
+    for table in tables:
+        size = table['grades'] * 4
+        columns = []
+        for _ in range(3):
+            columns.append(data[offset:offset + size])
+            offset += size
+        if groups is not None and table['group'] not in groups:
+            continue
+
+        batch = SheetBatch(table['group'], table['subject'])
+        students = table['students']
+        dates = [_code_date(value) for value in table['dates']]
+        values = table['values']
+        # Повторяем добавление оценок - таблицы и счетчики статистики
+        # восстанавливаются в том же порядке, что и при парсинге
+        for student, date_code, value in zip(*(_bytes_array(column) for column in columns)):
+            batch.add_grade(students[student], dates[date_code], values[value])
+        for topic, hours, value in table['topics']:
+            batch.add_topic(topic, hours, _code_date(value))
+        batch.statistics = table['statistics']
+        batches.append(batch)
+    return batches
+
+
+def save_parsed(key, file_name, batches, report=None, cache_dir=None):
+    """
+    Сохраняет результат парсинга файла в кэш (атомарно: через временный файл)
+
+    Returns:
+        str: путь к записи кэша
+    """
+    cache_dir = cache_dir or PARSE_CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+
+    meta = {
+        'key': key,
+        'file_name': file_name,
+        'groups': sorted({batch.group for batch in batches}),
+        'created': time.time(),
+        'parser': parser_fingerprint(),
+        'report': report or {},
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, default=str).encode('utf-8')
+    body = zlib.compress(encode_batches(batches), 6)
+
+    path = _entry_path(key, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(body)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _read_meta(f):
+    """Метаданные записи (файл открыт в начале) или None, если это не запись кэша"""
+    if f.read(len(MAGIC)) != MAGIC:
+        return None
+    (meta_len,) = struct.unpack('<I', f.read(4))
+    return json.loads(f.read(meta_len).decode('utf-8'))
+
+
+def read_entry(path, groups=None):
+    """
+    Читает запись кэша
+
+    Returns:
+        tuple: (meta, [SheetBatch, ...]) или None, если запись повреждена
+    """
+    try:
+        with open(path, 'rb') as f:
+            meta = _read_meta(f)
+            if meta is None:
+                return None
+            body = zlib.decompress(f.read())
+        return meta, decode_batches(body, groups)
+    except (OSError, ValueError, KeyError, IndexError, struct.error, zlib.error):
+        return None
+
+
+def load_parsed(key, fingerprint=None, cache_dir=None):
+    """
+    Результат парсинга файла из кэша
+
+    fingerprint - если указан, запись используется только если она сделана
+    той же версией парсера (см. parser_fingerprint)
+
+    Returns:
+        tuple: ([SheetBatch, ...], report) или None (нет в кэше)
+    """
+    path = _entry_path(key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    if fingerprint is not None:
+        try:
+            with open(path, 'rb') as f:
+                meta = _read_meta(f)
+        except (OSError, ValueError, struct.error):
+            return None
+        if not meta or meta.get('parser') != fingerprint:
+            return None
+    entry = read_entry(path)
+    if entry is None:
+        return None
+    meta, batches = entry
+    return batches, meta.get('report', {})
+
+
+def list_entries(cache_dir=None):
+    """
+    Все записи кэша (метаданные + 'path', 'size'), от новых к старым
+    """
+    cache_dir = cache_dir or PARSE_CACHE_DIR
+    if not os.path.isdir(cache_dir):
+        return []
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(CACHE_EXTENSION):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            with open(path, 'rb') as f:
+                meta = _read_meta(f)
+            size = os.path.getsize(path)
+        except (OSError, ValueError, struct.error):
+            continue
+        if meta is None:
+            continue
+        meta['path'] = path
+        meta['size'] = size
+        entries.append(meta)
+    entries.sort(key=lambda entry: entry.get('created', 0), reverse=True)
+    return entries
+
+
+def latest_entries(cache_dir=None):
+    """Последняя запись кэша для каждого файла (по имени файла)"""
+    latest = {}
+    for entry in list_entries(cache_dir):
+        latest.setdefault(entry['file_name'], entry)
+    return list(latest.values())
+
+
+def evict(max_age_days=None, max_mb=None, cache_dir=None):
+    """
+    Удаляет записи старше max_age_days и самые старые записи, пока общий
+    размер больше max_mb (по умолчанию - из config.py, 0 - без ограничения)
+
+    Returns:
+        int: количество удаленных записей
+    """
+    if max_age_days is None:
+        max_age_days = PARSE_CACHE_MAX_AGE_DAYS
+    if max_mb is None:
+        max_mb = PARSE_CACHE_MAX_MB
+
+    entries = list_entries(cache_dir)  # от новых к старым
+    removed = 0
+    kept = []
+    now = time.time()
+    for entry in entries:
+        if max_age_days and now - entry.get('created', 0) > max_age_days * 86400:
+            removed += _remove(entry['path'])
+        else:
+            kept.append(entry)
+
+    if max_mb:
+        total = sum(entry['size'] for entry in kept)
+        while kept and total > max_mb * 1024 * 1024:
+            entry = kept.pop()
+            total -= entry['size']
+            removed += _remove(entry['path'])
+    return removed
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return 1
+    except OSError:
+        return 0
@@ -2,5 +2,11 @@
 Модули для парсинга данных из различных источников.
 
 excel_parser.py - парсинг Excel файлов (.xlsx, .xlsm)
+cell_classifier.py - кэширующая классификация значений ячеек (оценки, даты)
+excel_dates.py - преобразование номеров дней Excel в даты (целыми столбцами)
+workbook_loader.py - загрузка только вкладок от ОГСЭ/ОГЭ до УП
+parse_budget.py - лимиты времени и ячеек на вкладку/файл
+xml_reader.py - движок "xml": чтение вкладок напрямую из XML (PARSER_ENGINE)
+sheet_batch.py - SheetBatch: данные вкладки по колонкам (таблицы студентов/дат + массивы) и счетчики статистики
 """
 
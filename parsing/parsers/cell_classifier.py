@@ -0,0 +1,160 @@
+"""
+БЫСТРАЯ КЛАССИФИКАЦИЯ ЗНАЧЕНИЙ ЯЧЕЕК
+====================================
+
+Журнал содержит (студенты x колонки с датами) ячеек, и почти все они повторяют
+несколько значений ("5", "4", "н", "н/5"). Вместо полного разбора каждой ячейки:
+
+1. Таблица готовых ответов для частых значений (строится при импорте
+   вызовом эталонных функций, поэтому результаты совпадают байт в байт)
+2. Ограниченный LRU-кэш для остальных значений
+3. Эталонные функции parse_grade_value() / parse_date() (с заранее
+   скомпилированными регулярными выражениями) - для всего остального
+
+Ключ кэша - (тип, значение): 1, 1.0 и True равны в Python, но разбираются
+по-разному (str(value) отличается).
+
+Функции:
+- classify_grade() - замена parse_grade_value() для ячеек журнала
+- classify_date() - замена parse_date() для заголовков и таблицы тем
+- classify_dates() - то же для целого столбца (номера дней Excel
+  преобразуются векторно, см. parsers/excel_dates.py)
+
+Совпадение с эталонными функциями проверяет tests/test_cell_classifier.py;
+микробенчмарк (из каталога parsing):
+    python -m parsers.cell_classifier
+"""
+
+from datetime import datetime, date as date_type
+from functools import lru_cache
+
+from .excel_parser import parse_grade_value, parse_date
+from .excel_dates import excel_serials_to_dates
+
+# Размер кэша для значений, которых нет в таблице
+CELL_CACHE_SIZE = 4096
+
+# Частые значения ячеек журнала
+COMMON_GRADE_TOKENS = (
+    ['1', '2', '3', '4', '5', '0', '*', '+', '-']
+    + ['н', 'Н', 'нб', 'НБ', 'Нб', 'н/б', 'Н/Б', 'н/я', 'Н/Я', 'пропуск', 'Пропуск', 'неявка', 'б', 'Б']
+    + [f'{prefix}/{grade}' for prefix in ('н', 'Н', 'д', 'Д') for grade in '12345']
+    + [f'{grade}/{prefix}' for prefix in ('н', 'б', 'нб') for grade in '12345']
+    + [f'{a}/{b}' for a in '2345' for b in '2345']
+    + [f'{grade}{sign}' for grade in '2345' for sign in '+-']
+    + ['зач', 'Зач', 'незач', 'осв', 'н/а', 'Н/А']
+)
+COMMON_NUMERIC_TOKENS = [0, 1, 2, 3, 4, 5] + [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
+
+
+def _cell_key(value):
+    """Ключ таблицы/кэша: (тип, значение)"""
+    return (value.__class__, value)
+
+
+def _build_grade_table():
+    table = {}
+    for token in COMMON_GRADE_TOKENS:
+        for variant in (token, f' {token}', f'{token} '):
+            table[_cell_key(variant)] = parse_grade_value(variant)
+    for number in COMMON_NUMERIC_TOKENS:
+        table[_cell_key(number)] = parse_grade_value(number)
+    return table
+
+
+GRADE_TABLE = _build_grade_table()
+
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _classify_grade_cached(key):
+    return parse_grade_value(key[1])
+
+
+@lru_cache(maxsize=CELL_CACHE_SIZE)
+def _classify_date_cached(key):
+    return parse_date(key[1])
+
+
+def classify_grade(value):
+    """
+    Оценка/пропуск из значения ячейки - результат идентичен parse_grade_value()
+    """
+    if value is None:
+        return None
+    key = _cell_key(value)
+    try:
+        return GRADE_TABLE[key]
+    except KeyError:
+        return _classify_grade_cached(key)
+    except TypeError:
+        # Нехэшируемое значение - разбираем напрямую
+        return parse_grade_value(value)
+
+
+def classify_date(value):
+    """
+    Дата из значения ячейки - результат идентичен parse_date()
+    """
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date_type)):
+        # Для дат разбор и так мгновенный
+        return parse_date(value)
+    try:
+        return _classify_date_cached(_cell_key(value))
+    except TypeError:
+        return parse_date(value)
+
+
+def classify_dates(values):
+    """
+    Даты для столбца значений - результат для каждого элемента идентичен parse_date()
+
+    Числа (номера дней Excel) преобразуются одним вызовом, остальное - classify_date()
+    """
+    values = list(values)
+    numeric = [pos for pos, value in enumerate(values) if isinstance(value, (int, float))]
+    result = [None] * len(values)
+    for pos, parsed_date in zip(numeric, excel_serials_to_dates([values[pos] for pos in numeric])):
+        result[pos] = parsed_date
+    for pos, value in enumerate(values):
+        if value is not None and not isinstance(value, (int, float)):
+            result[pos] = classify_date(value)
+    return result
+
+
+def clear_caches():
+    """Очистка кэшей (например, между запусками в долгоживущем процессе)"""
+    _classify_grade_cached.cache_clear()
+    _classify_date_cached.cache_clear()
+
+
+def cache_info():
+    """Статистика кэшей (попадания/промахи) для отчета о парсинге"""
+    return {
+        'grade': _classify_grade_cached.cache_info()._asdict(),
+        'date': _classify_date_cached.cache_info()._asdict(),
+    }
+
+
+def benchmark(count: int = 40000, seed: int = 0):
+    """Микробенчмарк на типичных ячейках журнала: ячеек/сек до и после кэша"""
+    import random
+    import time
+
+    rng = random.Random(seed)
+    rare = [f"{rng.randint(0, 99)}{rng.choice(['', '.', '/', ' ', 'н'])}" for _ in range(200)]
+    sample = [
+        rng.choice(COMMON_GRADE_TOKENS) if rng.random() < 0.9 else rng.choice(rare)
+        for _ in range(count)
+    ]
+    for name, func in (("parse_grade_value", parse_grade_value), ("classify_grade", classify_grade)):
+        start = time.perf_counter()
+        for value in sample:
+            func(value)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>18}: {len(sample) / elapsed:,.0f} ячеек/сек")
+
+
+if __name__ == "__main__":
+    benchmark()
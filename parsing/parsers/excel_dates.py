@@ -0,0 +1,106 @@
+"""
+ПРЕОБРАЗОВАНИЕ ДАТ EXCEL
+========================
+
+Excel хранит даты как числа (дни с 1899-12-30, дробная часть - время).
+openpyxl.utils.datetime.from_excel() преобразует по одному значению;
+здесь - то же преобразование арифметикой от эпохи для целого столбца:
+
+1. day, fraction = divmod(value, 1), время округляется до миллисекунд
+   (как в from_excel, поэтому 45000.9999999999 - это уже следующий день)
+2. Дата = эпоха + day (+1 день, если время округлилось до 24:00)
+3. Даты раньше 2000 года (и нечисловые значения) - None, как в parse_date()
+
+Длинные столбцы считаются на NumPy (requirements.txt); без NumPy и для
+коротких столбцов - чистый Python. Результаты одинаковые.
+
+Функции:
+- excel_serial_to_date() - одно значение
+- excel_serials_to_dates() - столбец значений
+"""
+
+import math
+from datetime import date as date_type, timedelta
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy - чистый Python
+    np = None
+
+# Эпоха Excel (Windows, с учетом ошибки 1900 года)
+EXCEL_EPOCH = date_type(1899, 12, 30)
+MS_PER_DAY = 86400 * 1000
+
+# Диапазон номеров дней: от 2000-01-01 (фильтр "разумной" даты) до 9999-12-31
+MIN_SERIAL_DAY = (date_type(2000, 1, 1) - EXCEL_EPOCH).days
+MAX_SERIAL_DAY = (date_type(9999, 12, 31) - EXCEL_EPOCH).days
+
+# Для коротких столбцов накладные расходы NumPy больше выигрыша
+NUMPY_MIN_BATCH = 32
+
+
+def _is_serial(value):
+    """Число (но не bool), которое может быть датой Excel"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def excel_serial_to_date(value):
+    """
+    Дата из номера дня Excel или None (не число, не конечное число, раньше 2000 года)
+    """
+    if not _is_serial(value):
+        return None
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+
+    day, fraction = divmod(value, 1)
+    # Время округляется до миллисекунд - может дать ровно сутки
+    if round(fraction * 86400 * 1000) >= MS_PER_DAY:
+        day += 1
+    day = int(day)
+    if day < MIN_SERIAL_DAY or day > MAX_SERIAL_DAY:
+        return None
+    return EXCEL_EPOCH + timedelta(days=day)
+
+
+def _serials_to_dates_numpy(serials):
+    """Векторное преобразование списка чисел (NumPy)"""
+    values = np.asarray(serials, dtype=np.float64)
+    result = [None] * len(serials)
+
+    with np.errstate(invalid='ignore'):
+        day = np.floor(values)
+        fraction = values - day
+        day = day + (np.round(fraction * 86400 * 1000) >= MS_PER_DAY)
+        valid = np.isfinite(values) & (day >= MIN_SERIAL_DAY) & (day <= MAX_SERIAL_DAY)
+
+    positions = np.flatnonzero(valid)
+    if len(positions):
+        days = day[positions].astype('int64').astype('timedelta64[D]')
+        dates = (np.datetime64(EXCEL_EPOCH, 'D') + days).tolist()
+        for pos, parsed_date in zip(positions.tolist(), dates):
+            result[pos] = parsed_date
+    return result
+
+
+def excel_serials_to_dates(values):
+    """
+    Преобразует столбец значений (номера дней Excel) в даты
+
+    Нечисловые значения, None и даты раньше 2000 года дают None -
+    результат для каждого элемента тот же, что у excel_serial_to_date().
+
+    Returns:
+        list: даты (datetime.date) или None, по одной на каждое значение
+    """
+    values = list(values)
+    positions = [pos for pos, value in enumerate(values) if _is_serial(value)]
+    if np is None or len(positions) < NUMPY_MIN_BATCH:
+        return [excel_serial_to_date(value) for value in values]
+
+    result = [None] * len(values)
+    # Целые числа больше 2**53 теряют точность во float64 - это заведомо не даты
+    serials = [value if abs(value) < 2 ** 53 else math.inf for value in (values[pos] for pos in positions)]
+    for pos, parsed_date in zip(positions, _serials_to_dates_numpy(serials)):
+        result[pos] = parsed_date
+    return result
@@ -3,8 +3,10 @@
 ===================
 
 Логика работы:
-1. Загружает Excel файл (openpyxl)
-2. Пропускает первые 3 вкладки (SKIP_FIRST_SHEETS)
+1. Загружает Excel файл (openpyxl) - только вкладки от ОГСЭ/ОГЭ до УП
+   (parsers/workbook_loader.py); с PARSER_ENGINE = "xml" вкладки читаются
+   напрямую из XML (parsers/xml_reader.py)
+2. Пропускает первые 3 вкладки (SKIP_FIRST_SHEETS), если нет вкладки ОГСЭ/ОГЭ
 3. Парсит вкладки до "УП технической разработки" (STOP_SHEET_NAME)
 4. Для каждой вкладки:
    - Парсит ВЕСЬ документ до конца (включая продолжение, второй журнал со строки 65-70 и т.д.)
@@ -16,76 +18,86 @@
      * Находит колонки с датами и правильно парсит их с учетом месяца
      * Извлекает данные: ФИО, дата, оценка/пропуск
      * Парсит данные до следующего заголовка или до конца листа
-5. Возвращает список словарей с данными (включая данные из всех журналов)
+5. Возвращает данные каждой вкладки в колоночном виде - SheetBatch
+   (parsers/sheet_batch.py); parse_excel_file() отдает их списком словарей
 
 Функции:
-- parse_excel_file() - главная функция парсинга файла
+- parse_excel_batches() - главная функция парсинга файла (список SheetBatch)
+- parse_excel_file() - то же в прежнем формате (список словарей)
+- load_workbook_for_parsing() - загрузка файла выбранным движком
 - parse_sheet() - парсинг одной вкладки (поддерживает несколько журналов, парсит весь документ)
 - parse_date() - парсинг даты из различных форматов
+  (столбцы дат разбираются целиком: parsers/excel_dates.py)
 - parse_grade_value() - парсинг оценки/пропуска
+  (в цикле по ячейкам используется кэширующая обертка parsers/cell_classifier.py)
 - find_student_column() - поиск колонки с ФИО
 - find_date_columns() - поиск колонок с датами (определяет месяц для каждой колонки)
 - find_month_in_cell() - поиск названия месяца в ячейке
+- iter_row_window() - строки листа в окне колонок (журнал A..AD, темы AE+)
+- get_used_range() - последняя строка/колонка со значениями (без "раздутых" max_row)
 """
 
 import os
 import re
-from openpyxl import load_workbook
 from datetime import datetime, date as date_type
+from weakref import WeakKeyDictionary
+from openpyxl.chartsheet import Chartsheet
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import SKIP_FIRST_SHEETS, STOP_SHEET_NAME
+from fio_normalizer import normalize_fio_to_initials
+from .excel_dates import excel_serial_to_date
+from .workbook_loader import load_sheet_range
+from .xml_reader import load_xml_workbook
+from .parse_budget import ParseBudget, BudgetExceeded, file_deadline
+from .sheet_batch import SheetBatch, is_absence, attendance_percent
+from config import PARSER_ENGINE
 
+# Регулярные выражения компилируются один раз (функции вызываются для каждой ячейки)
+DATE_PREFIX_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}')
+DATETIME_PREFIX_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}\s+\d{2}')
+DIGITS_PATTERN = re.compile(r'\d+')
+YEAR_PATTERN = re.compile(r'20\d{2}')
 
-def normalize_fio_to_initials(fio: str) -> str:
-    """
-    Преобразует ФИО в формат "Фамилия И.О."
-    
-    Примеры:
-    - "Иванов Иван Иванович" -> "Иванов И.И."
-    - "Петров Петр" -> "Петров П."
-    - "Сидоров С.С." -> "Сидоров С.С." (уже в нужном формате)
-    - "Ельченинов Владислав Антонович" -> "Ельченинов В.А."
-    """
-    if not fio:
-        return fio
-    
-    # Убираем лишние пробелы
-    fio = ' '.join(fio.strip().split())
-    
-    # Если уже в формате "Фамилия И.О." или "Фамилия И.О", оставляем как есть
-    if re.match(r'^[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.\s*[А-ЯЁ]?\.?$', fio):
-        return fio
-    
-    # Разбиваем на части
-    parts = fio.split()
-    
-    if len(parts) == 0:
-        return fio
-    
-    # Фамилия - первая часть
-    surname = parts[0]
-    
-    # Имя - вторая часть (если есть)
-    if len(parts) >= 2:
-        first_name_initial = parts[1][0].upper() if parts[1] else ''
-    else:
-        first_name_initial = ''
-    
-    # Отчество - третья часть (если есть)
-    if len(parts) >= 3:
-        last_name_initial = parts[2][0].upper() if parts[2] else ''
-    else:
-        last_name_initial = ''
-    
-    # Формируем результат
-    if first_name_initial and last_name_initial:
-        return f"{surname} {first_name_initial}.{last_name_initial}."
-    elif first_name_initial:
-        return f"{surname} {first_name_initial}."
-    else:
-        return surname
+# Форматы строковых дат (в порядке проверки)
+DATE_STRING_FORMATS = (
+    "%d.%m.%Y", 
+    "%Y-%m-%d", 
+    "%d/%m/%Y", 
+    "%Y/%m/%d",
+    "%d.%m.%y",  # короткий год
+    "%d/%m/%y"
+)
+
+# Блоки колонок листа (номера с 1, включительно):
+# журнал (ФИО, даты, оценки) - колонки A..AD, таблица тем - AE и дальше
+JOURNAL_LAST_COLUMN = 30  # AD
+TOPICS_FIRST_COLUMN = 31  # AE
+
+# Ключевые слова - одно регулярное выражение вместо цепочки проверок "in"
+# Строка заголовка журнала
+HEADER_ROW_PATTERN = re.compile('фио|студент')
+# Колонка с ФИО в заголовке
+STUDENT_COLUMN_PATTERN = re.compile('фио|студент|фамилия|имя|ученик|учащийся')
+# Заголовки, которые не являются студентами
+JOURNAL_HEADER_KEYWORDS = [
+    'месяц/число', 'фио обучающихся', 'фио', 'кол-во часов', 
+    'количество часов', 'часы', 'студент', 'обучающийся',
+    'фамилия', 'имя', 'отчество', 'дата', 'оценка', 'пропуск'
+]
+JOURNAL_HEADER_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in JOURNAL_HEADER_KEYWORDS))
+# Строка заголовка таблицы тем: нужны оба слова
+# ("кол-во часов"/"количество часов" содержат "часов",
+#  "наименование учебного занятия" содержит "наименование")
+TOPICS_HEADER_PATTERN = re.compile('часов|наименование')
+TOPICS_HEADER_WORDS = frozenset(['часов', 'наименование'])
+# Заголовки внутри таблицы тем (не темы)
+TOPIC_HEADER_WORDS_PATTERN = re.compile('наименование|занятия|дата|кол-во|часов')
+
+# Значения, которые означают пропуск
+ABSENCE_WORDS = frozenset(['н', 'нб', 'н/б', 'пропуск', 'н/я', 'неявка'])
+# Вторая часть дроби, которая означает пропуск ("д/н", "4/б")
+ABSENCE_FRACTION_PARTS = frozenset(['б', 'н', 'нб', 'н/б'])
 
 
 def parse_date(date_value):
@@ -111,36 +123,15 @@ def parse_date(date_value):
     
     elif isinstance(date_value, (int, float)):
         # Excel хранит даты как числа (дни с 1900-01-01)
-        try:
-            from openpyxl.utils.datetime import from_excel
-            parsed_date = from_excel(date_value).date()
-            
-            # Проверяем, что дата разумная (не 1900 год)
-            if parsed_date.year < 2000:
-                # Пробуем альтернативный способ - может быть это номер дня в другом формате
-                # Если число маленькое (1-31), это может быть день месяца, а не дата Excel
-                if date_value < 100:
-                    return None
-                return None
-            return parsed_date
-        except Exception as e:
-            return None
+        # Даты раньше 2000 года (в т.ч. дни месяца 1-31) отбрасываются
+        return excel_serial_to_date(date_value)
     
     elif isinstance(date_value, str):
         # Пытаемся распарсить строку
         date_str = date_value.strip()
         
         # Пробуем разные форматы
-        formats = [
-            "%d.%m.%Y", 
-            "%Y-%m-%d", 
-            "%d/%m/%Y", 
-            "%Y/%m/%d",
-            "%d.%m.%y",  # короткий год
-            "%d/%m/%y"
-        ]
-        
-        for fmt in formats:
+        for fmt in DATE_STRING_FORMATS:
             try:
                 parsed_date = datetime.strptime(date_str, fmt).date()
                 # Проверяем, что дата разумная
@@ -187,11 +178,11 @@ def parse_grade_value(value):
     value_lower = value_str.lower()
     
     # Исключаем даты (формат YYYY-MM-DD или похожий)
-    if re.match(r'^\d{4}-\d{2}-\d{2}', value_str):
+    if DATE_PREFIX_PATTERN.match(value_str):
         return None
     
     # Исключаем значения, которые выглядят как даты с временем
-    if re.match(r'^\d{4}-\d{2}-\d{2}\s+\d{2}', value_str):
+    if DATETIME_PREFIX_PATTERN.match(value_str):
         return None
     
     # ВАЖНО: Проверяем на дробь СНАЧАЛА, до проверки на пропуск!
@@ -203,7 +194,7 @@ def parse_grade_value(value):
             second_part = parts[1].strip().lower()
             
             # Если вторая часть - это "б" или "н", то это пропуск
-            if second_part in ['б', 'н', 'нб', 'н/б']:
+            if second_part in ABSENCE_FRACTION_PARTS:
                 return "пропуск"
             
             # Проверяем, являются ли обе части числами
@@ -237,7 +228,7 @@ def parse_grade_value(value):
     
     # Проверяем на пропуск (ПОСЛЕ проверки на дроби!)
     # Проверяем только если это не дробь
-    if any(word == value_lower for word in ['н', 'нб', 'н/б', 'пропуск', 'н/я', 'неявка']) or value_str == '*':
+    if value_lower in ABSENCE_WORDS or value_str == '*':
         return "пропуск"
     
     # Пытаемся извлечь оценку (число)
@@ -254,7 +245,7 @@ def parse_grade_value(value):
         pass
     
     # Если не получилось, пытаемся извлечь число из строки
-    numbers = re.findall(r'\d+', value_str)
+    numbers = DIGITS_PATTERN.findall(value_str)
     if numbers:
         grade = numbers[0]
         grade_int = int(grade)
@@ -273,6 +264,92 @@ def parse_grade_value(value):
     return None
 
 
+# Кэш используемых диапазонов: лист -> (последняя строка, последняя колонка)
+_used_ranges = WeakKeyDictionary()
+
+# get_used_range(): проверка лимита времени каждые N ячеек листа
+USED_RANGE_CHECK_CELLS = 65536
+
+
+def _is_real_value(value):
+    """Значение, которое может что-то значить для парсинга (не пусто и не пробелы)"""
+    if value is None:
+        return False
+    if isinstance(value, str) and not value.strip():
+        return False
+    return True
+
+
+def get_used_range(worksheet, budget=None):
+    """
+    Последняя строка и колонка, в которых есть значения (номера с 1)
+    
+    max_row/max_column в openpyxl учитывают и пустые ячейки с форматированием -
+    в выгрузках Google Sheets это тысячи лишних строк. Здесь учитываются только
+    ячейки со значениями. Результат кэшируется для каждого листа.
+    
+    budget - лимиты времени (ParseBudget): обход всех ячеек листа тоже
+    проверяет срок (на "раздутом" листе их миллионы)
+    
+    Возвращает (0, 0), если на листе нет значений
+    """
+    used_range = getattr(worksheet, 'used_range', None)  # XmlWorksheet считает сам
+    if used_range is not None:
+        return used_range
+    used_range = _used_ranges.get(worksheet)
+    if used_range is not None:
+        return used_range
+    
+    last_row = last_col = 0
+    cells = getattr(worksheet, '_cells', None)
+    if isinstance(cells, dict):
+        # Только существующие ячейки openpyxl (без создания новых)
+        for index, ((row_idx, col_idx), cell) in enumerate(cells.items()):
+            if budget is not None and not index % USED_RANGE_CHECK_CELLS:
+                budget.check()
+            if _is_real_value(cell.value):
+                if row_idx > last_row:
+                    last_row = row_idx
+                if col_idx > last_col:
+                    last_col = col_idx
+    else:
+        for row_idx, row in enumerate(worksheet.iter_rows(values_only=True), start=1):
+            if budget is not None:
+                budget.check()
+            for col_idx, value in enumerate(row, start=1):
+                if _is_real_value(value):
+                    last_row = row_idx
+                    if col_idx > last_col:
+                        last_col = col_idx
+    
+    used_range = (last_row, last_col)
+    _used_ranges[worksheet] = used_range
+    return used_range
+
+
+def iter_row_window(worksheet, min_row, max_row, min_col=1, max_col=None):
+    """
+    Строки листа в окне колонок [min_col, max_col] (номера с 1, включительно)
+    
+    Окно обрезается по используемому диапазону (get_used_range), чтобы не читать
+    пустые колонки и не создавать новые ячейки.
+    Возвращает пары (номер_строки, кортеж_ячеек); ячейка i кортежа - колонка min_col + i
+    """
+    used_col = get_used_range(worksheet)[1]
+    last_col = used_col if max_col is None else min(max_col, used_col)
+    if max_row < min_row or last_col < min_col:
+        return iter(())
+    rows = worksheet.iter_rows(min_row=min_row, max_row=max_row, min_col=min_col, max_col=last_col)
+    return enumerate(rows, start=min_row)
+
+
+def row_window(worksheet, row_idx, min_col=1, max_col=None):
+    """Ячейки одной строки в окне колонок (см. iter_row_window)"""
+    for _, row in iter_row_window(worksheet, row_idx, row_idx, min_col, max_col):
+        return list(row)
+    return []
+
+
 def find_student_column(header_row):
     """
     Поиск колонки с ФИО студентов
@@ -283,7 +360,7 @@ def find_student_column(header_row):
     for idx, cell in enumerate(header_row):
         if cell.value:
             value = str(cell.value).lower().strip()
-            if any(word in value for word in ['фио', 'студент', 'фамилия', 'имя', 'ученик', 'учащийся']):
+            if STUDENT_COLUMN_PATTERN.search(value):
                 return idx
     # Если не нашли, пробуем первую колонку с текстом
     for idx, cell in enumerate(header_row):
@@ -321,7 +398,7 @@ def find_month_in_cell(cell_value):
             # Пытаемся найти год
             year = current_year
             # Ищем год в формате YYYY
-            year_match = re.search(r'20\d{2}', cell_str)
+            year_match = YEAR_PATTERN.search(cell_str)
             if year_match:
                 year = int(year_match.group())
             
@@ -343,6 +420,7 @@ def find_date_columns(header_row, worksheet, header_row_idx):
     
     Возвращает список кортежей: (индекс_колонки, дата)
     """
+    from .cell_classifier import classify_dates
     date_columns = []
     current_year = datetime.now().year
     
@@ -351,7 +429,7 @@ def find_date_columns(header_row, worksheet, header_row_idx):
     month_row = None
     
     if month_row_idx >= 1:
-        month_row = list(worksheet[month_row_idx])
+        month_row = row_window(worksheet, month_row_idx, 1, JOURNAL_LAST_COLUMN)
     
     # Для каждой колонки определяем месяц из строки выше
     column_months = {}  # индекс_колонки -> (month, year)
@@ -383,6 +461,9 @@ def find_date_columns(header_row, worksheet, header_row_idx):
     last_date_col_idx = None  # Индекс последней колонки с датой
     dates_in_month = {}  # месяц -> список дат (для проверки логики)
     
+    # Полные даты в заголовке (если формат другой) - разбираем всю строку сразу
+    header_dates = classify_dates(cell.value for cell in header_row)
+    
     for idx, cell in enumerate(header_row):
         # Начинаем парсить с колонки C
         # Не ограничиваем конец, чтобы захватить все даты
@@ -446,7 +527,7 @@ def find_date_columns(header_row, worksheet, header_row_idx):
         
         # Пытаемся распарсить как полную дату (на случай если формат другой)
         if not current_date:
-            parsed_date = parse_date(cell_value)
+            parsed_date = header_dates[idx]
             if parsed_date:
                 current_date = parsed_date
                 last_date = current_date
@@ -459,7 +540,7 @@ def find_date_columns(header_row, worksheet, header_row_idx):
     return date_columns
 
 
-def parse_topics_table(worksheet, group_name, subject_name, start_row=1):
+def parse_topics_table(worksheet, group_name, subject_name, start_row=1, budget=None):
     """
     Парсит таблицу с темами занятий (Форма 1, где в колонке "Кол-во часов" всегда "2")
     
@@ -475,10 +556,12 @@ def parse_topics_table(worksheet, group_name, subject_name, start_row=1):
       * В названии есть "4" (как часть темы, например "Тема 1.1. ... 4. ...")
     
     Возвращает список тем занятий
+    budget - лимиты (ParseBudget), учитывается каждая прочитанная строка
     """
+    from .cell_classifier import classify_dates
     topics_data = []
-    max_row = worksheet.max_row
-    max_col = worksheet.max_column
+    # Строки после последней строки со значениями не читаем
+    max_row = get_used_range(worksheet, budget)[0]
     
     # Колонка AE имеет индекс 30 (A=0, B=1, ..., AE=30)
     AE_COLUMN_INDEX = 30
@@ -489,21 +572,23 @@ def parse_topics_table(worksheet, group_name, subject_name, start_row=1):
     hours_col = None
     topic_col = None
     
-    # Ищем строку с заголовками "Кол-во часов" или "Наименование учебного занятия"
-    # Ищем по всему листу, не только в первых 100 строках
-    for row_idx in range(start_row, max_row + 1):
-        row = list(worksheet[row_idx])
-        row_text_lower = ' '.join([str(cell.value).lower() if cell.value else '' for cell in row])
+    # Ищем строку с заголовками "Кол-во часов" и "Наименование учебного занятия"
+    # Ищем по всему листу, но только в колонках AE и дальше (таблица тем)
+    for row_idx, row in iter_row_window(worksheet, start_row, max_row, TOPICS_FIRST_COLUMN):
+        if budget is not None:
+            budget.charge(len(row))
         
-        # Ищем ключевые слова заголовков - более гибкий поиск
-        has_hours = 'кол-во часов' in row_text_lower or 'количество часов' in row_text_lower or 'часов' in row_text_lower
-        has_topic = 'наименование учебного занятия' in row_text_lower or ('наименование' in row_text_lower and 'занятия' in row_text_lower) or 'наименование' in row_text_lower
+        # Ключевые слова заголовков - более гибкий поиск
+        found_words = set()
+        for cell in row:
+            if cell.value and isinstance(cell.value, str):
+                found_words.update(TOPICS_HEADER_PATTERN.findall(cell.value.lower()))
         
-        if has_hours and has_topic:
+        if found_words == TOPICS_HEADER_WORDS:
             header_row_idx = row_idx
             
-            # Находим колонки
-            for col_idx, cell in enumerate(row):
+            # Находим колонки (индексы от A, как и раньше)
+            for col_idx, cell in enumerate(row, start=AE_COLUMN_INDEX):
                 if not cell.value:
                     continue
                 cell_value = str(cell.value).lower().strip()
@@ -530,14 +615,18 @@ def parse_topics_table(worksheet, group_name, subject_name, start_row=1):
         return topics_data
     
     # Парсим строки с темами (начинаем со следующей строки после заголовка)
-    for row_idx in range(header_row_idx + 1, max_row + 1):
-        row = list(worksheet[row_idx])
-        
-        if len(row) <= max(hours_col, topic_col):
+    # Строки читаются с колонки AE: индекс ячейки = индекс колонки - AE_COLUMN_INDEX
+    date_values = []  # исходные значения дат проведения (по одному на тему)
+    for row_idx, row in iter_row_window(worksheet, header_row_idx + 1, max_row, TOPICS_FIRST_COLUMN):
+        if budget is not None:
+            budget.charge(len(row))
+        row_len = AE_COLUMN_INDEX + len(row)
+        
+        if row_len <= max(hours_col, topic_col):
             continue
         
-        hours_cell = row[hours_col] if hours_col < len(row) else None
-        topic_cell = row[topic_col] if topic_col < len(row) else None
+        hours_cell = row[hours_col - AE_COLUMN_INDEX] if hours_col < row_len else None
+        topic_cell = row[topic_col - AE_COLUMN_INDEX] if topic_col < row_len else None
         
         if not topic_cell or not topic_cell.value:
             continue
@@ -549,7 +638,7 @@ def parse_topics_table(worksheet, group_name, subject_name, start_row=1):
             continue
         
         # Проверяем, что это не заголовок
-        if any(keyword in topic_name.lower() for keyword in ['наименование', 'занятия', 'дата', 'кол-во', 'часов']):
+        if TOPIC_HEADER_WORDS_PATTERN.search(topic_name.lower()):
             continue
         
         # Получаем количество часов (обычно "2")
@@ -580,14 +669,13 @@ def parse_topics_table(worksheet, group_name, subject_name, start_row=1):
         if hours_is_two and has_tema and has_four:
             continue
         
-        # Получаем дату проведения (если есть)
-        date_value = None
-        if date_col is not None and date_col < len(row):
-            date_cell = row[date_col]
+        # Дата проведения (если есть) - разбираем весь столбец после цикла
+        date_raw = None
+        if date_col is not None and date_col < row_len:
+            date_cell = row[date_col - AE_COLUMN_INDEX]
             if date_cell and date_cell.value:
-                parsed_date = parse_date(date_cell.value)
-                if parsed_date:
-                    date_value = parsed_date
+                date_raw = date_cell.value
+        date_values.append(date_raw)
         
         # Добавляем тему (даже если часов нет, но есть название темы)
         topics_data.append({
@@ -595,13 +683,18 @@ def parse_topics_table(worksheet, group_name, subject_name, start_row=1):
             'subject': subject_name,
             'topic': topic_name,
             'hours': hours_value if hours_value else 2,  # По умолчанию 2, как указал пользователь
-            'date': date_value
+            'date': None
         })
     
+    # Даты проведения всех тем - одним вызовом (номера дней Excel преобразуются векторно)
+    for topic, parsed_date in zip(topics_data, classify_dates(date_values)):
+        if parsed_date:
+            topic['date'] = parsed_date
+    
     return topics_data
 
 
-def parse_sheet(worksheet, group_name, subject_name):
+def parse_sheet(worksheet, group_name, subject_name, report=None, budget=None):
     """
     Парсинг одного листа Excel с поддержкой нескольких журналов
     
@@ -613,37 +706,39 @@ def parse_sheet(worksheet, group_name, subject_name):
        - Находит колонки с датами (определяет месяц для каждой колонки из строки с месяцами)
        - Парсит данные до следующего заголовка или до конца листа
     4. Также парсит таблицу с темами занятий (где "Кол-во часов" = 2)
-    5. Возвращает список словарей с данными (все данные из всех журналов + темы)
-    """
-    data = []
-    max_row = worksheet.max_row
+    5. Возвращает SheetBatch (parsers/sheet_batch.py) - оценки всех журналов
+       по колонкам + темы; при итерации дает словари в прежнем формате
     
-    # Находим все строки с заголовками "ФИО" по всему листу
+    Все циклы идут только до последней строки/колонки со значениями (get_used_range).
+    report - словарь для отчета о парсинге (необязательно):
+    report['empty_rows_skipped'] - сколько пустых строк в конце листа не читалось
+    budget - лимиты времени/ячеек (ParseBudget); при превышении - BudgetExceeded
+    """
+    from .cell_classifier import classify_grade
+    data = SheetBatch(group_name, subject_name)
+    max_row = get_used_range(worksheet, budget)[0]
+    if report is not None:
+        report['empty_rows_skipped'] = report.get('empty_rows_skipped', 0) + worksheet.max_row - max_row
+    
+    # Находим все строки с заголовками "ФИО" по всему листу (в колонках журнала A..AD)
+    # Ключевые слова могут быть только в текстовых ячейках
     header_rows = []
-    for idx in range(1, max_row + 1):
-        row = list(worksheet[idx])
+    for idx, row in iter_row_window(worksheet, 1, max_row, 1, JOURNAL_LAST_COLUMN):
+        if budget is not None:
+            budget.charge(len(row))
         for cell in row:
-            if cell.value:
-                cell_value = str(cell.value).lower().strip()
-                if 'фио' in cell_value or 'студент' in cell_value:
-                    header_rows.append(idx)
-                    break
+            if cell.value and isinstance(cell.value, str) and HEADER_ROW_PATTERN.search(cell.value.lower()):
+                header_rows.append(idx)
+                break
     
     if not header_rows:
         return data
     
-    # Список заголовков, которые не являются студентами
-    header_keywords = [
-        'месяц/число', 'фио обучающихся', 'фио', 'кол-во часов', 
-        'количество часов', 'часы', 'студент', 'обучающийся',
-        'фамилия', 'имя', 'отчество', 'дата', 'оценка', 'пропуск'
-    ]
-    
     def is_header_row(fio_text):
         """Проверяет, является ли строка заголовком, а не студентом"""
         fio_lower = fio_text.lower().strip()
-        # Если содержит ключевые слова заголовков
-        if any(keyword in fio_lower for keyword in header_keywords):
+        # Если содержит ключевые слова заголовков (JOURNAL_HEADER_KEYWORDS)
+        if JOURNAL_HEADER_PATTERN.search(fio_lower):
             return True
         # Если слишком короткое или содержит только цифры/символы
         if len(fio_lower) < 3:
@@ -664,8 +759,8 @@ def parse_sheet(worksheet, group_name, subject_name):
         else:
             end_row = max_row + 1
         
-        # Получаем строку заголовков
-        header_row = list(worksheet[header_row_idx])
+        # Получаем строку заголовков (колонки журнала A..AD)
+        header_row = row_window(worksheet, header_row_idx, 1, JOURNAL_LAST_COLUMN)
         student_col = find_student_column(header_row)
         date_columns = find_date_columns(header_row, worksheet, header_row_idx)
         
@@ -675,9 +770,10 @@ def parse_sheet(worksheet, group_name, subject_name):
         if not date_columns:
             continue
         
-        # Парсим данные студентов в этом журнале
-        for row_idx in range(start_row, end_row):
-            row = list(worksheet[row_idx])
+        # Парсим данные студентов в этом журнале (колонки A..AD)
+        for row_idx, row in iter_row_window(worksheet, start_row, end_row - 1, 1, JOURNAL_LAST_COLUMN):
+            if budget is not None:
+                budget.charge(len(row))
             
             if len(row) <= student_col:
                 continue
@@ -721,31 +817,18 @@ def parse_sheet(worksheet, group_name, subject_name):
                     continue
                 
                 # Парсим оценку только если ячейка не пустая
-                grade_value = parse_grade_value(cell.value)
+                grade_value = classify_grade(cell.value)
                 
                 # Добавляем оценку только если она валидна и не None
                 if grade_value:
-                    data.append({
-                        'group': group_name,
-                        'subject': subject_name,
-                        'fio': student_fio,
-                        'date': date,
-                        'grade': grade_value
-                    })
+                    data.add_grade(student_fio, date, grade_value)
     
     # Парсим таблицу с темами занятий (ищем по всему листу)
-    topics_data = parse_topics_table(worksheet, group_name, subject_name, start_row=1)
+    topics_data = parse_topics_table(worksheet, group_name, subject_name, start_row=1, budget=budget)
     
     # Добавляем темы к данным (сохраняем как специальный тип данных)
     for topic in topics_data:
-        data.append({
-            'group': group_name,
-            'subject': subject_name,
-            'type': 'topic',  # Помечаем как тему
-            'topic': topic['topic'],
-            'hours': topic['hours'],
-            'date': topic.get('date')
-        })
+        data.add_topic(topic['topic'], topic['hours'], topic.get('date'))
     
     return data
 
@@ -760,7 +843,13 @@ def calculate_subject_statistics(sheet_data):
     - grades_count: количество оценок (не пропусков)
     - absences_count: количество пропусков
     - attendance_percent: процент посещаемости (0-100)
+    
+    Для SheetBatch счетчики уже накоплены при парсинге (SheetBatch.summary()),
+    список словарей проходится заново.
     """
+    if isinstance(sheet_data, SheetBatch):
+        return sheet_data.summary()
+    
     total = 0
     grades_count = 0
     absences_count = 0
@@ -781,7 +870,7 @@ def calculate_subject_statistics(sheet_data):
         
         if grade_value:
             total += 1
-            if grade_value.lower() in ['пропуск', 'н', 'н/я', 'неявка', 'нб', 'н/б'] or grade_value == '*':
+            if is_absence(grade_value):
                 absences_count += 1
             else:
                 grades_count += 1
@@ -789,24 +878,42 @@ def calculate_subject_statistics(sheet_data):
     # Общее количество занятий = количество уникальных дат
     total_classes = len(unique_dates)
     
-    # Вычисляем процент посещаемости
-    # Посещаемость = (количество оценок / общее количество) * 100
-    # Если нет записей, посещаемость = 0%
-    if total > 0:
-        attendance_percent = round((grades_count / total) * 100, 1)
-    else:
-        attendance_percent = 0.0
-    
     return {
         'total_classes': total_classes,
         'total': total,
         'grades_count': grades_count,
         'absences_count': absences_count,
-        'attendance_percent': attendance_percent
+        'attendance_percent': attendance_percent(grades_count, total)
     }
 
 
-def parse_excel_file(file_path):
+def load_workbook_for_parsing(file_path, deadline=None):
+    """
+    Загрузка файла выбранным движком (PARSER_ENGINE в config.py)
+    
+    - "openpyxl" - стандартная загрузка (только вкладки от ОГСЭ/ОГЭ до УП)
+    - "xml" - чтение XML вкладок напрямую (parsers/xml_reader.py);
+      если файл не удается прочитать, используется openpyxl
+    
+    deadline - срок файла (file_deadline()): openpyxl не загружает вкладки
+    после срока (их парсинг все равно будет прерван)
+    
+    Возвращает (workbook, все_названия_вкладок, (start_idx, end_idx))
+    """
+    if PARSER_ENGINE == 'xml':
+        try:
+            return load_xml_workbook(file_path)
+        except Exception as e:
+            print(f"Файл {file_path} будет прочитан через openpyxl: {e}")
+    return load_sheet_range(file_path, data_only=True, deadline=deadline)
+
+
+def group_name_from_file(file_name):
+    """Название группы из имени файла: 'Испп 23-09.1.xlsx' -> '23-09.1'"""
+    return file_name.replace('Испп ', '').replace('.xslm', '').replace('.xlsx', '').replace('temp_', '')
+
+
+def parse_excel_batches(file_path, report=None):
     """
     Парсинг Excel файла
     
@@ -816,85 +923,75 @@ def parse_excel_file(file_path):
     3. Находит первую вкладку, начинающуюся с "ОГСЭ" или "ОГЭ"
     4. Парсит все вкладки до тех, которые начинаются с "УП"
     5. Для каждой вкладки вызывает parse_sheet() (даже если там нет данных)
-    6. Вычисляет статистику для каждого предмета
-    7. Возвращает объединенные данные с информацией о статистике
+    6. Вычисляет статистику для каждого предмета (SheetBatch.statistics)
+    7. Возвращает список SheetBatch - по одному на вкладку
+    
+    report - словарь для отчета о парсинге (необязательно): заполняется
+    счетчиками по всем вкладкам файла (см. parse_sheet)
+    
+    Лимиты (parsers/parse_budget.py): вкладка, превысившая лимит времени/ячеек,
+    пропускается (нет ни оценок, ни статистики) и попадает в
+    report['aborted_sheets'] с метриками; после срока файла оставшиеся
+    вкладки не парсятся. Срок файла включает и загрузку вкладок.
     """
     
     try:
+        # Срок для всего файла (FILE_TIME_BUDGET_SECONDS) - вместе с загрузкой
+        deadline = file_deadline()
+        
         # Загружаем файл с data_only=True для получения вычисленных значений
         # Но даты будем парсить специальным образом
-        workbook = load_workbook(file_path, data_only=True)
-        sheet_names = workbook.sheetnames
+        # Разбираются только вкладки от ОГСЭ/ОГЭ до УП (см. workbook_loader.py)
+        workbook, sheet_names, (start_idx, end_idx) = load_workbook_for_parsing(file_path, deadline)
         
         # Извлекаем название группы из имени файла
         filename = os.path.basename(file_path)  # Получаем только имя файла
-        group_name = filename.replace('Испп ', '').replace('.xslm', '').replace('.xlsx', '').replace('temp_', '')
-        
-        all_data = []
-        
-        # Находим первую вкладку, начинающуюся с "ОГСЭ" или "ОГЭ"
-        start_idx = None
-        for idx, sheet_name in enumerate(sheet_names):
-            sheet_name_upper = sheet_name.upper().strip()
-            if sheet_name_upper.startswith('ОГСЭ') or sheet_name_upper.startswith('ОГЭ'):
-                start_idx = idx
-                break
-        
-        # Если не нашли вкладку с ОГСЭ/ОГЭ, используем старую логику (пропускаем первые 3)
-        if start_idx is None:
-            start_idx = min(SKIP_FIRST_SHEETS, len(sheet_names))
-        
-        # Находим индекс первой вкладки, начинающейся с "УП"
-        end_idx = len(sheet_names)
-        for idx, sheet_name in enumerate(sheet_names):
-            sheet_name_upper = sheet_name.upper().strip()
-            if sheet_name_upper.startswith('УП'):
-                end_idx = idx
-                break
+        group_name = group_name_from_file(filename)
         
-        # Если не нашли вкладку с УП, используем старую логику
-        if end_idx == len(sheet_names):
-            for idx, sheet_name in enumerate(sheet_names):
-                if STOP_SHEET_NAME.lower() in sheet_name.lower():
-                    end_idx = idx
-                    break
+        batches = []
         
-        if start_idx is None or start_idx >= end_idx:
+        if start_idx >= end_idx:
             workbook.close()
-            return all_data
+            return batches
         
         # Парсим все вкладки от ОГСЭ до УП (даже если там нет данных)
         for idx in range(start_idx, end_idx):
             sheet_name = sheet_names[idx]
-            worksheet = workbook[sheet_name]
             
             # Извлекаем название предмета из названия вкладки
             subject_name = sheet_name
             
-            # Парсим вкладку (даже если там нет данных, parse_sheet вернет пустой список)
-            sheet_data = parse_sheet(worksheet, group_name, subject_name)
-            
-            # Вычисляем статистику для этого предмета
-            statistics = calculate_subject_statistics(sheet_data)
-            
-            # Добавляем статистику к данным предмета
-            # Сохраняем статистику как специальную запись типа 'statistics'
-            all_data.append({
-                'group': group_name,
-                'subject': subject_name,
-                'type': 'statistics',
-                'total_classes': statistics['total_classes'],
-                'total': statistics['total'],
-                'grades_count': statistics['grades_count'],
-                'absences_count': statistics['absences_count'],
-                'attendance_percent': statistics['attendance_percent']
-            })
+            # Парсим вкладку (даже если там нет данных, parse_sheet вернет пустой SheetBatch)
+            # Вкладку, превысившую лимит, пропускаем - остальные парсятся как обычно
+            budget = ParseBudget(deadline=deadline)
+            try:
+                budget.check()
+                worksheet = workbook[sheet_name]
+                budget.check()  # движок "xml" читает вкладку при обращении
+                if isinstance(worksheet, Chartsheet):
+                    # Вкладка-диаграмма: ячеек нет, это не журнал
+                    print(f"ℹ️ Вкладка '{sheet_name}' файла {filename} пропущена: диаграмма")
+                    continue
+                sheet_data = parse_sheet(worksheet, group_name, subject_name, report, budget)
+            except BudgetExceeded as e:
+                print(f"⚠️ Вкладка '{sheet_name}' файла {filename} пропущена: {e}")
+                if report is not None:
+                    report.setdefault('aborted_sheets', []).append({
+                        'file': filename,
+                        'group': group_name,
+                        'sheet': sheet_name,
+                        'reason': e.reason,
+                        **e.metrics
+                    })
+                continue
             
-            # Добавляем все остальные данные (оценки, темы и т.д.)
-            all_data.extend(sheet_data)
+            # Статистика предмета - счетчики накоплены при парсинге (без второго прохода)
+            # (при итерации SheetBatch отдает ее первой записью типа 'statistics')
+            sheet_data.statistics = sheet_data.summary()
+            batches.append(sheet_data)
         
         workbook.close()
-        return all_data
+        return batches
         
     except Exception as e:
         print(f"Ошибка при парсинге файла {file_path}: {e}")
@@ -902,3 +999,12 @@ def parse_excel_file(file_path):
         traceback.print_exc()
         return []
 
+
+def parse_excel_file(file_path, report=None):
+    """
+    Парсинг Excel файла в прежнем формате - список словарей
+    
+    Для каждой вкладки: запись типа 'statistics', затем оценки, затем темы
+    (см. parse_excel_batches и SheetBatch)
+    """
+    return [record for batch in parse_excel_batches(file_path, report) for record in batch]
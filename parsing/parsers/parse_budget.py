@@ -0,0 +1,103 @@
+"""
+ЛИМИТЫ ВРЕМЕНИ И ЯЧЕЕК ПРИ ПАРСИНГЕ
+===================================
+
+Одна "патологическая" вкладка (огромный фантомный диапазон, тысячи
+объединенных ячеек) не должна останавливать весь ежечасный запуск.
+
+Логика:
+1. Для каждой вкладки создается ParseBudget с лимитами из config.py:
+   - SHEET_TIME_BUDGET_SECONDS - время на вкладку
+   - SHEET_CELL_BUDGET - количество прочитанных ячеек на вкладку
+   - FILE_TIME_BUDGET_SECONDS - время на весь файл (общий срок для всех вкладок,
+     отсчитывается до загрузки книги - загрузка вкладок тоже входит в срок)
+2. Циклы парсинга вызывают budget.charge(ячеек_в_строке) на каждой строке
+3. При превышении - BudgetExceeded с метриками (время, строки, ячейки);
+   вкладка пропускается, остальные парсятся как обычно; группа с
+   пропущенной вкладкой не записывается в БД (pipeline.py)
+
+Значение 0 (или None) отключает соответствующий лимит.
+"""
+
+import sys
+import os
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SHEET_TIME_BUDGET_SECONDS, SHEET_CELL_BUDGET, FILE_TIME_BUDGET_SECONDS
+
+# Причины остановки
+REASON_SHEET_TIME = "sheet_time"
+REASON_SHEET_CELLS = "sheet_cells"
+REASON_FILE_TIME = "file_time"
+
+REASON_NAMES = {
+    REASON_SHEET_TIME: "превышено время на вкладку",
+    REASON_SHEET_CELLS: "превышен лимит ячеек на вкладку",
+    REASON_FILE_TIME: "превышено время на файл",
+}
+
+
+class BudgetExceeded(Exception):
+    """Вкладка превысила лимит - парсинг вкладки прерывается"""
+
+    def __init__(self, reason, metrics):
+        self.reason = reason
+        self.metrics = metrics
+        super().__init__(
+            f"{REASON_NAMES.get(reason, reason)} "
+            f"({metrics['elapsed_seconds']} сек, строк: {metrics['rows']}, ячеек: {metrics['cells']})"
+        )
+
+
+def file_deadline(time_limit=None):
+    """Срок для файла (time.monotonic()) или None, если лимит отключен"""
+    if time_limit is None:
+        time_limit = FILE_TIME_BUDGET_SECONDS
+    if not time_limit:
+        return None
+    return time.monotonic() + time_limit
+
+
+class ParseBudget:
+    """
+    Лимиты для одной вкладки
+
+    Args:
+        time_limit: секунд на вкладку (None - из config, 0 - без лимита)
+        cell_limit: ячеек на вкладку (None - из config, 0 - без лимита)
+        deadline: срок файла (см. file_deadline())
+    """
+
+    def __init__(self, time_limit=None, cell_limit=None, deadline=None):
+        self.time_limit = SHEET_TIME_BUDGET_SECONDS if time_limit is None else time_limit
+        self.cell_limit = SHEET_CELL_BUDGET if cell_limit is None else cell_limit
+        self.deadline = deadline
+        self.started = time.monotonic()
+        self.rows = 0
+        self.cells = 0
+
+    def metrics(self):
+        """Метрики для лога: время, прочитанные строки и ячейки"""
+        return {
+            "elapsed_seconds": round(time.monotonic() - self.started, 3),
+            "rows": self.rows,
+            "cells": self.cells,
+        }
+
+    def check(self):
+        """Проверка лимитов времени (без учета ячеек)"""
+        now = time.monotonic()
+        if self.deadline is not None and now > self.deadline:
+            raise BudgetExceeded(REASON_FILE_TIME, self.metrics())
+        if self.time_limit and now - self.started > self.time_limit:
+            raise BudgetExceeded(REASON_SHEET_TIME, self.metrics())
+
+    def charge(self, cells):
+        """Учет одной прочитанной строки из cells ячеек"""
+        self.rows += 1
+        self.cells += cells
+        if self.cell_limit and self.cells > self.cell_limit:
+            raise BudgetExceeded(REASON_SHEET_CELLS, self.metrics())
+        self.check()
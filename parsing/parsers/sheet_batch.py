@@ -0,0 +1,165 @@
+"""
+КОЛОНОЧНОЕ ПРЕДСТАВЛЕНИЕ ДАННЫХ ВКЛАДКИ
+======================================
+
+Раньше вкладка возвращалась списком словарей, и каждая оценка повторяла
+ключи и значения 'group', 'subject', 'fio', 'date', 'grade'. SheetBatch
+хранит то же самое по колонкам:
+
+- group, subject - одна (интернированная) строка на всю вкладку
+- students - таблица ФИО, dates - таблица дат, values - таблица значений оценок
+- student_idx, date_idx, value_code - массивы (array) номеров в этих таблицах,
+  по одному элементу на оценку
+- topics - темы занятий (topic, hours, date)
+- statistics - статистика предмета (заполняется parse_excel_batches)
+
+Счетчики статистики (занятия, оценки, пропуски) обновляются в add_grade(),
+поэтому статистика предмета (summary()) не требует второго прохода по
+оценкам. Статистика по студентам здесь не считается - ее считает API по
+записанным данным (analytics.py).
+
+Для старого кода SheetBatch итерируется словарями в прежнем формате и порядке:
+статистика, оценки, темы.
+"""
+
+import sys
+from array import array
+
+# Значения, которые в статистике считаются пропуском
+STATISTICS_ABSENCE_VALUES = frozenset(['пропуск', 'н', 'н/я', 'неявка', 'нб', 'н/б'])
+
+
+def is_absence(grade):
+    """Оценка - пропуск (для статистики)"""
+    return grade.lower() in STATISTICS_ABSENCE_VALUES or grade == '*'
+
+
+def attendance_percent(grades_count, total):
+    """Посещаемость = (количество оценок / общее количество) * 100; без записей - 0%"""
+    if total > 0:
+        return round((grades_count / total) * 100, 1)
+    return 0.0
+
+
+class SheetBatch:
+    """
+    Данные одной вкладки (предмета группы) в колоночном виде
+    """
+
+    def __init__(self, group, subject):
+        self.group = sys.intern(group)
+        self.subject = sys.intern(subject)
+
+        # Таблицы уникальных значений (номер -> значение)
+        self.students = []
+        self.dates = []
+        self.values = []
+        self._student_index = {}
+        self._date_index = {}
+        self._value_index = {}
+
+        # Колонки оценок: по одному элементу на оценку
+        self.student_idx = array('I')
+        self.date_idx = array('I')
+        self.value_code = array('I')
+
+        self.topics = []  # [(topic, hours, date), ...]
+        self.statistics = None  # словарь статистики (см. summary())
+
+        # Счетчики статистики (обновляются в add_grade)
+        self._value_absence = []  # номер значения -> пропуск? (None - пустая оценка, не считается)
+        self._class_dates = set()  # номера дат, на которые есть оценки
+        self.total = 0  # оценок + пропусков
+        self.absences_count = 0
+
+    @staticmethod
+    def _code(value, table, index):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(table)
+            table.append(value)
+        return code
+
+    def add_grade(self, fio, date, grade):
+        """Добавляет оценку/пропуск студента на дату (и учитывает ее в статистике)"""
+        student = self._code(fio, self.students, self._student_index)
+        date_code = self._code(date, self.dates, self._date_index)
+        value = self._code(grade, self.values, self._value_index)
+        if value == len(self._value_absence):
+            self._value_absence.append(is_absence(grade) if grade else None)
+
+        self.student_idx.append(student)
+        self.date_idx.append(date_code)
+        self.value_code.append(value)
+
+        absence = self._value_absence[value]
+        if absence is None:
+            return
+        if date:
+            self._class_dates.add(date_code)
+        self.total += 1
+        if absence:
+            self.absences_count += 1
+
+    def add_topic(self, topic, hours, date):
+        """Добавляет тему занятия"""
+        self.topics.append((topic, hours, date))
+
+    @property
+    def grades_count(self):
+        """Количество оценок (записей журнала)"""
+        return len(self.student_idx)
+
+    def summary(self):
+        """
+        Статистика предмета (как calculate_subject_statistics):
+        total_classes (уникальных дат), total, grades_count, absences_count,
+        attendance_percent
+        """
+        grades_count = self.total - self.absences_count
+        return {
+            'total_classes': len(self._class_dates),
+            'total': self.total,
+            'grades_count': grades_count,
+            'absences_count': self.absences_count,
+            'attendance_percent': attendance_percent(grades_count, self.total)
+        }
+
+    def iter_grades(self):
+        """Оценки в порядке добавления: (fio, date, grade)"""
+        students, dates, values = self.students, self.dates, self.values
+        for student, date, value in zip(self.student_idx, self.date_idx, self.value_code):
+            yield students[student], dates[date], values[value]
+
+    def __len__(self):
+        return (1 if self.statistics is not None else 0) + len(self.student_idx) + len(self.topics)
+
+    def __iter__(self):
+        """Словари в прежнем формате: статистика, оценки, темы"""
+        if self.statistics is not None:
+            record = {
+                'group': self.group,
+                'subject': self.subject,
+                'type': 'statistics',
+            }
+            record.update(self.statistics)
+            yield record
+
+        for fio, date, grade in self.iter_grades():
+            yield {
+                'group': self.group,
+                'subject': self.subject,
+                'fio': fio,
+                'date': date,
+                'grade': grade
+            }
+
+        for topic, hours, date in self.topics:
+            yield {
+                'group': self.group,
+                'subject': self.subject,
+                'type': 'topic',
+                'topic': topic,
+                'hours': hours,
+                'date': date
+            }
@@ -0,0 +1,144 @@
+"""
+ЗАГРУЗКА НУЖНЫХ ВКЛАДОК EXCEL
+=============================
+
+load_workbook() из openpyxl разбирает XML всех вкладок файла, хотя парсятся
+только вкладки от "ОГСЭ"/"ОГЭ" до "УП". Здесь:
+
+1. Читается xl/workbook.xml (список вкладок, без их содержимого)
+2. По тем же правилам, что и раньше, выбирается диапазон вкладок
+   (select_sheet_range)
+3. Разбирается XML только выбранных вкладок - остальные даже не распаковываются
+
+Пропущенные вкладки не занимают память и время загрузки.
+
+Функции:
+- select_sheet_range() - диапазон вкладок для парсинга по их названиям
+- load_sheet_range() - загрузка workbook только с вкладками из диапазона
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl.reader.excel import ExcelReader
+
+from config import SKIP_FIRST_SHEETS, STOP_SHEET_NAME
+
+
+def select_sheet_range(sheet_names):
+    """
+    Диапазон вкладок для парсинга: [start_idx, end_idx)
+
+    Правила:
+    1. Начало - первая вкладка, начинающаяся с "ОГСЭ" или "ОГЭ"
+       (если нет - пропускаем первые SKIP_FIRST_SHEETS вкладок)
+    2. Конец - первая вкладка, начинающаяся с "УП"
+       (если нет - вкладка, содержащая STOP_SHEET_NAME, иначе до конца)
+
+    Returns:
+        tuple: (start_idx, end_idx); если start_idx >= end_idx - парсить нечего
+    """
+    # Находим первую вкладку, начинающуюся с "ОГСЭ" или "ОГЭ"
+    start_idx = None
+    for idx, sheet_name in enumerate(sheet_names):
+        sheet_name_upper = sheet_name.upper().strip()
+        if sheet_name_upper.startswith('ОГСЭ') or sheet_name_upper.startswith('ОГЭ'):
+            start_idx = idx
+            break
+
+    # Если не нашли вкладку с ОГСЭ/ОГЭ, используем старую логику (пропускаем первые 3)
+    if start_idx is None:
+        start_idx = min(SKIP_FIRST_SHEETS, len(sheet_names))
+
+    # Находим индекс первой вкладки, начинающейся с "УП"
+    end_idx = len(sheet_names)
+    for idx, sheet_name in enumerate(sheet_names):
+        sheet_name_upper = sheet_name.upper().strip()
+        if sheet_name_upper.startswith('УП'):
+            end_idx = idx
+            break
+
+    # Если не нашли вкладку с УП, используем старую логику
+    if end_idx == len(sheet_names):
+        for idx, sheet_name in enumerate(sheet_names):
+            if STOP_SHEET_NAME.lower() in sheet_name.lower():
+                end_idx = idx
+                break
+
+    return start_idx, end_idx
+
+
+class SheetRangeReader(ExcelReader):
+    """
+    ExcelReader, который разбирает только вкладки из select_sheet_range()
+
+    deadline - срок (time.monotonic(), см. parse_budget.file_deadline()):
+    вкладки после срока не загружаются (их нет в workbook)
+
+    После read():
+    - all_sheet_names - названия всех вкладок файла (как workbook.sheetnames
+      у обычного load_workbook)
+    - sheet_range - выбранный диапазон (start_idx, end_idx) в all_sheet_names
+    """
+
+    def __init__(self, fn, deadline=None, **kwargs):
+        super().__init__(fn, **kwargs)
+        self.deadline = deadline
+        self.all_sheet_names = []
+        self.sheet_range = (0, 0)
+
+    def _until_deadline(self, sheets):
+        """Вкладки по одной, пока не истек срок"""
+        for sheet in sheets:
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                return
+            yield sheet
+
+    def read_worksheets(self):
+        # Те же вкладки, что загрузил бы openpyxl (с корректной ссылкой на XML)
+        available = [sheet for sheet, rel in self.parser.find_sheets() if rel.target in self.valid_files]
+        self.all_sheet_names = [sheet.name for sheet in available]
+        self.sheet_range = select_sheet_range(self.all_sheet_names)
+        start_idx, end_idx = self.sheet_range
+        selected = available[start_idx:end_idx]
+
+        # Локальные имена (области печати и т.п.) ссылаются на номер вкладки
+        # в исходном списке - перенумеровываем, имена пропущенных вкладок убираем
+        positions = {id(sheet): pos for pos, sheet in enumerate(self.parser.sheets)}
+        new_index = {positions[id(sheet)]: idx for idx, sheet in enumerate(selected)}
+        defined_names = getattr(self.parser, 'defined_names', None)
+        if defined_names is not None:
+            kept = []
+            for defn in defined_names.definedName:
+                if defn.localSheetId is not None:
+                    if int(defn.localSheetId) not in new_index:
+                        continue
+                    defn.localSheetId = new_index[int(defn.localSheetId)]
+                kept.append(defn)
+            defined_names.definedName = kept
+
+        # find_sheets() в базовом классе перебирает parser.sheets
+        # (срок проверяется перед разбором каждой вкладки)
+        self.parser.sheets = self._until_deadline(selected)
+        # Активная вкладка могла быть пропущена
+        self.wb.active = 0
+        super().read_worksheets()
+
+
+def load_sheet_range(file_path, data_only=True, deadline=None):
+    """
+    Загружает Excel файл, разбирая только вкладки от ОГСЭ/ОГЭ до УП
+
+    deadline - срок загрузки (см. SheetRangeReader); вкладки после срока
+    не загружаются
+
+    Returns:
+        tuple: (workbook, all_sheet_names, (start_idx, end_idx))
+        workbook.sheetnames == all_sheet_names[start_idx:end_idx]
+        (без вкладок, не загруженных до срока)
+    """
+    reader = SheetRangeReader(file_path, deadline=deadline, data_only=data_only)
+    reader.read()
+    return reader.wb, reader.all_sheet_names, reader.sheet_range
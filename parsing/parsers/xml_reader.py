@@ -0,0 +1,453 @@
+"""
+БЫСТРОЕ ЧТЕНИЕ ВКЛАДОК НАПРЯМУЮ ИЗ XML
+======================================
+
+Альтернативный движок (PARSER_ENGINE = "xml"): вместо объектов Cell openpyxl
+XML вкладки читается потоково (iterparse) в таблицу значений. Результат -
+объект с тем же интерфейсом, что использует parse_sheet():
+worksheet.max_row, worksheet.max_column, worksheet[номер_строки] -> ячейки с .value
+
+Логика:
+1. Служебные части файла (список вкладок, связи, общие строки) читаются
+   средствами openpyxl - как при обычной загрузке
+2. Из styles.xml читаются только форматы чисел (какие стили - даты)
+3. Значения ячеек приводятся к тем же типам, что и в openpyxl (data_only=True):
+   int/float, строки из таблицы общих строк, bool, datetime для дат
+4. Объединенные ячейки: значение только у левой верхней, остальные - None
+   (как MergedCell в openpyxl); границы листа учитывают весь диапазон
+5. Если что-то не поддерживается (диаграммы, комментарии, неизвестный тип
+   ячейки, ошибка разбора) - вкладка или весь файл загружается через openpyxl
+
+Функции:
+- load_xml_workbook() - загрузка файла (аналог load_sheet_range())
+- XmlWorkbook / XmlWorksheet - книга и вкладка
+- compare_engines() - сравнение с openpyxl (python -m parsers.xml_reader файл.xlsx);
+  на эталонных файлах tests/golden проверяется tests/test_xml_engine.py
+"""
+
+import sys
+import os
+from xml.etree.ElementTree import iterparse, fromstring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.packaging.relationship import get_dependents, get_rels_path
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import from_excel, from_ISO8601
+from openpyxl.cell.text import Text
+from openpyxl.chartsheet import Chartsheet
+from openpyxl.xml.constants import SHEET_MAIN_NS, COMMENTS_NS, ARC_STYLE
+
+from .workbook_loader import select_sheet_range, load_sheet_range
+
+MAIN = '{%s}' % SHEET_MAIN_NS
+ROW_TAG = MAIN + 'row'
+CELL_TAG = MAIN + 'c'
+VALUE_TAG = MAIN + 'v'
+INLINE_STRING_TAG = MAIN + 'is'
+MERGE_CELL_TAG = MAIN + 'mergeCell'
+HYPERLINK_TAG = MAIN + 'hyperlink'
+NUM_FMT_TAG = MAIN + 'numFmt'
+CELL_XFS_TAG = MAIN + 'cellXfs'
+XF_TAG = MAIN + 'xf'
+
+# Типы ячеек, которые умеем читать (атрибут t)
+SUPPORTED_CELL_TYPES = frozenset(['n', 's', 'b', 'str', 'e', 'd', 'inlineStr'])
+
+
+class XmlEngineUnsupported(Exception):
+    """Файл или вкладку нельзя прочитать напрямую - нужен openpyxl"""
+
+
+class XmlCell:
+    """Ячейка: только значение"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+
+EMPTY_CELL = XmlCell(None)
+
+# Кэш номеров колонок: "AB" -> 28
+_column_numbers = {}
+
+
+def _split_coordinate(coordinate):
+    """"AB12" -> (12, 28)"""
+    pos = 0
+    while pos < len(coordinate) and coordinate[pos].isalpha():
+        pos += 1
+    letters = coordinate[:pos]
+    column = _column_numbers.get(letters)
+    if column is None:
+        if not letters or not letters.isascii():
+            raise XmlEngineUnsupported(f"Некорректный адрес ячейки: {coordinate}")
+        column = 0
+        for char in letters.upper():
+            column = column * 26 + (ord(char) - 64)
+        _column_numbers[letters] = column
+    return int(coordinate[pos:]), column
+
+
+def _cast_number(value):
+    """Число из строки - int или float, как в openpyxl"""
+    if "." in value or "E" in value or "e" in value:
+        return float(value)
+    return int(value)
+
+
+def read_date_styles(archive):
+    """
+    Номера стилей ячеек (cellXfs), которые openpyxl считает датами
+
+    Returns:
+        tuple: (date_styles, timedelta_styles) - множества номеров стилей
+    """
+    try:
+        src = archive.read(ARC_STYLE)
+    except KeyError:
+        return set(), set()
+
+    root = fromstring(src)
+    custom = {}
+    for num_fmt in root.iter(NUM_FMT_TAG):
+        custom[int(num_fmt.get('numFmtId'))] = num_fmt.get('formatCode')
+
+    date_styles = set()
+    timedelta_styles = set()
+    cell_xfs = root.find(CELL_XFS_TAG)
+    if cell_xfs is None:
+        return date_styles, timedelta_styles
+    for idx, xf in enumerate(cell_xfs.findall(XF_TAG)):
+        num_fmt_id = int(xf.get('numFmtId', 0))
+        fmt = custom[num_fmt_id] if num_fmt_id in custom else BUILTIN_FORMATS.get(num_fmt_id)
+        if is_date_format(fmt):
+            date_styles.add(idx)
+        if is_timedelta_format(fmt):
+            timedelta_styles.add(idx)
+    return date_styles, timedelta_styles
+
+
+class XmlWorksheet:
+    """
+    Вкладка, прочитанная напрямую из XML
+
+    Поддерживает то, что использует parse_sheet(): title, max_row, max_column,
+    worksheet[номер_строки] - кортеж ячеек колонок 1..max_column,
+    worksheet.iter_rows(min_row, max_row, min_col, max_col) - окно строк
+    """
+
+    def __init__(self, title, cells, max_row, max_column):
+        self.title = title
+        self.max_row = max_row
+        self.max_column = max_column
+        self._cells = cells  # номер строки -> {номер колонки: значение}
+        self._rows = {}  # кэш готовых кортежей
+
+        # Последняя строка и колонка со значениями (см. get_used_range в excel_parser)
+        last_row = last_col = 0
+        for row_idx, values in cells.items():
+            for col_idx, value in values.items():
+                if value is None or (isinstance(value, str) and not value.strip()):
+                    continue
+                if row_idx > last_row:
+                    last_row = row_idx
+                if col_idx > last_col:
+                    last_col = col_idx
+        self.used_range = (last_row, last_col)
+
+    def _row_cells(self, row_idx, min_col, max_col):
+        values = self._cells.get(row_idx)
+        if not values:
+            return (EMPTY_CELL,) * (max_col - min_col + 1)
+        return tuple(
+            XmlCell(values[col]) if values.get(col) is not None else EMPTY_CELL
+            for col in range(min_col, max_col + 1)
+        )
+
+    def __getitem__(self, row_idx):
+        row = self._rows.get(row_idx)
+        if row is None:
+            row = self._rows[row_idx] = self._row_cells(row_idx, 1, self.max_column)
+        return row
+
+    def iter_rows(self, min_row=None, max_row=None, min_col=None, max_col=None, values_only=False):
+        """Строки в окне, как Worksheet.iter_rows() в openpyxl"""
+        min_row = min_row or 1
+        min_col = min_col or 1
+        max_row = max_row or self.max_row
+        max_col = max_col or self.max_column
+        for row_idx in range(min_row, max_row + 1):
+            if min_col == 1 and max_col == self.max_column:
+                row = self[row_idx]
+            else:
+                row = self._row_cells(row_idx, min_col, max_col)
+            if values_only:
+                yield tuple(cell.value for cell in row)
+            else:
+                yield row
+
+
+def parse_worksheet_xml(source, title, shared_strings, date_styles, timedelta_styles, epoch):
+    """
+    Потоковое чтение XML вкладки в XmlWorksheet
+
+    Raises:
+        XmlEngineUnsupported: в вкладке есть то, что не умеем читать
+    """
+    cells = {}
+    max_row = 0
+    max_column = 0
+    merged = []
+    hyperlinks = []
+
+    row_counter = 0
+    for _, element in iterparse(source):
+        tag = element.tag
+        if tag == ROW_TAG:
+            row_attr = element.get('r')
+            if row_attr is not None:
+                try:
+                    row_counter = int(row_attr)
+                except ValueError:
+                    row_counter = int(float(row_attr))
+            else:
+                row_counter += 1
+            col_counter = 0
+
+            for cell in element:
+                if cell.tag != CELL_TAG:
+                    continue
+                data_type = cell.get('t', 'n')
+                if data_type not in SUPPORTED_CELL_TYPES:
+                    raise XmlEngineUnsupported(f"Тип ячейки {data_type!r}")
+
+                coordinate = cell.get('r')
+                if coordinate:
+                    row, column = _split_coordinate(coordinate)
+                    col_counter = column
+                else:
+                    col_counter += 1
+                    row, column = row_counter, col_counter
+
+                value = None
+                if data_type == 'inlineStr':
+                    child = cell.find(INLINE_STRING_TAG)
+                    if child is not None:
+                        value = Text.from_tree(child).content
+                else:
+                    value = cell.findtext(VALUE_TAG, None) or None
+                    if value is not None:
+                        if data_type == 'n':
+                            value = _cast_number(value)
+                            style_id = int(cell.get('s', 0))
+                            if style_id in date_styles:
+                                try:
+                                    value = from_excel(value, epoch, timedelta=style_id in timedelta_styles)
+                                except (OverflowError, ValueError):
+                                    value = "#VALUE!"
+                        elif data_type == 's':
+                            value = shared_strings[int(value)]
+                        elif data_type == 'b':
+                            value = bool(int(value))
+                        elif data_type == 'd':
+                            value = from_ISO8601(value)
+
+                row_cells = cells.get(row)
+                if row_cells is None:
+                    row_cells = cells[row] = {}
+                row_cells[column] = value
+                if row > max_row:
+                    max_row = row
+                if column > max_column:
+                    max_column = column
+            element.clear()
+        elif tag == MERGE_CELL_TAG:
+            merged.append(element.get('ref'))
+        elif tag == HYPERLINK_TAG:
+            hyperlinks.append(element.get('ref'))
+
+    # Объединенные ячейки: значение остается только у левой верхней
+    for ref in merged:
+        (min_row, min_col), (last_row, last_col) = _range_bounds(ref)
+        for row in range(min_row, last_row + 1):
+            row_cells = cells.get(row)
+            if row_cells is None:
+                row_cells = cells[row] = {}
+            for column in range(min_col, last_col + 1):
+                if row == min_row and column == min_col:
+                    row_cells.setdefault(column, None)
+                else:
+                    row_cells[column] = None
+        max_row = max(max_row, last_row)
+        max_column = max(max_column, last_col)
+
+    # openpyxl создает ячейки для гиперссылок - они входят в границы листа
+    for ref in hyperlinks:
+        _, (last_row, last_col) = _range_bounds(ref)
+        max_row = max(max_row, last_row)
+        max_column = max(max_column, last_col)
+
+    return XmlWorksheet(title, cells, max(max_row, 1), max(max_column, 1))
+
+
+def _range_bounds(ref):
+    """"A1:C2" -> ((1, 1), (2, 3)); "B5" -> ((5, 2), (5, 2))"""
+    if not ref:
+        raise XmlEngineUnsupported("Пустой диапазон")
+    if ':' in ref:
+        start, end = ref.split(':', 1)
+    else:
+        start = end = ref
+    return _split_coordinate(start.replace('$', '')), _split_coordinate(end.replace('$', ''))
+
+
+class XmlWorkbook:
+    """
+    Книга для движка "xml": вкладки читаются при первом обращении
+
+    Если вкладку нельзя прочитать напрямую, она (и только она) берется
+    из openpyxl - файл при этом загружается через load_sheet_range().
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.fallback_sheets = []  # вкладки, прочитанные через openpyxl
+        self._openpyxl_workbook = None
+
+        reader = ExcelReader(file_path, data_only=True)
+        try:
+            reader.read_manifest()
+            reader.read_strings()
+            reader.read_workbook()
+            self._date_styles, self._timedelta_styles = read_date_styles(reader.archive)
+        except Exception:
+            reader.archive.close()
+            raise
+        self._reader = reader
+        self._epoch = reader.wb.epoch
+
+        # Те же вкладки, что загрузил бы openpyxl
+        self._parts = {}
+        self.all_sheet_names = []
+        for sheet, rel in reader.parser.find_sheets():
+            if rel.target not in reader.valid_files:
+                continue
+            self.all_sheet_names.append(sheet.name)
+            self._parts[sheet.name] = rel
+        self.sheet_range = select_sheet_range(self.all_sheet_names)
+        start_idx, end_idx = self.sheet_range
+        self.sheetnames = self.all_sheet_names[start_idx:end_idx]
+
+    def _read_sheet(self, name):
+        rel = self._parts[name]
+        if "chartsheet" in rel.Type:
+            raise XmlEngineUnsupported("Вкладка с диаграммой")
+
+        archive = self._reader.archive
+        rels_path = get_rels_path(rel.target)
+        if rels_path in self._reader.valid_files:
+            if any(True for _ in get_dependents(archive, rels_path).find(COMMENTS_NS)):
+                raise XmlEngineUnsupported("Вкладка с комментариями")
+
+        with archive.open(rel.target) as source:
+            return parse_worksheet_xml(
+                source, name, self._reader.shared_strings,
+                self._date_styles, self._timedelta_styles, self._epoch
+            )
+
+    def __getitem__(self, name):
+        if name not in self.sheetnames:
+            raise KeyError(f"Worksheet {name} does not exist.")
+        try:
+            return self._read_sheet(name)
+        except Exception as e:
+            print(f"Вкладка '{name}' будет прочитана через openpyxl: {e}")
+            self.fallback_sheets.append(name)
+            if self._openpyxl_workbook is None:
+                self._openpyxl_workbook = load_sheet_range(self.file_path, data_only=True)[0]
+            return self._openpyxl_workbook[name]
+
+    def close(self):
+        self._reader.archive.close()
+        if self._openpyxl_workbook is not None:
+            self._openpyxl_workbook.close()
+
+
+def load_xml_workbook(file_path):
+    """
+    Загружает Excel файл движком "xml"
+
+    Returns:
+        tuple: (workbook, all_sheet_names, (start_idx, end_idx)) - как load_sheet_range()
+    """
+    workbook = XmlWorkbook(file_path)
+    return workbook, workbook.all_sheet_names, workbook.sheet_range
+
+
+def compare_engines(file_path):
+    """
+    Сравнение движков на файле: значения и границы каждой вкладки,
+    затем результат parse_excel_file()
+
+    Returns:
+        bool: True, если результаты совпадают
+    """
+    import time
+    from . import excel_parser
+
+    ok = True
+    xml_wb = XmlWorkbook(file_path)
+    op_wb = load_sheet_range(file_path, data_only=True)[0]
+    try:
+        for name in xml_wb.sheetnames:
+            xml_ws, op_ws = xml_wb[name], op_wb[name]
+            if isinstance(op_ws, Chartsheet):
+                # Вкладка-диаграмма: парсер ее пропускает, движок "xml" отдает openpyxl
+                if not isinstance(xml_ws, Chartsheet):
+                    ok = False
+                    print(f"[{name}] диаграмма прочитана как {type(xml_ws).__name__}")
+                continue
+            if (xml_ws.max_row, xml_ws.max_column) != (op_ws.max_row, op_ws.max_column):
+                ok = False
+                print(f"[{name}] границы: {xml_ws.max_row}x{xml_ws.max_column} != {op_ws.max_row}x{op_ws.max_column}")
+                continue
+            for row_idx in range(1, op_ws.max_row + 1):
+                xml_values = [cell.value for cell in xml_ws[row_idx]]
+                op_values = [cell.value for cell in op_ws[row_idx]]
+                for col_idx, (a, b) in enumerate(zip(xml_values, op_values), start=1):
+                    if type(a) is not type(b) or a != b:
+                        ok = False
+                        print(f"[{name}] ячейка ({row_idx}, {col_idx}): {a!r} != {b!r}")
+                        break
+    finally:
+        xml_wb.close()
+        op_wb.close()
+
+    results = {}
+    previous_engine = excel_parser.PARSER_ENGINE
+    try:
+        for engine in ("openpyxl", "xml"):
+            excel_parser.PARSER_ENGINE = engine
+            start = time.perf_counter()
+            results[engine] = excel_parser.parse_excel_file(file_path)
+            print(f"{engine:>9}: {time.perf_counter() - start:.3f} сек, записей: {len(results[engine])}")
+    finally:
+        # Движок остальных парсингов процесса не меняется
+        excel_parser.PARSER_ENGINE = previous_engine
+    if results["openpyxl"] != results["xml"]:
+        ok = False
+        print("Результаты parse_excel_file() различаются")
+
+    print(f"{os.path.basename(file_path)}: {'совпадает' if ok else 'РАСХОЖДЕНИЯ'}")
+    return ok
+
+
+if __name__ == "__main__":
+    files = sys.argv[1:]
+    if not files:
+        print("Использование: python -m parsers.xml_reader файл.xlsx [...]")
+        sys.exit(2)
+    sys.exit(0 if all([compare_engines(path) for path in files]) else 1)
@@ -0,0 +1,496 @@
+"""
+КОНВЕЙЕР ЗАГРУЗКИ ДАННЫХ
+========================
+
+Скачивание -> парсинг -> проверка/дедупликация -> запись в БД
+
+Раньше все файлы сначала целиком парсились в память, и только потом
+начиналась запись в БД. Теперь каждый этап работает в своем потоке,
+этапы связаны очередями ограниченного размера (PIPELINE_QUEUE_SIZE):
+
+1. download - получает файлы от источника (downloaders/sources.py: скачивание
+   с Google Drive или локальная папка); файл, который не
+   изменился с последней записи в БД (SKIP_UNCHANGED_FILES), дальше не идет
+2. parse - парсит файл в SheetBatch (parse_excel_batches); файл с тем же
+   содержимым берется из кэша парсинга (parse_cache.py)
+3. prepare - проверяет и убирает дубликаты (db_writer.prepare_group)
+4. write - записывает группу и сразу делает commit (db_writer.write_group);
+   при INCREMENTAL_INGEST - только новые и изменившиеся колонки журнала
+
+Группа из нескольких файлов записывается одной транзакцией, когда
+распарсены все ее файлы (до этого ее файлы ждут на этапе write) - API
+никогда не видит группу, записанную наполовину. Если хотя бы один файл
+группы не распарсился или в нем есть вкладка, пропущенная по лимитам
+(parse_budget.py), группа не записывается - в БД остаются ее прежние данные.
+
+В той же транзакции, что и данные группы, отмечается, какое содержимое
+ее файлов записано (UpdateLog) - по этой отметке следующий запуск
+пропускает неизменившийся файл.
+
+Если запись отстает, очередь перед ней заполняется и предыдущие этапы
+ждут (backpressure) - в памяти одновременно находится лишь несколько групп.
+
+Для каждого этапа считаются метрики (количество элементов, время работы,
+время ожидания очереди, скорость), для очередей - максимальное заполнение.
+Они сохраняются в ParseLog.details.
+
+Функции:
+- run_pipeline() - запуск конвейера (всех файлов источника или только
+  измененных - paths), возвращает PipelineResult
+- parse_file() - парсинг файла с кэшем результатов
+"""
+
+import os
+import queue
+import threading
+import time
+
+from config import PIPELINE_QUEUE_SIZE, PARSE_CACHE_ENABLED, INCREMENTAL_INGEST, SKIP_UNCHANGED_FILES
+from database import get_db
+from db_writer import prepare_group, write_group, ingested_files, mark_file_ingested
+from downloaders.google_drive import known_sha256
+from downloaders.sources import get_source
+from parsers.excel_parser import parse_excel_batches, group_name_from_file
+from parse_cache import cache_key, file_sha256, parser_fingerprint, load_parsed, save_parsed, evict
+
+# Признак конца потока данных в очереди
+_DONE = object()
+
+# Результат парсинга файла (для записи его группы)
+FILE_PARSED = "parsed"
+FILE_ABORTED = "aborted"  # вкладки пропущены по лимитам (parse_budget.py)
+FILE_FAILED = "failed"  # ошибка парсинга
+
+# Как часто ожидающий этап проверяет, не остановлен ли конвейер (сек)
+_POLL_SECONDS = 0.5
+
+
+class BoundedQueue(queue.Queue):
+    """Очередь ограниченного размера с учетом максимального заполнения"""
+
+    def __init__(self, name, maxsize):
+        super().__init__(maxsize)
+        self.name = name
+        self.high_water = 0
+
+    def _put(self, item):
+        super()._put(item)
+        # Признак конца (_DONE) - не данные, в заполнении не учитывается
+        if item is not _DONE and self._qsize() > self.high_water:
+            self.high_water = self._qsize()
+
+    def metrics(self):
+        return {"maxsize": self.maxsize, "high_water": self.high_water}
+
+
+class StageStats:
+    """Метрики одного этапа конвейера"""
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0  # обработано элементов (файлов/групп)
+        self.records = 0  # обработано записей (оценок, тем, строк БД)
+        self.busy_seconds = 0.0  # время работы
+        self.wait_seconds = 0.0  # время ожидания места в следующей очереди
+        self.counters = {}  # дополнительные счетчики этапа
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def metrics(self):
+        busy = self.busy_seconds
+        return {
+            "items": self.items,
+            "records": self.records,
+            "busy_seconds": round(busy, 3),
+            "wait_seconds": round(self.wait_seconds, 3),
+            "items_per_second": round(self.items / busy, 2) if busy else None,
+            "records_per_second": round(self.records / busy, 1) if busy else None,
+            **self.counters,
+        }
+
+
+class PipelineResult:
+    """Итог запуска конвейера"""
+
+    def __init__(self):
+        self.downloaded_files = []  # имена скачанных файлов
+        self.unchanged_files = []  # из них не изменились с последней записи (не обрабатывались)
+        self.downloads = None  # метрики скачивания по файлам (DownloadRun.metrics)
+        self.files_processed = 0  # успешно распарсенных файлов
+        self.groups_updated = []  # группы, записанные в БД (в порядке записи)
+        self.parse_report = {"empty_rows_skipped": 0}  # счетчики парсинга (см. parse_sheet)
+        self.errors = []  # ошибки по файлам/группам: {'stage', 'name', 'error'}
+        self.stages = {}
+        self.queues = {}
+        self.duration_seconds = 0.0
+
+    def details(self):
+        """Метрики для ParseLog.details"""
+        return {
+            "pipeline": {
+                "duration_seconds": round(self.duration_seconds, 3),
+                "stages": {name: stats.metrics() for name, stats in self.stages.items()},
+                "queues": {name: q.metrics() for name, q in self.queues.items()},
+            },
+            "downloads": self.downloads,
+            "unchanged_files": self.unchanged_files,
+            "parse_report": self.parse_report,
+            "errors": self.errors,
+        }
+
+
+def parse_file(file_path):
+    """
+    Парсинг файла с кэшем результатов (parse_cache.py)
+
+    Если файл с тем же именем и содержимым уже парсился этой же версией парсера -
+    результат берется из кэша (в отчете 'cache_hits': 1). Иначе файл
+    парсится и результат сохраняется в кэш (кроме пустых результатов и
+    файлов с пропущенными по лимитам вкладками - они зависят от нагрузки).
+
+    Returns:
+        tuple: ([SheetBatch, ...], file_report)
+    """
+    file_name = os.path.basename(file_path)
+    key = None
+    if PARSE_CACHE_ENABLED:
+        try:
+            key = cache_key(file_path)
+            cached = load_parsed(key, fingerprint=parser_fingerprint())
+        except OSError:
+            cached = None
+        if cached is not None:
+            batches, file_report = cached
+            file_report = dict(file_report, cache_hits=1)
+            return batches, file_report
+
+    file_report = {}
+    batches = parse_excel_batches(file_path, file_report)
+    if key and batches and not file_report.get('aborted_sheets'):
+        try:
+            save_parsed(key, file_name, batches, file_report)
+        except OSError as e:
+            print(f"⚠️ Не удалось сохранить {file_name} в кэш парсинга: {e}", flush=True)
+    return batches, file_report
+
+
+class _Stopped(Exception):
+    """Конвейер остановлен из-за ошибки в другом этапе"""
+
+
+def _put(out_queue, item, stats, stop):
+    """Кладет элемент в очередь, ожидая места (пока конвейер не остановлен)"""
+    started = time.monotonic()
+    try:
+        while True:
+            try:
+                out_queue.put(item, timeout=_POLL_SECONDS)
+                return
+            except queue.Full:
+                if stop.is_set():
+                    raise _Stopped()
+    finally:
+        stats.wait_seconds += time.monotonic() - started
+
+
+def _get(in_queue, stop):
+    """Берет элемент из очереди (пока конвейер не остановлен)"""
+    while True:
+        try:
+            return in_queue.get(timeout=_POLL_SECONDS)
+        except queue.Empty:
+            if stop.is_set():
+                raise _Stopped()
+
+
+def _unique_group_files(file_names):
+    """
+    Файлы, группа которых не встречается в других файлах списка - только их
+    можно пропускать: группа из нескольких файлов записывается целиком
+    (из всех файлов сразу)
+    """
+    groups = {}
+    for file_name in file_names:
+        groups.setdefault(group_name_from_file(file_name), []).append(file_name)
+    return {files[0] for files in groups.values() if len(files) == 1}
+
+
+def _group_file_counts(file_names):
+    """Сколько файлов у каждой группы: {группа: количество}"""
+    counts = {}
+    for file_name in file_names:
+        group_name = group_name_from_file(file_name)
+        counts[group_name] = counts.get(group_name, 0) + 1
+    return counts
+
+
+def _content_sha256(file_path):
+    """SHA-256 содержимого файла (из метаданных скачивания, если есть)"""
+    try:
+        return known_sha256(file_path) or file_sha256(file_path)
+    except OSError:
+        return None
+
+
+def run_pipeline(file_source=None, queue_size=None, on_file_parsed=None, on_group_written=None,
+                 source=None, paths=None):
+    """
+    Запуск конвейера скачивание -> парсинг -> проверка -> запись
+
+    Args:
+        file_source: итератор путей к файлам (вместо источника; неизменившиеся
+            файлы не пропускаются, а группы записываются после парсинга всех
+            файлов - заранее неизвестен весь список файлов)
+        queue_size: размер очередей между этапами (по умолчанию PIPELINE_QUEUE_SIZE)
+        on_file_parsed: вызывается после парсинга файла: (file_name, records_count, file_report)
+        on_group_written: вызывается после commit группы: (group_name, prepared, write_result)
+        source: источник файлов (по умолчанию get_source() - INGEST_SOURCE)
+        paths: только эти файлы источника (и остальные файлы их групп) -
+            например, измененные файлы отслеживаемой папки
+
+    Ошибка парсинга файла или записи группы не останавливает конвейер
+    (попадает в PipelineResult.errors); непредвиденная ошибка этапа
+    останавливает все этапы и пробрасывается вызывающему коду.
+
+    Returns:
+        PipelineResult
+    """
+    skippable = set()
+    group_files = None  # количество файлов группы (None - неизвестно)
+    if file_source is None:
+        if source is None:
+            source = get_source()
+        if paths is None:
+            file_names = source.file_names()
+            file_source = source.iter_files()
+        else:
+            related = source.related_files(paths)
+            file_names = [os.path.basename(path) for path in related]
+            file_source = iter(related)
+        group_files = _group_file_counts(file_names)
+        if SKIP_UNCHANGED_FILES:
+            skippable = _unique_group_files(file_names)
+    else:
+        source = None
+    if queue_size is None:
+        queue_size = PIPELINE_QUEUE_SIZE
+    queue_size = max(1, queue_size)
+
+    result = PipelineResult()
+    stages = result.stages
+    for name in ("download", "parse", "prepare", "write"):
+        stages[name] = StageStats(name)
+    files_queue = BoundedQueue("download→parse", queue_size)
+    batches_queue = BoundedQueue("parse→prepare", queue_size)
+    groups_queue = BoundedQueue("prepare→write", queue_size)
+    for q in (files_queue, batches_queue, groups_queue):
+        result.queues[q.name] = q
+
+    stop = threading.Event()
+    failures = []
+
+    # Записанные в БД версии файлов (для пропуска неизменившихся)
+    fingerprint = parser_fingerprint()
+    ingested = {}
+    if skippable:
+        db = get_db()
+        try:
+            ingested = ingested_files(db)
+        finally:
+            db.close()
+
+    def download_stage():
+        stats = stages["download"]
+        iterator = iter(file_source)
+        while True:
+            started = time.monotonic()
+            file_path = next(iterator, _DONE)
+            if file_path is _DONE:
+                stats.busy_seconds += time.monotonic() - started
+                break
+            content_sha256 = _content_sha256(file_path)
+            stats.busy_seconds += time.monotonic() - started
+            stats.items += 1
+            file_name = os.path.basename(file_path)
+            result.downloaded_files.append(file_name)
+            if (file_name in skippable and content_sha256
+                    and ingested.get(file_name) == (content_sha256, fingerprint)):
+                stats.count("files_unchanged")
+                result.unchanged_files.append(file_name)
+                print(f"   ⏭️  [PARSER] Без изменений: {file_name}", flush=True)
+                continue
+            print(f"   📄 [PARSER] Скачан: {file_name}", flush=True)
+            _put(files_queue, (file_path, content_sha256), stats, stop)
+
+    def parse_stage():
+        stats = stages["parse"]
+        while True:
+            item = _get(files_queue, stop)
+            if item is _DONE:
+                break
+            file_path, content_sha256 = item
+            file_name = os.path.basename(file_path)
+            print(f"   🔍 [PARSER] Обработка файла: {file_name}...", flush=True)
+            started = time.monotonic()
+            try:
+                batches, file_report = parse_file(file_path)
+            except Exception as e:
+                stats.busy_seconds += time.monotonic() - started
+                result.errors.append({"stage": "parse", "name": file_name, "error": str(e)})
+                # Этап записи должен знать, что файл группы не распарсился
+                _put(batches_queue, (file_name, [], None, FILE_FAILED), stats, stop)
+                continue
+            records_count = sum(len(batch) for batch in batches)
+            stats.busy_seconds += time.monotonic() - started
+            stats.items += 1
+            stats.records += records_count
+
+            result.files_processed += 1
+            for key, value in file_report.items():
+                if isinstance(value, list):
+                    result.parse_report.setdefault(key, []).extend(value)
+                else:
+                    result.parse_report[key] = result.parse_report.get(key, 0) + value
+            if on_file_parsed is not None:
+                on_file_parsed(file_name, records_count, file_report)
+
+            # Какое содержимое файла отметить записанным после записи его группы
+            # (файл передается и без данных - этап записи ждет все файлы группы)
+            status = FILE_ABORTED if file_report.get('aborted_sheets') else FILE_PARSED
+            source = (file_name, content_sha256) if content_sha256 else None
+            _put(batches_queue, (file_name, batches, source, status), stats, stop)
+
+        if PARSE_CACHE_ENABLED:
+            evict()
+
+    def prepare_stage():
+        stats = stages["prepare"]
+        while True:
+            item = _get(batches_queue, stop)
+            if item is _DONE:
+                break
+            file_name, batches, source, status = item
+            started = time.monotonic()
+            # Вкладки файла группы (группа - по имени файла, как в parse_excel_batches)
+            prepared = None
+            if status == FILE_PARSED and batches:
+                prepared = prepare_group(group_name_from_file(file_name), batches)
+            del batches
+            stats.busy_seconds += time.monotonic() - started
+
+            if prepared is not None:
+                stats.items += 1
+                stats.records += prepared['grades_count'] + prepared['topics_count']
+            _put(groups_queue, (file_name, prepared, source, status), stats, stop)
+
+    def write_group_files(group_name, files):
+        """Запись всех файлов группы одной транзакцией"""
+        stats = stages["write"]
+        written = [(prepared, source) for _, prepared, source in files if prepared is not None]
+        if not written:
+            return
+        started = time.monotonic()
+        write_results = []
+        db = get_db()
+        try:
+            for index, (prepared, _) in enumerate(written):
+                # Второй файл той же группы дописывается к первому;
+                # иначе - только изменившиеся колонки (INCREMENTAL_INGEST)
+                write_results.append(write_group(
+                    db, prepared,
+                    replace=index == 0,
+                    incremental=INCREMENTAL_INGEST
+                ))
+            # Файлы группы записаны - отмечаем в той же транзакции
+            for _, _, source in files:
+                if source is not None:
+                    mark_file_ingested(db, source[0], source[1], fingerprint)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            result.errors.append({"stage": "write", "name": group_name, "error": str(e)})
+            return
+        finally:
+            db.close()
+            stats.busy_seconds += time.monotonic() - started
+        result.groups_updated.append(group_name)
+        for (prepared, _), write_result in zip(written, write_results):
+            stats.items += 1
+            stats.records += write_result['rows_added']
+            stats.count("rows_deleted", write_result['rows_deleted'])
+            stats.count("columns_total", write_result['columns_total'])
+            stats.count("columns_written", write_result['columns_written'])
+            stats.count(f"groups_{write_result['mode']}")
+            if on_group_written is not None:
+                on_group_written(group_name, prepared, write_result)
+
+    def finish_group(group_name, pending_group):
+        if pending_group["failed"]:
+            # Без пропущенного файла (вкладки) запись удалила бы его данные
+            # из БД - группа остается как есть до следующего запуска
+            stages["write"].count("groups_skipped")
+            print(f"   ⏭️  [PARSER] Группа не записана (файл не распарсился или вкладки пропущены по лимитам): {group_name}", flush=True)
+            return
+        write_group_files(group_name, pending_group["files"])
+
+    def write_stage():
+        # Файлы групп, ожидающие остальные файлы своей группы (по порядку прихода)
+        pending = {}
+        while True:
+            item = _get(groups_queue, stop)
+            if item is _DONE:
+                break
+            file_name, prepared, source, status = item
+            group_name = group_name_from_file(file_name)
+            pending_group = pending.setdefault(group_name, {"files": [], "failed": False})
+            pending_group["files"].append((file_name, prepared, source))
+            if status != FILE_PARSED:
+                pending_group["failed"] = True
+            if group_files is not None and len(pending_group["files"]) >= group_files.get(group_name, 1):
+                finish_group(group_name, pending.pop(group_name))
+        # Список файлов неизвестен (или файл группы не скачался) - записываем
+        # группы после парсинга всех файлов
+        for group_name, pending_group in pending.items():
+            finish_group(group_name, pending_group)
+
+    def run_stage(stage, out_queue):
+        try:
+            stage()
+        except _Stopped:
+            return
+        except BaseException as e:
+            failures.append(e)
+            stop.set()
+            return
+        # Сообщаем следующему этапу, что данных больше не будет
+        if out_queue is not None:
+            while not stop.is_set():
+                try:
+                    out_queue.put(_DONE, timeout=_POLL_SECONDS)
+                    return
+                except queue.Full:
+                    pass
+
+    started = time.monotonic()
+    threads = [
+        threading.Thread(target=run_stage, args=(stage, out_queue), name=f"pipeline-{name}", daemon=True)
+        for name, stage, out_queue in (
+            ("download", download_stage, files_queue),
+            ("parse", parse_stage, batches_queue),
+            ("prepare", prepare_stage, groups_queue),
+        )
+    ]
+    for thread in threads:
+        thread.start()
+    # Запись - в текущем потоке
+    run_stage(write_stage, None)
+    for thread in threads:
+        thread.join()
+    result.duration_seconds = time.monotonic() - started
+    if source is not None and paths is None:
+        result.downloads = source.metrics()
+
+    if failures:
+        raise failures[0]
+    return result
@@ -0,0 +1,505 @@
+"""
+СНИМОК ДАННЫХ ДЛЯ ЧТЕНИЯ (READ MODEL)
+=====================================
+
+После каждого парсинга, изменившего данные, парсер записывает неизменяемый
+файл-снимок READ_MODEL_FILE со всеми оценками, а API читает журналы,
+оценки студентов и рейтинги из него, а не из SQLite:
+
+1. Файл отображается в память (mmap) только для чтения: все процессы и
+   воркеры API используют одни и те же страницы кэша ОС, данные не
+   копируются и не разбираются при открытии
+2. Записи фиксированной длины (массивы uint32): группы, студенты,
+   предметы, оценки; строки (ФИО, названия, значения оценок) - в общей
+   таблице строк, даты - в таблице дат (порядковые номера дней)
+3. Студенты упорядочены по группе и ФИО, оценки - по студенту, предмету и
+   дате: оценки группы, студента и предмета студента лежат подряд
+4. Новый снимок пишется во временный файл и подменяет старый через
+   os.replace: читатели видят либо старый, либо новый файл целиком;
+   открытый старый снимок остается доступным до конца запроса
+5. get_snapshot() на каждый запрос проверяет файл (os.stat) и открывает
+   новый снимок, если файл подменили
+
+Функции:
+- publish_snapshot() - построить снимок из БД и подменить файл (парсер)
+- remove_snapshot() - удалить файл снимка (API читает из БД)
+- get_snapshot() - текущий снимок или None (снимка нет или он отключен)
+"""
+
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+from array import array
+from datetime import date
+
+from database import get_db, parsing_config, Group, Student, Subject, Grade
+
+READ_MODEL_ENABLED = getattr(parsing_config, 'READ_MODEL_ENABLED', True)
+READ_MODEL_FILE = getattr(parsing_config, 'READ_MODEL_FILE', None)
+
+# Версия формата файла (меняется при изменении структуры записей)
+FORMAT_VERSION = 1
+MAGIC = b'GMREAD\x00\x01'
+
+# Заголовок: magic, версия формата, порядок байт (1 - little endian),
+# время создания, количество секций
+_HEADER = struct.Struct('<8sIIdI')
+# Секция: смещение, количество элементов, полей uint32 в записи (0 - байты)
+_SECTION = struct.Struct('<QII')
+_ALIGN = 8
+
+# Секции по порядку и количество полей uint32 в записи
+SECTIONS = (
+    ('string_offsets', 1),  # смещения строк в string_data (n + 1)
+    ('string_data', 0),     # UTF-8
+    ('dates', 1),           # date.toordinal()
+    ('groups', 6),          # id, name, student_start, student_count, subject_start, subject_count
+    ('students', 5),        # id, fio, group, grade_start, grade_count
+    ('subjects', 3),        # id, name, group
+    ('grades', 4),          # student, subject, date, value
+)
+
+# Поля записей
+G_ID, G_NAME, G_STUDENT_START, G_STUDENT_COUNT, G_SUBJECT_START, G_SUBJECT_COUNT = range(6)
+S_ID, S_FIO, S_GROUP, S_GRADE_START, S_GRADE_COUNT = range(5)
+SUB_ID, SUB_NAME, SUB_GROUP = range(3)
+R_STUDENT, R_SUBJECT, R_DATE, R_VALUE = range(4)
+
+
+# --- Запись снимка (парсер) ---
+
+class _StringTable:
+    def __init__(self):
+        self.index = {}
+        self.offsets = array('I', [0])
+        self.data = bytearray()
+
+    def add(self, text):
+        text = text or ''
+        position = self.index.get(text)
+        if position is None:
+            position = len(self.offsets) - 1
+            self.index[text] = position
+            self.data += text.encode('utf-8')
+            self.offsets.append(len(self.data))
+        return position
+
+
+def build_snapshot(db):
+    """
+    Собирает содержимое снимка из БД
+
+    Returns:
+        bytes: содержимое файла
+    """
+    strings = _StringTable()
+
+    groups = db.query(Group.id, Group.name).order_by(Group.name, Group.id).all()
+    group_index = {group_id: i for i, (group_id, _) in enumerate(groups)}
+
+    students = sorted(
+        (row for row in db.query(Student.id, Student.fio, Student.group_id).all() if row[2] in group_index),
+        key=lambda row: (group_index[row[2]], row[1], row[0])
+    )
+    student_index = {student_id: i for i, (student_id, _, _) in enumerate(students)}
+
+    subjects = sorted(
+        (row for row in db.query(Subject.id, Subject.name, Subject.group_id).all() if row[2] in group_index),
+        key=lambda row: (group_index[row[2]], row[1], row[0])
+    )
+    subject_index = {subject_id: i for i, (subject_id, _, _) in enumerate(subjects)}
+
+    grades = [
+        (student_index[student_id], subject_index[subject_id], grade_date, value)
+        for student_id, subject_id, grade_date, value in db.query(
+            Grade.student_id, Grade.subject_id, Grade.date, Grade.value
+        ).all()
+        if student_id in student_index and subject_id in subject_index and grade_date is not None
+    ]
+    grades.sort(key=lambda row: (row[0], row[1], row[2]))
+
+    ordinals = sorted({grade_date.toordinal() for _, _, grade_date, _ in grades})
+    date_index = {ordinal: i for i, ordinal in enumerate(ordinals)}
+
+    grade_records = array('I')
+    grade_start = [0] * len(students)
+    grade_count = [0] * len(students)
+    for position, (student, subject, grade_date, value) in enumerate(grades):
+        if grade_count[student] == 0:
+            grade_start[student] = position
+        grade_count[student] += 1
+        grade_records.extend((student, subject, date_index[grade_date.toordinal()], strings.add(value)))
+
+    student_records = array('I')
+    group_students = {}
+    for i, (student_id, fio, group_id) in enumerate(students):
+        group = group_index[group_id]
+        group_students.setdefault(group, [i, 0])[1] += 1
+        student_records.extend((student_id, strings.add(fio), group, grade_start[i], grade_count[i]))
+
+    subject_records = array('I')
+    group_subjects = {}
+    for i, (subject_id, name, group_id) in enumerate(subjects):
+        group = group_index[group_id]
+        group_subjects.setdefault(group, [i, 0])[1] += 1
+        subject_records.extend((subject_id, strings.add(name), group))
+
+    group_records = array('I')
+    for i, (group_id, name) in enumerate(groups):
+        student_start, student_count = group_students.get(i, (0, 0))
+        subject_start, subject_count = group_subjects.get(i, (0, 0))
+        group_records.extend((group_id, strings.add(name), student_start, student_count, subject_start, subject_count))
+
+    sections = {
+        'string_offsets': (strings.offsets.tobytes(), len(strings.offsets)),
+        'string_data': (bytes(strings.data), len(strings.data)),
+        'dates': (array('I', ordinals).tobytes(), len(ordinals)),
+        'groups': (group_records.tobytes(), len(groups)),
+        'students': (student_records.tobytes(), len(students)),
+        'subjects': (subject_records.tobytes(), len(subjects)),
+        'grades': (grade_records.tobytes(), len(grades)),
+    }
+
+    byteorder = 1 if sys.byteorder == 'little' else 0
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, byteorder, time.time(), len(SECTIONS))
+    offset = _align(len(header) + _SECTION.size * len(SECTIONS))
+    directory = []
+    body = []
+    for name, fields in SECTIONS:
+        payload, count = sections[name]
+        directory.append(_SECTION.pack(offset, count, fields))
+        padding = _align(len(payload)) - len(payload)
+        body.append(payload + b'\0' * padding)
+        offset += len(payload) + padding
+    head = header + b''.join(directory)
+    head += b'\0' * (_align(len(head)) - len(head))
+    return head + b''.join(body)
+
+
+def _align(size):
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def remove_snapshot(path=None):
+    """
+    Удаляет файл снимка: API читает данные из БД, а следующий запуск
+    парсера строит снимок заново (даже если данные не изменились)
+
+    Вызывается, когда снимок не удалось обновить - иначе API отдавал бы
+    данные до последней записи
+    """
+    path = path or READ_MODEL_FILE
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def publish_snapshot(path=None):
+    """
+    Строит снимок из БД и атомарно подменяет файл READ_MODEL_FILE
+
+    Если снимок отключен (READ_MODEL_ENABLED=0), удаляет старый файл, чтобы
+    API не читал устаревшие данные
+
+    Returns:
+        dict или None: {'path', 'bytes', 'grades', 'duration_seconds'}
+    """
+    path = path or READ_MODEL_FILE
+    if not path:
+        return None
+    if not READ_MODEL_ENABLED:
+        remove_snapshot(path)
+        return None
+
+    started = time.monotonic()
+    db = get_db()
+    try:
+        content = build_snapshot(db)
+    finally:
+        db.close()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    grades = _SECTION.unpack_from(content, _HEADER.size + _SECTION.size * (len(SECTIONS) - 1))[1]
+    return {
+        "path": path,
+        "bytes": len(content),
+        "grades": grades,
+        "duration_seconds": round(time.monotonic() - started, 3),
+    }
+
+
+# --- Чтение снимка (API) ---
+
+class Snapshot:
+    """
+    Открытый снимок (mmap только для чтения)
+
+    Записи читаются напрямую из отображенного файла через memoryview;
+    словари по ID групп, студентов и предметов строятся при открытии.
+    Старый снимок закрывается сборщиком мусора, когда его перестанут
+    использовать запросы
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, byteorder, created, section_count = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or section_count != len(SECTIONS):
+            raise ValueError(f"Неподдерживаемый формат снимка: {path}")
+        if byteorder != (1 if sys.byteorder == 'little' else 0):
+            raise ValueError(f"Снимок создан на платформе с другим порядком байт: {path}")
+        self.path = path
+        self.created = created
+
+        sections = {}
+        for i, (name, fields) in enumerate(SECTIONS):
+            offset, count, _ = _SECTION.unpack_from(view, _HEADER.size + _SECTION.size * i)
+            if fields:
+                sections[name] = view[offset:offset + count * fields * 4].cast('I')
+            else:
+                sections[name] = view[offset:offset + count]
+        self._string_offsets = sections['string_offsets']
+        self._string_data = sections['string_data']
+        self.dates = sections['dates']
+        self.groups = sections['groups']
+        self.students = sections['students']
+        self.subjects = sections['subjects']
+        self.grades = sections['grades']
+        self._strings = {}
+        self._date_strs = {}
+
+        self.group_by_id = {self.groups[i * 6 + G_ID]: i for i in range(len(self.groups) // 6)}
+        self.student_by_id = {self.students[i * 5 + S_ID]: i for i in range(len(self.students) // 5)}
+        self.subject_by_id = {self.subjects[i * 3 + SUB_ID]: i for i in range(len(self.subjects) // 3)}
+        # Первый по ID студент с таким ФИО (как .first() в SQL)
+        self.student_by_fio = {}
+        for i in sorted(range(len(self.students) // 5), key=lambda i: self.students[i * 5 + S_ID]):
+            self.student_by_fio.setdefault(self.string(self.students[i * 5 + S_FIO]), i)
+
+    # --- Примитивы ---
+
+    def string(self, index):
+        text = self._strings.get(index)
+        if text is None:
+            start = self._string_offsets[index]
+            end = self._string_offsets[index + 1]
+            text = bytes(self._string_data[start:end]).decode('utf-8')
+            self._strings[index] = text
+        return text
+
+    def date(self, index):
+        return date.fromordinal(self.dates[index])
+
+    def date_str(self, index):
+        """Дата в формате API (YYYY-MM-DD)"""
+        text = self._date_strs.get(index)
+        if text is None:
+            text = self.date(index).strftime('%Y-%m-%d')
+            self._date_strs[index] = text
+        return text
+
+    def group(self, i):
+        """Запись группы: (id, name, student_start, student_count, subject_start, subject_count)"""
+        base = i * 6
+        return self.groups[base:base + 6]
+
+    def student(self, i):
+        """Запись студента: (id, fio, group, grade_start, grade_count)"""
+        base = i * 5
+        return self.students[base:base + 5]
+
+    def subject(self, i):
+        """Запись предмета: (id, name, group)"""
+        base = i * 3
+        return self.subjects[base:base + 3]
+
+    def group_students(self, group):
+        record = self.group(group)
+        return range(record[G_STUDENT_START], record[G_STUDENT_START] + record[G_STUDENT_COUNT])
+
+    def group_subjects(self, group):
+        record = self.group(group)
+        return range(record[G_SUBJECT_START], record[G_SUBJECT_START] + record[G_SUBJECT_COUNT])
+
+    def student_grades(self, student, subject=None):
+        """
+        Оценки студента (по дате внутри предмета): список (subject, date, value)
+        индексов снимка; subject - только оценки этого предмета
+        """
+        record = self.student(student)
+        start = record[S_GRADE_START]
+        grades = self.grades
+        result = []
+        for position in range(start, start + record[S_GRADE_COUNT]):
+            base = position * 4
+            grade_subject = grades[base + R_SUBJECT]
+            if subject is not None and grade_subject != subject:
+                continue
+            result.append((grade_subject, grades[base + R_DATE], grades[base + R_VALUE]))
+        return result
+
+    # --- Данные для API ---
+
+    def group_list(self):
+        """Все группы: [{'id', 'name'}] по названию"""
+        return [
+            {"id": int(self.group(i)[G_ID]), "name": self.string(self.group(i)[G_NAME])}
+            for i in range(len(self.groups) // 6)
+        ]
+
+    def subject_list(self, group_id=None):
+        """Предметы (всех групп или одной): [{'id', 'name', 'group_id'}] по названию"""
+        if group_id:
+            group = self.group_by_id.get(group_id)
+            indexes = self.group_subjects(group) if group is not None else []
+        else:
+            indexes = range(len(self.subjects) // 3)
+        items = [
+            {
+                "id": int(self.subject(i)[SUB_ID]),
+                "name": self.string(self.subject(i)[SUB_NAME]),
+                "group_id": int(self.group(self.subject(i)[SUB_GROUP])[G_ID]),
+            }
+            for i in indexes
+        ]
+        # Как order_by(Subject.name) в SQL: одинаковые названия - по id
+        items.sort(key=lambda item: (item["name"], item["id"]))
+        return items
+
+    def subject_info(self, subject_id):
+        """{'id', 'name', 'group_id'} или None"""
+        subject = self.subject_by_id.get(subject_id)
+        if subject is None:
+            return None
+        record = self.subject(subject)
+        return {
+            "id": int(record[SUB_ID]),
+            "name": self.string(record[SUB_NAME]),
+            "group_id": int(self.group(record[SUB_GROUP])[G_ID]),
+        }
+
+    def student_info(self, student):
+        record = self.student(student)
+        group = self.group(record[S_GROUP])
+        return {
+            "id": int(record[S_ID]),
+            "fio": self.string(record[S_FIO]),
+            "group_id": int(group[G_ID]),
+            "group_name": self.string(group[G_NAME]),
+        }
+
+    def find_student(self, fio):
+        """Студент с точно таким ФИО (индекс снимка) или None"""
+        return self.student_by_fio.get(fio)
+
+    def students_by_fio(self, group):
+        """
+        Студенты группы, объединенные по ФИО (без пробелов по краям):
+        {ФИО: {'id', 'fio', 'students': [индексы]}} в порядке ФИО
+        """
+        result = {}
+        for student in self.group_students(group):
+            record = self.student(student)
+            fio = self.string(record[S_FIO])
+            key = fio.strip()
+            item = result.get(key)
+            if item is None:
+                result[key] = {"id": int(record[S_ID]), "fio": fio, "students": [student]}
+            else:
+                item["students"].append(student)
+        return result
+
+    def journal(self, group, subject):
+        """
+        Журнал предмета группы (как GET /api/grades):
+        {'dates': [...], 'students': [{'id', 'fio', 'grades': {дата: значение}}]}
+        """
+        date_indexes = set()
+        students = []
+        for item in self.students_by_fio(group).values():
+            grades = []
+            for student in item["students"]:
+                grades.extend(self.student_grades(student, subject))
+            grades.sort(key=lambda grade: grade[1])
+            student_grades = {}
+            for _, date_index, value in grades:
+                date_indexes.add(date_index)
+                date_str = self.date_str(date_index)
+                if date_str not in student_grades:
+                    student_grades[date_str] = self.string(value)
+            if student_grades:
+                students.append({"id": item["id"], "fio": item["fio"], "grades": student_grades})
+        students.sort(key=lambda item: item["fio"])
+        return {
+            "dates": [self.date_str(i) for i in sorted(date_indexes)],
+            "students": students,
+        }
+
+    def group_grade_rows(self, group):
+        """
+        Оценки студентов группы, объединенных по ФИО:
+        [({'id', 'fio', ...}, [(subject, date, value), ...]), ...]
+        """
+        rows = []
+        for item in self.students_by_fio(group).values():
+            grades = []
+            for student in item["students"]:
+                grades.extend(self.student_grades(student))
+            rows.append((item, grades))
+        return rows
+
+
+
+_snapshot = None
+_snapshot_signature = None
+_snapshot_lock = threading.Lock()
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def get_snapshot():
+    """
+    Текущий снимок или None (снимок отключен, еще не создан или поврежден -
+    тогда API читает из БД)
+
+    Файл проверяется на каждый вызов (os.stat): после подмены файла
+    открывается новый снимок
+    """
+    global _snapshot, _snapshot_signature
+    if not READ_MODEL_ENABLED or not READ_MODEL_FILE:
+        return None
+    signature = _signature(READ_MODEL_FILE)
+    if signature == _snapshot_signature:
+        return _snapshot
+    with _snapshot_lock:
+        if signature == _snapshot_signature:
+            return _snapshot
+        snapshot = None
+        if signature is not None:
+            try:
+                snapshot = Snapshot(READ_MODEL_FILE)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Снимок данных не открыт ({e}), данные читаются из БД", flush=True)
+        _snapshot, _snapshot_signature = snapshot, signature
+        return snapshot
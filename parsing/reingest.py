@@ -0,0 +1,168 @@
+"""
+Повторная запись данных в БД из кэша парсинга (без скачивания и парсинга)
+
+Использование:
+    python reingest.py                     # все группы (последняя запись кэша каждого файла)
+    python reingest.py --group 23-09.1     # только выбранные группы (можно несколько --group)
+    python reingest.py --list              # показать записи кэша
+    python reingest.py --evict             # удалить старые записи кэша
+
+Логика:
+    1. Берет последнюю запись кэша (parse_cache.py) для каждого файла
+    2. Для каждой группы проверяет данные и записывает их в БД
+       (prepare_group/write_group - как в обычном запуске, commit на группу)
+    3. Сохраняет запись в ParseLog, чтобы API и бот увидели новые данные
+    4. Обновляет снимок данных для API (read_model.py)
+"""
+
+import sys
+import os
+import argparse
+import json
+import time
+from datetime import datetime
+
+# Добавляем путь к parsing для импортов
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database import init_db, get_db, ParseLog
+from db_writer import prepare_group, write_group
+from parse_cache import latest_entries, list_entries, read_entry, evict
+from logger import log_parser_info, log_parser_error
+from read_model import publish_snapshot, remove_snapshot
+
+
+def reingest(groups=None):
+    """
+    Перезаписывает группы в БД из кэша парсинга
+
+    groups - названия групп (None - все группы из кэша)
+
+    Returns:
+        list: перезаписанные группы
+    """
+    started = time.monotonic()
+    parse_time = datetime.now()
+    selected = set(groups) if groups else None
+
+    entries = latest_entries()
+    if selected is not None:
+        entries = [entry for entry in entries if selected & set(entry.get('groups', []))]
+    if not entries:
+        print("❌ В кэше парсинга нет данных для выбранных групп")
+        return []
+
+    # Вкладки по группам (группа может быть в нескольких файлах)
+    groups_data = {}
+    files = []
+    for entry in sorted(entries, key=lambda item: item['file_name']):
+        loaded = read_entry(entry['path'], selected)
+        if loaded is None:
+            print(f"⚠️ Запись кэша повреждена: {entry['path']}")
+            continue
+        files.append(entry['file_name'])
+        for batch in loaded[1]:
+            groups_data.setdefault(batch.group, []).append(batch)
+
+    groups_updated = []
+    errors = []
+    for group_name, batches in groups_data.items():
+        db = get_db()
+        try:
+            write_group(db, prepare_group(group_name, batches))
+            db.commit()
+            groups_updated.append(group_name)
+            print(f"   💾 Группа перезаписана: {group_name}")
+        except Exception as e:
+            db.rollback()
+            errors.append({"name": group_name, "error": str(e)})
+            print(f"   ❌ Ошибка при записи группы {group_name}: {e}")
+        finally:
+            db.close()
+
+    duration = time.monotonic() - started
+    details = {
+        "reingest": {
+            "files": files,
+            "groups": groups_updated,
+            "errors": errors,
+            "duration_seconds": round(duration, 3),
+        }
+    }
+
+    # Запись в ParseLog - по ней API и бот определяют, что данные обновились
+    db = get_db()
+    try:
+        db.add(ParseLog(
+            parse_time=parse_time,
+            files_processed=len(files),
+            groups_updated=json.dumps(groups_updated, ensure_ascii=False) if groups_updated else None,
+            status="success" if not errors else "error",
+            error_message="; ".join(f"{item['name']}: {item['error']}" for item in errors) or None,
+            details=json.dumps(details, ensure_ascii=False)
+        ))
+        db.commit()
+    except Exception:
+        db.rollback()
+    finally:
+        db.close()
+
+    # Снимок данных для API (read_model.py)
+    if groups_updated:
+        try:
+            publish_snapshot()
+        except Exception as e:
+            # Устаревший снимок удаляется - API читает из БД
+            remove_snapshot()
+            log_parser_error("Не удалось обновить снимок данных", error=e)
+
+    if errors:
+        log_parser_error(
+            "Ошибка при перезаписи из кэша парсинга",
+            description=", ".join(item['name'] for item in errors),
+            details=details
+        )
+    log_parser_info(
+        "Данные перезаписаны из кэша парсинга",
+        f"Обновлено групп: {len(groups_updated)}, длительность: {duration:.2f} сек",
+        details=details
+    )
+    print(f"✅ Перезаписано групп: {len(groups_updated)} за {duration:.2f} сек")
+    return groups_updated
+
+
+def print_entries():
+    """Выводит записи кэша парсинга"""
+    entries = list_entries()
+    if not entries:
+        print("Кэш парсинга пуст")
+        return
+    for entry in entries:
+        created = datetime.fromtimestamp(entry.get('created', 0)).strftime('%Y-%m-%d %H:%M:%S')
+        print(
+            f"{created}  {entry['file_name']}  группы: {', '.join(entry.get('groups', []))}  "
+            f"{entry['size'] / 1024:.1f} KB  {entry.get('key', '')[:12]}"
+        )
+
+
+def main():
+    """
+    Главная функция
+    """
+    parser = argparse.ArgumentParser(description="Запись данных в БД из кэша парсинга")
+    parser.add_argument("--group", action="append", help="группа для перезаписи (можно указать несколько раз)")
+    parser.add_argument("--list", action="store_true", help="показать записи кэша")
+    parser.add_argument("--evict", action="store_true", help="удалить старые записи кэша")
+    args = parser.parse_args()
+
+    if args.list:
+        print_entries()
+    elif args.evict:
+        print(f"🗑️  Удалено записей: {evict()}")
+    else:
+        init_db()
+        reingest(args.group)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+"""
+ИНДЕКС СПИСКА СТУДЕНТОВ ДЛЯ БЫСТРОГО ПОИСКА
+===========================================
+
+Используется API (подсказки "возможно, вы имели в виду") и Telegram ботом.
+
+Логика работы:
+1. Загружает всех студентов из БД одним запросом
+2. Строит ключи поиска: нормализованное ФИО ("иванов и.и.") и фамилию
+3. Префиксный поиск - бинарный поиск (bisect) по отсортированному массиву ключей
+4. Поиск с опечатками - индекс удалений (SymSpell): для каждой фамилии
+   заранее строятся все варианты с удалением 1-2 символов, кандидаты
+   проверяются точным расстоянием Дамерау-Левенштейна
+5. Индекс перестраивается после каждого парсинга (при смене версии данных);
+   событие завершения парсинга (ingest_events.py) сбрасывает проверку
+   версии сразу, без ожидания ROSTER_REFRESH_SECONDS
+
+Функции:
+- get_roster_index() - кэшированный индекс с проверкой версии данных
+- RosterIndex.search() - поиск с ранжированием
+- RosterIndex.find_exact() - точное совпадение ФИО (после нормализации)
+- edit_distance() - ограниченное расстояние редактирования
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from database import get_db, get_data_version, parsing_config, Student, Group
+from fio_normalizer import normalize_fio_to_initials
+from ingest_events import subscribe
+
+# Как часто (в секундах) проверять версию данных в БД
+ROSTER_REFRESH_SECONDS = getattr(parsing_config, 'ROSTER_REFRESH_SECONDS', 5)
+
+# Уровни совпадения (меньше - лучше)
+MATCH_EXACT = 0
+MATCH_PREFIX = 1
+MATCH_FUZZY = 2
+
+MATCH_NAMES = {
+    MATCH_EXACT: 'exact',
+    MATCH_PREFIX: 'prefix',
+    MATCH_FUZZY: 'fuzzy',
+}
+
+# Длины префиксов фамилии, по которым ищем с опечаткой (пока фамилия не допечатана)
+MIN_FUZZY_PREFIX = 4
+MAX_FUZZY_PREFIX = 8
+
+
+def normalize_search_key(text: str) -> str:
+    """
+    Приводит строку к ключу поиска: нижний регистр, "ё" -> "е", одиночные пробелы
+    """
+    if not text:
+        return ''
+    return ' '.join(str(text).lower().replace('ё', 'е').split())
+
+
+def max_distance_for(word: str) -> int:
+    """Допустимое число опечаток: 1 для коротких фамилий, 2 для длинных"""
+    if len(word) < 3:
+        return 0
+    if len(word) <= 5:
+        return 1
+    return 2
+
+
+def _deletes(word: str, depth: int) -> set:
+    """Все варианты слова с удалением до depth символов (включая само слово)"""
+    result = {word}
+    frontier = {word}
+    for _ in range(depth):
+        next_frontier = set()
+        for item in frontier:
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        next_frontier -= result
+        result |= next_frontier
+        frontier = next_frontier
+    return result
+
+
+def edit_distance(a: str, b: str, max_dist: int) -> int:
+    """
+    Расстояние Дамерау-Левенштейна (с перестановкой соседних символов)
+
+    Возвращает max_dist + 1, если расстояние больше max_dist
+    (ранний выход, чтобы не считать всю матрицу).
+    """
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_dist:
+        return max_dist + 1
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if (prev_prev is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, prev_prev[j - 2] + 1)
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_dist:
+            return max_dist + 1
+        prev_prev, prev = prev, current
+
+    return prev[-1] if prev[-1] <= max_dist else max_dist + 1
+
+
+class RosterIndex:
+    """
+    Неизменяемый индекс списка студентов
+
+    entries - список словарей {"id", "fio", "group_id", "group_name"}
+    """
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.entries = list(entries)
+
+        # Отсортированный массив (ключ ФИО, номер записи) для префиксного поиска
+        keyed = []
+        surnames = {}  # фамилия -> список номеров записей
+        for idx, entry in enumerate(self.entries):
+            key = normalize_search_key(entry['fio'])
+            entry['_key'] = key
+            keyed.append((key, idx))
+            surname = key.split(' ')[0] if key else ''
+            if surname:
+                surnames.setdefault(surname, []).append(idx)
+        keyed.sort()
+        self._keys = [key for key, _ in keyed]
+        self._key_idx = [idx for _, idx in keyed]
+
+        # Индекс удалений для поиска с опечатками
+        self._surnames = surnames
+        self._surname_deletes = {}  # вариант -> множество фамилий
+        self._prefix_deletes = {}  # вариант префикса -> множество фамилий
+        for surname in surnames:
+            for variant in _deletes(surname, max_distance_for(surname)):
+                self._surname_deletes.setdefault(variant, set()).add(surname)
+            for length in range(MIN_FUZZY_PREFIX, min(len(surname), MAX_FUZZY_PREFIX + 1)):
+                for variant in _deletes(surname[:length], 1):
+                    self._prefix_deletes.setdefault(variant, set()).add(surname)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _prefix_matches(self, key: str):
+        """Номера записей, ключ которых начинается с key (бинарный поиск)"""
+        start = bisect_left(self._keys, key)
+        for pos in range(start, len(self._keys)):
+            if not self._keys[pos].startswith(key):
+                break
+            yield self._key_idx[pos]
+
+    def _fuzzy_surnames(self, surname: str, allow_prefix: bool):
+        """
+        Фамилии, отличающиеся от surname не более чем на допустимое число опечаток
+
+        Returns:
+            dict: фамилия -> расстояние
+        """
+        found = {}
+        max_dist = max_distance_for(surname)
+        if max_dist:
+            candidates = set()
+            for variant in _deletes(surname, max_dist):
+                candidates |= self._surname_deletes.get(variant, set())
+            for candidate in candidates:
+                dist = edit_distance(surname, candidate, max_dist)
+                if dist <= max_dist:
+                    found[candidate] = dist
+
+        # Пользователь мог еще не допечатать фамилию: ищем префиксы с одной опечаткой
+        if allow_prefix and MIN_FUZZY_PREFIX <= len(surname) <= MAX_FUZZY_PREFIX:
+            candidates = set()
+            for variant in _deletes(surname, 1):
+                candidates |= self._prefix_deletes.get(variant, set())
+            for candidate in candidates:
+                if candidate in found:
+                    continue
+                dist = min(
+                    edit_distance(surname, candidate[:length], 1)
+                    for length in (len(surname) - 1, len(surname), len(surname) + 1)
+                    if MIN_FUZZY_PREFIX - 1 <= length <= len(candidate)
+                )
+                if dist <= 1:
+                    found[candidate] = dist
+        return found
+
+    def find_exact(self, fio: str):
+        """
+        Записи, совпадающие с ФИО после нормализации в формат "Фамилия И.О."
+        (те же ключи, что и при парсинге; регистр и "ё" не учитываются)
+        """
+        key = normalize_search_key(normalize_fio_to_initials(' '.join(str(fio).split())))
+        if not key:
+            return []
+        matches = []
+        for idx in self._prefix_matches(key):
+            if self.entries[idx]['_key'] == key:
+                entry = self.entries[idx]
+                matches.append({
+                    "id": entry['id'],
+                    "fio": entry['fio'],
+                    "group_id": entry['group_id'],
+                    "group_name": entry['group_name']
+                })
+        return matches
+
+    def search(self, query: str, limit: int = 10, group_id: int = None):
+        """
+        Поиск студентов по ФИО (полному, в формате "Фамилия И.О." или по части)
+
+        Ранжирование:
+        1. Точное совпадение ФИО
+        2. ФИО начинается с запроса
+        3. Фамилия с опечатками (меньше опечаток - выше)
+
+        Returns:
+            List[dict]: {"id", "fio", "group_id", "group_name", "match", "distance"}
+        """
+        raw_key = normalize_search_key(query)
+        if not raw_key:
+            return []
+
+        # Полное ФИО приводим к формату "Фамилия И.О.", как при парсинге
+        keys = {raw_key}
+        if len(raw_key.split(' ')) >= 2:
+            keys.add(normalize_search_key(normalize_fio_to_initials(' '.join(query.split()))))
+
+        best = {}  # номер записи -> (уровень, расстояние)
+
+        def consider(idx, level, distance):
+            if group_id is not None and self.entries[idx]['group_id'] != group_id:
+                return
+            current = best.get(idx)
+            if current is None or (level, distance) < current:
+                best[idx] = (level, distance)
+
+        for key in keys:
+            for idx in self._prefix_matches(key):
+                level = MATCH_EXACT if self.entries[idx]['_key'] == key else MATCH_PREFIX
+                consider(idx, level, 0)
+
+        tokens = raw_key.split(' ')
+        surname = tokens[0]
+        rest = ' '.join(tokens[1:])
+        rest_compact = rest.replace(' ', '')
+        fuzzy = self._fuzzy_surnames(surname, allow_prefix=not rest)
+        for candidate, dist in fuzzy.items():
+            for idx in self._surnames[candidate]:
+                if rest:
+                    # Инициалы/имя должны совпадать хотя бы по первой букве
+                    entry_rest = self.entries[idx]['_key'][len(candidate):].strip()
+                    if entry_rest and entry_rest[0] != rest_compact[0]:
+                        dist_total = dist + 1
+                    else:
+                        dist_total = dist
+                else:
+                    dist_total = dist
+                consider(idx, MATCH_FUZZY, dist_total)
+
+        ranked = sorted(
+            best.items(),
+            key=lambda item: (item[1][0], item[1][1], self.entries[item[0]]['_key'])
+        )
+
+        results = []
+        for idx, (level, distance) in ranked[:limit]:
+            entry = self.entries[idx]
+            results.append({
+                "id": entry['id'],
+                "fio": entry['fio'],
+                "group_id": entry['group_id'],
+                "group_name": entry['group_name'],
+                "match": MATCH_NAMES[level],
+                "distance": distance
+            })
+        return results
+
+
+def load_roster_index(db=None) -> RosterIndex:
+    """Строит индекс по текущему содержимому БД"""
+    own_session = db is None
+    if own_session:
+        db = get_db()
+    try:
+        version = get_data_version(db)
+        rows = db.query(Student.id, Student.fio, Student.group_id, Group.name).join(
+            Group, Student.group_id == Group.id
+        ).all()
+        entries = [
+            {"id": int(row[0]), "fio": str(row[1]), "group_id": int(row[2]), "group_name": str(row[3])}
+            for row in rows
+        ]
+        return RosterIndex(entries, version=version)
+    finally:
+        if own_session:
+            db.close()
+
+
+_index = None
+_index_checked_at = 0.0
+_index_lock = threading.Lock()
+
+
+def get_roster_index(db=None, force_refresh: bool = False) -> RosterIndex:
+    """
+    Возвращает кэшированный индекс, перестраивая его после нового парсинга
+
+    Версия данных проверяется не чаще, чем раз в ROSTER_REFRESH_SECONDS,
+    поэтому повторные запросы не обращаются к БД.
+    """
+    global _index, _index_checked_at
+
+    now = time.monotonic()
+    if not force_refresh and _index is not None and now - _index_checked_at < ROSTER_REFRESH_SECONDS:
+        return _index
+
+    with _index_lock:
+        if not force_refresh and _index is not None and now - _index_checked_at < ROSTER_REFRESH_SECONDS:
+            return _index
+
+        own_session = db is None
+        if own_session:
+            db = get_db()
+        try:
+            version = get_data_version(db)
+            if force_refresh or _index is None or _index.version != version:
+                _index = load_roster_index(db)
+            _index_checked_at = time.monotonic()
+            return _index
+        finally:
+            if own_session:
+                db.close()
+
+
+def invalidate_roster_index():
+    """Сбрасывает кэш индекса (следующий запрос перестроит его)"""
+    global _index_checked_at
+    _index_checked_at = 0.0
+
+
+# После нового парсинга индекс перестраивается при следующем запросе
+subscribe(lambda event: invalidate_roster_index())
@@ -0,0 +1,232 @@
+"""
+ЭТАЛОННЫЕ ФАЙЛЫ ДЛЯ СРАВНЕНИЯ ДВИЖКОВ ПАРСЕРА
+=============================================
+
+Небольшие журналы с тем, что встречается в выгрузках и по-разному
+обрабатывается движками "openpyxl" и "xml" (parsers/xml_reader.py):
+
+- Испп golden-merged.xlsx - объединенные заголовки месяцев, два журнала на
+  вкладке, таблица тем, значения всех типов (числа, строки, даты, bool,
+  формулы без сохраненного значения)
+- Испп golden-comments.xlsx - вкладка с комментариями к ячейкам
+  (движок "xml" читает ее через openpyxl)
+- Испп golden-chartsheet.xlsx - вкладка-диаграмма между предметами
+- Испп golden-phantom.xlsx - форматирование и объединения далеко за
+  данными (фантомный диапазон), гиперссылка
+
+Месяц без года в заголовке парсер относит к текущему году - результат
+считается и проверяется с часами, остановленными на FROZEN_NOW (frozen_clock()).
+
+Файлы и ожидаемый результат parse_excel_file() (expected.json) хранятся в
+репозитории; проверка - tests/test_xml_engine.py. Пересоздать (после
+изменения этого скрипта или намеренного изменения результата парсинга),
+из каталога parsing:
+    python -m tests.golden.make_golden
+"""
+
+import contextlib
+import json
+import os
+import random
+import sys
+from datetime import datetime
+from unittest import mock
+
+from openpyxl import Workbook
+from openpyxl.chart import BarChart, Reference
+from openpyxl.comments import Comment
+
+GOLDEN_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPECTED_FILE = os.path.join(GOLDEN_DIR, "expected.json")
+
+# "Текущее" время парсера для эталонов (год месяцев без года - 2024)
+FROZEN_NOW = datetime(2024, 12, 1)
+
+STUDENTS = [
+    "Андреев Иван Петрович", "Васильев О.О.", "Волков  Сергей", "Егоров Е.А.",
+    "Иванов Петр Сергеевич", "Петров-Водкин Олег", " Смирнова Анна Олеговна",
+]
+VALUES = [
+    "5", "4", "3", "2", "н", "н/5", "д/4", "нб", "н/б", "пропуск", "*", "3/5",
+    5, 4, 3, 4.0, "", "  ", 0, "0", "5+", "4-", "зач", "12", 45, "Н", "н/я",
+    datetime(2024, 9, 1), "2024-09-01", True, None, None, None,
+]
+MONTHS = ["Сентябрь", "Октябрь", "Ноябрь", "Декабрь 2024", "январь 2025"]
+SUBJECTS = ["ОГСЭ.01 История", "ЕН.01 Математика", "ОП.01 Информатика"]
+
+
+def _workbook():
+    wb = Workbook()
+    wb.active.title = "Титул"
+    wb.create_sheet("Список")
+    wb.create_sheet("Инструкция")
+    return wb
+
+
+def _finish(wb, path):
+    wb.create_sheet("УП технической разработки")["B5"] = "ФИО"
+    wb.create_sheet("Прочее")["B5"] = "ФИО"
+    wb.save(path)
+
+
+def fill_journal(ws, rng, top, columns=14):
+    """Журнал: строка месяцев (объединенные ячейки), строка дней, студенты"""
+    col = 3
+    month = 0
+    while col < 3 + columns:
+        end = min(col + rng.randint(3, 6) - 1, 2 + columns)
+        ws.cell(row=top, column=col, value=MONTHS[month % len(MONTHS)])
+        if end > col:
+            ws.merge_cells(start_row=top, start_column=col, end_row=top, end_column=end)
+        col = end + 1
+        month += 1
+    ws.cell(row=top + 1, column=1, value="№")
+    ws.cell(row=top + 1, column=2, value="ФИО обучающихся")
+    for col in range(3, 3 + columns):
+        kind = rng.random()
+        if kind < 0.7:
+            ws.cell(row=top + 1, column=col, value=rng.randint(1, 28))
+        elif kind < 0.8:
+            ws.cell(row=top + 1, column=col, value=datetime(2024, rng.randint(9, 12), rng.randint(1, 28)))
+        elif kind < 0.9:
+            ws.cell(row=top + 1, column=col, value=f"{rng.randint(1, 28):02d}.10.2024")
+        else:
+            ws.cell(row=top + 1, column=col, value=45600 + rng.randint(0, 60))
+    for i, fio in enumerate(STUDENTS):
+        row = top + 2 + i
+        ws.cell(row=row, column=1, value=i + 1)
+        ws.cell(row=row, column=2, value=fio)
+        for col in range(3, 3 + columns):
+            value = rng.choice(VALUES)
+            if value is not None:
+                ws.cell(row=row, column=col, value=value)
+    return top + 2 + len(STUDENTS)
+
+
+def fill_topics(ws, rng, column=20):
+    """Таблица тем занятий справа от журнала"""
+    ws.cell(row=3, column=column, value="Дата проведения")
+    ws.cell(row=3, column=column + 1, value="Кол-во часов")
+    ws.cell(row=3, column=column + 2, value="Наименование учебного занятия")
+    for i in range(8):
+        row = 4 + i
+        ws.cell(row=row, column=column, value=rng.choice([
+            datetime(2024, 10, rng.randint(1, 28)), 45610 + i, f"{rng.randint(1, 28)}.11.2024",
+        ]))
+        ws.cell(row=row, column=column + 1, value=rng.choice([2, "2", 4]))
+        ws.cell(row=row, column=column + 2, value=f"Тема {i}.1. Практическая работа {i}")
+
+
+def make_merged(path):
+    rng = random.Random(1)
+    wb = _workbook()
+    for name in SUBJECTS:
+        ws = wb.create_sheet(name)
+        ws["A1"] = "Журнал учебных занятий"
+        end = fill_journal(ws, rng, 4)
+        fill_journal(ws, rng, end + 3, columns=10)
+        fill_topics(ws, rng)
+        # Формула без сохраненного значения (data_only=True - None)
+        ws["C40"] = "=SUM(C6:C12)"
+    _finish(wb, path)
+
+
+def make_comments(path):
+    rng = random.Random(2)
+    wb = _workbook()
+    for name in SUBJECTS:
+        ws = wb.create_sheet(name)
+        fill_journal(ws, rng, 4)
+        if name == SUBJECTS[1]:
+            ws["C6"].comment = Comment("Пересдача", "Преподаватель")
+            ws["B7"].comment = Comment("Перевелся из другой группы", "Куратор")
+    _finish(wb, path)
+
+
+def make_chartsheet(path):
+    rng = random.Random(3)
+    wb = _workbook()
+    ws = wb.create_sheet(SUBJECTS[0])
+    fill_journal(ws, rng, 4)
+    chart = BarChart()
+    chart.add_data(Reference(ws, min_col=1, min_row=6, max_row=12))
+    chartsheet = wb.create_chartsheet("Диаграмма посещаемости")
+    chartsheet.add_chart(chart)
+    ws = wb.create_sheet(SUBJECTS[1])
+    fill_journal(ws, rng, 4)
+    _finish(wb, path)
+
+
+def make_phantom(path):
+    rng = random.Random(4)
+    wb = _workbook()
+    for name in SUBJECTS[:2]:
+        ws = wb.create_sheet(name)
+        fill_journal(ws, rng, 4)
+        # Пустые ячейки с форматированием и объединения далеко за данными
+        ws.cell(row=400, column=45).number_format = "0.00"
+        ws.cell(row=350, column=3).value = "   "
+        ws.merge_cells("AA300:AD305")
+        ws["B3"].hyperlink = "https://example.com/journal"
+    _finish(wb, path)
+
+
+FIXTURES = {
+    "Испп golden-merged.xlsx": make_merged,
+    "Испп golden-comments.xlsx": make_comments,
+    "Испп golden-chartsheet.xlsx": make_chartsheet,
+    "Испп golden-phantom.xlsx": make_phantom,
+}
+
+
+def fixture_paths():
+    return [os.path.join(GOLDEN_DIR, name) for name in FIXTURES]
+
+
+class _FrozenDatetimeType(type):
+    def __instancecheck__(cls, value):
+        # isinstance(значение_ячейки, datetime) в парсере работает как обычно
+        return isinstance(value, datetime)
+
+
+class _FrozenDatetime(datetime, metaclass=_FrozenDatetimeType):
+    @classmethod
+    def now(cls, tz=None):
+        return FROZEN_NOW
+
+
+@contextlib.contextmanager
+def frozen_clock():
+    """datetime.now() в excel_parser возвращает FROZEN_NOW"""
+    from parsers import excel_parser
+
+    with mock.patch.object(excel_parser, "datetime", _FrozenDatetime):
+        yield
+
+
+def to_json(records):
+    """Результат parse_excel_file() в виде, пригодном для JSON (даты - ISO)"""
+    return json.loads(json.dumps(records, ensure_ascii=False, default=lambda value: value.isoformat()))
+
+
+def main():
+    from parsers import excel_parser
+
+    excel_parser.PARSER_ENGINE = "openpyxl"
+    expected = {}
+    for name, make in FIXTURES.items():
+        path = os.path.join(GOLDEN_DIR, name)
+        make(path)
+        with frozen_clock():
+            expected[name] = to_json(excel_parser.parse_excel_file(path))
+        print(f"{name}: записей {len(expected[name])}")
+    with open(EXPECTED_FILE, "w", encoding="utf-8") as f:
+        json.dump(expected, f, ensure_ascii=False, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    parsing_path = os.path.dirname(os.path.dirname(GOLDEN_DIR))
+    if parsing_path not in sys.path:
+        sys.path.insert(0, parsing_path)
+    main()
@@ -0,0 +1,199 @@
+"""
+ЭТАЛОННЫЕ ФУНКЦИИ РАЗБОРА ЯЧЕЕК
+===============================
+
+parse_date() и parse_grade_value() из parsers/excel_parser.py в том виде,
+в каком они были до кэширующего классификатора (parsers/cell_classifier.py),
+предкомпилированных регулярных выражений и векторного преобразования дат
+Excel (parsers/excel_dates.py). Код заморожен и не должен меняться вместе с
+парсером: test_cell_classifier.py проверяет, что текущие функции и
+классификатор дают те же результаты.
+"""
+
+import re
+from datetime import datetime, date as date_type
+
+
+def parse_date(date_value):
+    """
+    Парсинг даты из различных форматов
+    
+    Поддерживает:
+    - datetime объекты
+    - date объекты
+    - Числа Excel (номер дня с 1900-01-01)
+    - Строки в форматах: %d.%m.%Y, %Y-%m-%d, %d/%m/%Y, %Y/%m/%d
+    """
+    if isinstance(date_value, (datetime, date_type)):
+        if isinstance(date_value, datetime):
+            parsed_date = date_value.date()
+        else:
+            parsed_date = date_value
+        
+        # Проверяем, что дата разумная (не 1900 год)
+        if parsed_date.year < 2000:
+            return None
+        return parsed_date
+    
+    elif isinstance(date_value, (int, float)):
+        # Excel хранит даты как числа (дни с 1900-01-01)
+        try:
+            from openpyxl.utils.datetime import from_excel
+            parsed_date = from_excel(date_value).date()
+            
+            # Проверяем, что дата разумная (не 1900 год)
+            if parsed_date.year < 2000:
+                # Пробуем альтернативный способ - может быть это номер дня в другом формате
+                # Если число маленькое (1-31), это может быть день месяца, а не дата Excel
+                if date_value < 100:
+                    return None
+                return None
+            return parsed_date
+        except Exception as e:
+            return None
+    
+    elif isinstance(date_value, str):
+        # Пытаемся распарсить строку
+        date_str = date_value.strip()
+        
+        # Пробуем разные форматы
+        formats = [
+            "%d.%m.%Y", 
+            "%Y-%m-%d", 
+            "%d/%m/%Y", 
+            "%Y/%m/%d",
+            "%d.%m.%y",  # короткий год
+            "%d/%m/%y"
+        ]
+        
+        for fmt in formats:
+            try:
+                parsed_date = datetime.strptime(date_str, fmt).date()
+                # Проверяем, что дата разумная
+                if parsed_date.year >= 2000:
+                    return parsed_date
+            except:
+                continue
+        
+        # Если не получилось распарсить, возвращаем None
+        return None
+    
+    return None
+
+
+def parse_grade_value(value):
+    """
+    Парсинг значения оценки/пропуска
+    
+    Логика:
+    - Если содержит слова "пропуск", "н", "н/я" и т.д. → возвращает "пропуск"
+    - Иначе пытается извлечь число (оценку)
+    - Исключает даты и другие некорректные значения
+    - Возвращает строку с оценкой или "пропуск"
+    """
+    # КРИТИЧЕСКИ ВАЖНО: Строгая проверка на пустые значения
+    if value is None:
+        return None
+    
+    # Если это дата - не парсим как оценку
+    if isinstance(value, (datetime, date_type)):
+        return None
+    
+    # Преобразуем в строку и проверяем на пустоту
+    value_str = str(value).strip()
+    
+    # Если пустая строка или только пробелы - не парсим
+    if not value_str or value_str == '' or value_str.isspace():
+        return None
+    
+    # Если это просто 0 (не оценка) - пропускаем
+    if value_str == '0' or value_str == '0.0':
+        return None
+    
+    value_lower = value_str.lower()
+    
+    # Исключаем даты (формат YYYY-MM-DD или похожий)
+    if re.match(r'^\d{4}-\d{2}-\d{2}', value_str):
+        return None
+    
+    # Исключаем значения, которые выглядят как даты с временем
+    if re.match(r'^\d{4}-\d{2}-\d{2}\s+\d{2}', value_str):
+        return None
+    
+    # ВАЖНО: Проверяем на дробь СНАЧАЛА, до проверки на пропуск!
+    # Дроби типа "н/5", "д/4", "н/б", "3/5" и т.д.
+    if '/' in value_str:
+        parts = value_str.split('/')
+        if len(parts) >= 2:
+            first_part = parts[0].strip().lower()
+            second_part = parts[1].strip().lower()
+            
+            # Если вторая часть - это "б" или "н", то это пропуск
+            if second_part in ['б', 'н', 'нб', 'н/б']:
+                return "пропуск"
+            
+            # Проверяем, являются ли обе части числами
+            try:
+                first_num = int(parts[0].strip())
+                second_num = int(parts[1].strip())
+                
+                # Если обе части - валидные оценки (1-5), возвращаем дробь целиком
+                if (1 <= first_num <= 5) and (1 <= second_num <= 5):
+                    return f"{first_num}/{second_num}"
+            except ValueError:
+                pass
+            
+            # Если только вторая часть - число (для "н/5", "д/4" и т.д.)
+            try:
+                second_num = int(parts[1].strip())
+                if 1 <= second_num <= 5:
+                    # Проверяем, что первая часть - это буква (н, д и т.д.)
+                    if first_part.isalpha() and len(first_part) <= 2:
+                        return str(second_num)
+            except ValueError:
+                pass
+            
+            # Если только первая часть - число
+            try:
+                first_num = int(parts[0].strip())
+                if 1 <= first_num <= 5:
+                    return str(first_num)
+            except ValueError:
+                pass
+    
+    # Проверяем на пропуск (ПОСЛЕ проверки на дроби!)
+    # Проверяем только если это не дробь
+    if any(word == value_lower for word in ['н', 'нб', 'н/б', 'пропуск', 'н/я', 'неявка']) or value_str == '*':
+        return "пропуск"
+    
+    # Пытаемся извлечь оценку (число)
+    # Сначала пробуем простое преобразование в число
+    try:
+        grade_num = float(value_str)
+        # Проверяем, что это разумная оценка (1-5)
+        if 1 <= grade_num <= 5:
+            return str(int(grade_num))
+        # Или оценка в формате 0-100
+        elif 0 <= grade_num <= 100:
+            return str(int(grade_num))
+    except ValueError:
+        pass
+    
+    # Если не получилось, пытаемся извлечь число из строки
+    numbers = re.findall(r'\d+', value_str)
+    if numbers:
+        grade = numbers[0]
+        grade_int = int(grade)
+        # Проверяем, что это разумная оценка (1-5)
+        if grade in ['1', '2', '3', '4', '5']:
+            return grade
+        # Или оценка в формате 0-100
+        elif 0 <= grade_int <= 100:
+            return grade
+    
+    # Если это короткая строка (1-2 символа) и не дата - возвращаем как есть
+    if len(value_str) <= 2:
+        return value_str
+    
+    # Иначе игнорируем (вероятно, это не оценка)
+    return None
@@ -0,0 +1,107 @@
+"""
+Классификатор ячеек (parsers/cell_classifier.py) и текущие parse_date() /
+parse_grade_value() против замороженных эталонных функций
+(tests/reference_cells.py): тот же тип и то же значение на случайных и
+повторяющихся значениях ячеек
+
+Запуск (из корня проекта):
+    python -m unittest discover -s parsing/tests -t parsing
+"""
+
+import os
+import random
+import sys
+import unittest
+from datetime import datetime, date as date_type
+
+parsing_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parsing_path not in sys.path:
+    sys.path.insert(0, parsing_path)
+
+from parsers.cell_classifier import (
+    COMMON_GRADE_TOKENS, classify_grade, classify_date, classify_dates, clear_caches,
+)
+from parsers.excel_parser import parse_grade_value, parse_date
+from tests import reference_cells
+
+# Количество случайных значений (каждое проверяется дважды - второй раз из кэша)
+VALUE_COUNT = 10000
+
+
+def _random_cell_values(count, seed):
+    """Случайные значения ячеек: частые токены, их искажения, числа, даты"""
+    rng = random.Random(seed)
+    alphabet = '0123456789нНбБдДяЯ/.-+* ,abc'
+    values = []
+    for _ in range(count):
+        kind = rng.randrange(8)
+        if kind == 0:
+            values.append(rng.choice(COMMON_GRADE_TOKENS))
+        elif kind == 1:
+            token = rng.choice(COMMON_GRADE_TOKENS)
+            values.append(rng.choice(['', ' ', '  ']) + token.upper() + rng.choice(['', ' ', '\t']))
+        elif kind == 2:
+            values.append(''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 6))))
+        elif kind == 3:
+            values.append(rng.choice([rng.randint(-5, 120), rng.randint(30000, 50000), True, False]))
+        elif kind == 4:
+            values.append(rng.choice([rng.uniform(-1, 101), rng.uniform(36000, 48000), float(rng.randint(0, 6))]))
+        elif kind == 5:
+            values.append(datetime(rng.randint(1899, 2030), rng.randint(1, 12), rng.randint(1, 28)))
+        elif kind == 6:
+            day, month, year = rng.randint(1, 31), rng.randint(1, 12), rng.randint(1990, 2030)
+            values.append(rng.choice([
+                f"{day:02d}.{month:02d}.{year}", f"{year}-{month:02d}-{day:02d}",
+                f"{day}/{month}/{year % 100:02d}", f"{year}-{month:02d}-{day:02d} 00:00:00",
+            ]))
+        else:
+            values.append(date_type(rng.randint(1990, 2030), rng.randint(1, 12), rng.randint(1, 28)))
+    return values
+
+
+class CellClassifierTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        values = _random_cell_values(VALUE_COUNT, seed=0)
+        # Повторяем значения, чтобы проверить и ответы из кэша
+        cls.values = values + values[::-1]
+
+    def setUp(self):
+        clear_caches()
+
+    def assertSameResults(self, func, reference, values):
+        mismatches = []
+        for value in values:
+            expected = reference(value)
+            actual = func(value)
+            if type(actual) is not type(expected) or actual != expected:
+                mismatches.append((value, actual, expected))
+        self.assertEqual(
+            mismatches[:10], [],
+            f"{func.__name__}: расхождений {len(mismatches)} из {len(values)}"
+        )
+
+    def test_parse_grade_value_matches_reference(self):
+        self.assertSameResults(parse_grade_value, reference_cells.parse_grade_value, self.values)
+
+    def test_parse_date_matches_reference(self):
+        self.assertSameResults(parse_date, reference_cells.parse_date, self.values)
+
+    def test_classify_grade_matches_reference(self):
+        self.assertSameResults(classify_grade, reference_cells.parse_grade_value, self.values)
+
+    def test_classify_date_matches_reference(self):
+        self.assertSameResults(classify_date, reference_cells.parse_date, self.values)
+
+    def test_classify_dates_matches_reference(self):
+        results = iter(classify_dates(self.values))
+        self.assertSameResults(lambda value: next(results), reference_cells.parse_date, self.values)
+
+    def test_common_tokens_match_reference(self):
+        values = [variant for token in COMMON_GRADE_TOKENS for variant in (token, f' {token}', f'{token} ')]
+        self.assertSameResults(classify_grade, reference_cells.parse_grade_value, values)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Конвейер загрузки (pipeline.py) на эталонных файлах tests/golden во
+временной БД:
+
+- группа из двух файлов записывается одной транзакцией после парсинга
+  обоих файлов, содержимое всех файлов отмечается в UpdateLog
+- вкладка, пропущенная по лимитам во втором файле группы, или ошибка
+  парсинга одного из файлов - группа остается в БД как была
+- неизменившийся файл (группа из одного файла) не парсится повторно
+
+Запуск (из корня проекта):
+    python -m unittest discover -s parsing/tests -t parsing
+"""
+
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+parsing_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parsing_path not in sys.path:
+    sys.path.insert(0, parsing_path)
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import pipeline
+from database import Base, Grade, Group, Student, UpdateLog
+from downloaders.sources import LocalDirectorySource
+from parsers import parse_budget
+from tests.golden.make_golden import GOLDEN_DIR
+
+# Группа G - два файла, группа H - один
+SOURCE_FILES = {
+    "temp_Испп G.xlsx": "Испп golden-comments.xlsx",
+    "Испп G.xlsx": "Испп golden-merged.xlsx",
+    "Испп H.xlsx": "Испп golden-phantom.xlsx",
+}
+
+
+class PipelineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.source_dir = os.path.join(self.tmp, "source")
+        os.makedirs(self.source_dir)
+        for name, golden_name in SOURCE_FILES.items():
+            shutil.copy(os.path.join(GOLDEN_DIR, golden_name), os.path.join(self.source_dir, name))
+
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp, 'test.db')}")
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)
+        for patcher in (
+            mock.patch.object(pipeline, "get_db", self.session),
+            mock.patch.object(pipeline, "PARSE_CACHE_ENABLED", False),
+            mock.patch.object(pipeline, "SKIP_UNCHANGED_FILES", True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def run_pipeline(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return pipeline.run_pipeline(source=LocalDirectorySource(self.source_dir), **kwargs)
+
+    def grades_count(self, group_name):
+        db = self.session()
+        try:
+            return db.query(Grade).join(Student).join(Group, Student.group_id == Group.id).filter(
+                Group.name == group_name
+            ).count()
+        finally:
+            db.close()
+
+    def ingested(self):
+        db = self.session()
+        try:
+            return {row.file_name for row in db.query(UpdateLog) if row.content_sha256}
+        finally:
+            db.close()
+
+    def clear_ingested(self):
+        db = self.session()
+        try:
+            db.query(UpdateLog).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def parse_file_with(self, file_name, error=None):
+        """parse_file, который для file_name превышает лимит ячеек (или падает с error)"""
+        parse_file = pipeline.parse_file
+
+        def patched(file_path):
+            if os.path.basename(file_path) != file_name:
+                return parse_file(file_path)
+            if error is not None:
+                raise error
+            with mock.patch.object(parse_budget, "SHEET_CELL_BUDGET", 1):
+                return parse_file(file_path)
+
+        return mock.patch.object(pipeline, "parse_file", patched)
+
+    def test_multi_file_group_is_written_after_all_its_files(self):
+        events = []
+        result = self.run_pipeline(
+            on_file_parsed=lambda name, records, report: events.append(("parsed", name)),
+            on_group_written=lambda name, prepared, write_result: events.append(("written", name, write_result["mode"])),
+        )
+
+        self.assertEqual(result.errors, [])
+        self.assertEqual(sorted(result.groups_updated), ["G", "H"])
+        # Запись G - одна транзакция после парсинга обоих файлов: замена, затем слияние
+        written_g = [event for event in events if event[0] == "written" and event[1] == "G"]
+        self.assertEqual([event[2] for event in written_g], ["full", "merge"])
+        self.assertGreater(events.index(written_g[0]), events.index(("parsed", "Испп G.xlsx")))
+        self.assertGreater(events.index(written_g[0]), events.index(("parsed", "temp_Испп G.xlsx")))
+        self.assertGreater(self.grades_count("G"), 0)
+        self.assertEqual(self.ingested(), set(SOURCE_FILES))
+
+    def test_unchanged_single_file_group_is_skipped(self):
+        self.run_pipeline()
+        grades = self.grades_count("G")
+
+        result = self.run_pipeline()
+
+        # Группа из нескольких файлов не пропускается - записывается целиком
+        self.assertEqual(result.unchanged_files, ["Испп H.xlsx"])
+        self.assertEqual(result.groups_updated, ["G"])
+        self.assertEqual(self.grades_count("G"), grades)
+
+    def test_aborted_sheet_in_second_file_keeps_group(self):
+        self.run_pipeline()
+        grades = self.grades_count("G")
+        self.clear_ingested()
+
+        with self.parse_file_with("Испп G.xlsx"):
+            result = self.run_pipeline()
+
+        self.assertTrue(result.parse_report.get("aborted_sheets"))
+        self.assertEqual(result.groups_updated, ["H"])
+        self.assertEqual(result.stages["write"].counters.get("groups_skipped"), 1)
+        self.assertEqual(self.grades_count("G"), grades)
+        # Файлы группы G не отмечены записанными - следующий запуск повторит их
+        self.assertEqual(self.ingested(), {"Испп H.xlsx"})
+
+    def test_parse_error_keeps_group(self):
+        self.run_pipeline()
+        grades = self.grades_count("G")
+        self.clear_ingested()
+
+        with self.parse_file_with("temp_Испп G.xlsx", error=ValueError("файл поврежден")):
+            result = self.run_pipeline()
+
+        self.assertEqual(
+            result.errors,
+            [{"stage": "parse", "name": "temp_Испп G.xlsx", "error": "файл поврежден"}]
+        )
+        self.assertEqual(result.groups_updated, ["H"])
+        self.assertEqual(self.grades_count("G"), grades)
+        self.assertEqual(self.ingested(), {"Испп H.xlsx"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+"""
+Движок "xml" (parsers/xml_reader.py) против openpyxl на эталонных файлах
+tests/golden (объединенные заголовки, комментарии, вкладка-диаграмма,
+фантомный диапазон):
+
+- compare_engines(): те же значения и границы каждой вкладки и тот же
+  результат parse_excel_file() обоими движками
+- результат parse_excel_file() каждым движком совпадает с сохраненным
+  tests/golden/expected.json
+
+Запуск (из корня проекта):
+    python -m unittest discover -s parsing/tests -t parsing
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import unittest
+
+parsing_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if parsing_path not in sys.path:
+    sys.path.insert(0, parsing_path)
+
+from parsers import excel_parser
+from parsers.xml_reader import XmlWorkbook, compare_engines
+from tests.golden.make_golden import EXPECTED_FILE, fixture_paths, frozen_clock, to_json
+
+
+class XmlEngineTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with open(EXPECTED_FILE, encoding="utf-8") as f:
+            cls.expected = json.load(f)
+
+    def setUp(self):
+        self._engine = excel_parser.PARSER_ENGINE
+        # expected.json посчитан с остановленными часами (месяцы без года)
+        self.enterContext(frozen_clock())
+
+    def tearDown(self):
+        excel_parser.PARSER_ENGINE = self._engine
+
+    def test_golden_files_are_committed(self):
+        for path in fixture_paths():
+            self.assertTrue(os.path.exists(path), path)
+            self.assertIn(os.path.basename(path), self.expected)
+
+    def test_engines_match(self):
+        for path in fixture_paths():
+            with self.subTest(file=os.path.basename(path)):
+                output = io.StringIO()
+                with contextlib.redirect_stdout(output):
+                    ok = compare_engines(path)
+                self.assertTrue(ok, output.getvalue())
+                self.assertEqual(excel_parser.PARSER_ENGINE, self._engine)
+
+    def test_parse_matches_expected(self):
+        for engine in ("openpyxl", "xml"):
+            excel_parser.PARSER_ENGINE = engine
+            for path in fixture_paths():
+                name = os.path.basename(path)
+                with self.subTest(engine=engine, file=name):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        records = excel_parser.parse_excel_file(path)
+                    self.assertTrue(records)
+                    self.assertEqual(to_json(records), self.expected[name])
+
+    def test_unsupported_sheets_fall_back_to_openpyxl(self):
+        path = next(path for path in fixture_paths() if "comments" in path)
+        workbook = XmlWorkbook(path)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for name in workbook.sheetnames:
+                    workbook[name]
+            self.assertEqual(workbook.fallback_sheets, ["ЕН.01 Математика"])
+        finally:
+            workbook.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
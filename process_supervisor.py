@@ -0,0 +1,194 @@
+"""
+Супервизор процессов: парсер, API сервер и Telegram бот в отдельных процессах
+
+В обычном режиме (START_MODE=threads) start.py запускает парсер и бота в
+потоках рядом с uvicorn: парсинг openpyxl занимает GIL, и пока идет парсинг,
+API и бот отвечают медленнее. В режиме START_MODE=processes каждая часть
+работает в своем процессе:
+
+1. Процессы запускаются через multiprocessing (spawn - чистый интерпретатор)
+2. Упавший процесс перезапускается; если он падает сразу после запуска,
+   пауза перед перезапуском растет (RESTART_BACKOFF_SECONDS ..
+   RESTART_BACKOFF_MAX_SECONDS)
+3. У каждого процесса есть канал к супервизору (multiprocessing Pipe,
+   ingest_events.ProcessChannel): событие "ingest_finished, generation N"
+   от парсера пересылается остальным процессам
+4. SIGTERM/SIGINT супервизору - остановка всех процессов
+"""
+import multiprocessing
+import multiprocessing.connection
+import signal
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent
+parsing_path = project_root / "parsing"
+if str(parsing_path) not in sys.path:
+    sys.path.insert(0, str(parsing_path))
+
+from ingest_events import ProcessChannel
+from logger import log_backend_info, log_backend_error
+
+# Пауза перед перезапуском упавшего процесса (удваивается, пока процесс
+# падает быстрее RESTART_RESET_SECONDS после запуска)
+RESTART_BACKOFF_SECONDS = 1
+RESTART_BACKOFF_MAX_SECONDS = 60
+RESTART_RESET_SECONDS = 60
+# Сколько ждать завершения процессов при остановке (потом - SIGKILL)
+STOP_TIMEOUT_SECONDS = 10
+
+
+def _run_role(name, target, conn):
+    """Точка входа дочернего процесса"""
+    # Ctrl+C в терминале получает вся группа процессов - останавливает супервизор
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        target(ProcessChannel(conn, name))
+    except KeyboardInterrupt:
+        # Остановка по SIGTERM (обработчик run_backend)
+        pass
+
+
+class _Role:
+    """Процесс супервизора и его состояние"""
+
+    def __init__(self, name, target):
+        self.name = name
+        self.target = target
+        self.process = None
+        self.conn = None
+        self.started = None
+        self.restarts = 0
+        self.backoff = RESTART_BACKOFF_SECONDS
+        self.restart_at = None
+
+
+class ProcessSupervisor:
+    """
+    Запуск и перезапуск процессов
+
+    roles - {имя: функция(channel)}; функция должна быть объявлена на
+    уровне модуля (запускается в новом интерпретаторе)
+    """
+
+    def __init__(self, roles):
+        self.context = multiprocessing.get_context("spawn")
+        self.roles = [_Role(name, target) for name, target in roles.items()]
+        self.stopping = False
+
+    def _start(self, role):
+        parent_conn, child_conn = self.context.Pipe()
+        role.process = self.context.Process(
+            target=_run_role, args=(role.name, role.target, child_conn),
+            name=f"gremuiv-{role.name}"
+        )
+        role.process.start()
+        child_conn.close()
+        role.conn = parent_conn
+        role.started = time.monotonic()
+        role.restart_at = None
+        print(f"✅ [SUPERVISOR] Процесс {role.name} запущен (pid {role.process.pid})", flush=True)
+
+    def _on_exit(self, role):
+        exitcode = role.process.exitcode
+        role.conn.close()
+        role.conn = None
+        role.process = None
+        if self.stopping:
+            return
+        uptime = time.monotonic() - role.started
+        if uptime >= RESTART_RESET_SECONDS:
+            role.backoff = RESTART_BACKOFF_SECONDS
+        role.restart_at = time.monotonic() + role.backoff
+        print(
+            f"❌ [SUPERVISOR] Процесс {role.name} завершился (код {exitcode}), "
+            f"перезапуск через {role.backoff} сек",
+            flush=True
+        )
+        log_backend_error(
+            f"Процесс {role.name} завершился",
+            description=f"Код завершения: {exitcode}, работал {uptime:.1f} сек, перезапуск через {role.backoff} сек"
+        )
+        role.backoff = min(role.backoff * 2, RESTART_BACKOFF_MAX_SECONDS)
+
+    def _relay(self, sender, event):
+        """Пересылает событие процесса остальным процессам"""
+        if isinstance(event, dict) and event.get("generation") is not None:
+            print(
+                f"📣 [SUPERVISOR] {sender.name}: {event.get('event')}, generation {event['generation']}",
+                flush=True
+            )
+        for role in self.roles:
+            if role is sender or role.conn is None:
+                continue
+            try:
+                role.conn.send(event)
+            except (OSError, EOFError):
+                pass
+
+    def _handle_signal(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        """Запускает процессы и следит за ними до SIGTERM/SIGINT (блокирующий вызов)"""
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        log_backend_info(
+            "Запуск процессов",
+            f"Процессы: {', '.join(role.name for role in self.roles)}"
+        )
+        for role in self.roles:
+            self._start(role)
+
+        while not self.stopping:
+            now = time.monotonic()
+            for role in self.roles:
+                if role.process is None and role.restart_at is not None and now >= role.restart_at:
+                    role.restarts += 1
+                    self._start(role)
+
+            waitables = {}
+            for role in self.roles:
+                if role.process is not None:
+                    waitables[role.process.sentinel] = (role, "exit")
+                    waitables[role.conn] = (role, "message")
+            pending = [role.restart_at - now for role in self.roles if role.restart_at is not None]
+            timeout = max(0.0, min([1.0] + pending))
+            for ready in multiprocessing.connection.wait(list(waitables), timeout=timeout):
+                role, kind = waitables[ready]
+                if role.process is None:
+                    continue
+                if kind == "message":
+                    try:
+                        event = role.conn.recv()
+                    except (OSError, EOFError):
+                        continue
+                    self._relay(role, event)
+                else:
+                    role.process.join()
+                    self._on_exit(role)
+
+        self.stop()
+
+    def stop(self):
+        """Останавливает все процессы (SIGTERM, через STOP_TIMEOUT_SECONDS - SIGKILL)"""
+        self.stopping = True
+        print("🛑 [SUPERVISOR] Остановка процессов...", flush=True)
+        running = [role for role in self.roles if role.process is not None]
+        for role in running:
+            if role.process.is_alive():
+                role.process.terminate()
+        deadline = time.monotonic() + STOP_TIMEOUT_SECONDS
+        for role in running:
+            role.process.join(max(0.0, deadline - time.monotonic()))
+            if role.process.is_alive():
+                print(f"⚠️ [SUPERVISOR] Процесс {role.name} не завершился, SIGKILL", flush=True)
+                role.process.kill()
+                role.process.join()
+            role.process = None
+        log_backend_info(
+            "Процессы остановлены",
+            ", ".join(f"{role.name}: перезапусков {role.restarts}" for role in self.roles)
+        )
+        print("✅ [SUPERVISOR] Все процессы остановлены", flush=True)
@@ -2,6 +2,10 @@
 """
 Запуск всего приложения: парсер + API сервер + Telegram бот
 Универсальный скрипт для Docker и локального запуска
+
+START_MODE=threads (по умолчанию) - парсер и бот в потоках, API в главном потоке
+START_MODE=processes - парсер, API и бот в отдельных процессах с
+перезапуском при падении (process_supervisor.py)
 """
 import sys
 import os
@@ -14,7 +18,7 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from backend.config import SERVER_HOST, SERVER_PORT
+from backend.config import SERVER_HOST, SERVER_PORT, START_MODE, API_WORKERS
 
 # Импортируем систему логирования
 parsing_path = project_root / "parsing"
@@ -23,21 +27,30 @@ if str(parsing_path) not in sys.path:
 from logger import log_backend_info, log_backend_error
 
 
-def run_parser():
-    """Запуск парсера в отдельном потоке"""
+def run_parser(channel=None):
+    """
+    Запуск парсера в отдельном потоке
+    
+    channel - канал к супервизору (START_MODE=processes): события
+    завершения парсинга отправляются остальным процессам
+    """
     try:
         parsing_path = project_root / "parsing"
         if str(parsing_path) not in sys.path:
             sys.path.insert(0, str(parsing_path))
         
         from main import main
+        if channel is not None:
+            channel.forward_events()
+            channel.listen()
+        where = "в отдельном процессе" if channel is not None else "в отдельном потоке"
         print("=" * 60, flush=True)
         print("📊 [PARSER] Парсер запущен", flush=True)
         print("📊 [PARSER] Обновление: раз в час (в 00 минут каждого часа)", flush=True)
         print("=" * 60, flush=True)
         log_backend_info(
             "Парсер запущен",
-            "Парсер запущен в отдельном потоке, обновление раз в час"
+            f"Парсер запущен {where}, обновление раз в час"
         )
         main()
     except Exception as e:
@@ -51,11 +64,23 @@ def run_parser():
         traceback.print_exc()
 
 
-def run_backend():
-    """Запуск FastAPI бэкенда"""
+def run_backend(channel=None):
+    """
+    Запуск FastAPI бэкенда
+    
+    channel - канал к супервизору (START_MODE=processes): события
+    завершения парсинга передаются подписчикам процесса API
+    """
     import uvicorn
     import signal
     
+    if channel is not None:
+        from ingest_events import subscribe
+        subscribe(lambda event: print(
+            f"📣 [API] Данные обновлены: generation {event.get('generation')}", flush=True
+        ))
+        channel.listen()
+    
     def signal_handler(sig, frame):
         """Обработчик сигнала для корректного завершения"""
         print("\n🛑 [API] Получен сигнал остановки сервера...", flush=True)
@@ -78,11 +103,17 @@ def run_backend():
         print(f"🌐 [API] Запуск FastAPI сервера", flush=True)
         print(f"🌐 [API] Адрес: http://{host}:{port}", flush=True)
         print(f"🌐 [API] Документация: http://{host}:{port}/docs", flush=True)
+        print(f"🌐 [API] Воркеров: {API_WORKERS}", flush=True)
         print("=" * 60, flush=True)
         
+        if API_WORKERS > 1:
+            # Токен создается до запуска воркеров - иначе каждый создал бы свой
+            from backend.utils.auth import init_auth
+            init_auth()
+        
         log_backend_info(
             f"Запуск API сервера",
-            f"Сервер запускается на {host}:{port}"
+            f"Сервер запускается на {host}:{port}, воркеров: {API_WORKERS}"
         )
         uvicorn.run(
             "backend.app:app",
@@ -90,7 +121,8 @@ def run_backend():
             port=port,
             reload=False,
             log_level="info",
-            access_log=True
+            access_log=True,
+            workers=API_WORKERS
         )
     except KeyboardInterrupt:
         log_backend_info(
@@ -109,9 +141,16 @@ def run_backend():
         traceback.print_exc()
 
 
-def run_telegram_bot():
-    """Запуск Telegram бота в отдельном потоке с собственным event loop"""
+def run_telegram_bot(channel=None):
+    """
+    Запуск Telegram бота в отдельном потоке с собственным event loop
+    
+    channel - канал к супервизору (START_MODE=processes)
+    """
     try:
+        if channel is not None:
+            channel.listen()
+        
         telegram_path = project_root / "telegram"
         if str(telegram_path) not in sys.path:
             sys.path.insert(0, str(telegram_path))
@@ -328,12 +367,27 @@ if __name__ == "__main__":
     print("=" * 60, flush=True)
     print("📋 [STARTUP] Конфигурация:", flush=True)
     print(f"   📊 Парсер: обновление раз в час (в 00 минут каждого часа)", flush=True)
-    print(f"   🌐 API сервер: http://{host}:{port}", flush=True)
+    print(f"   🌐 API сервер: http://{host}:{port} (воркеров: {API_WORKERS})", flush=True)
     print(f"   📚 Документация: http://{host}:{port}/docs", flush=True)
     print("   🤖 Telegram бот: запустится (если токен установлен)", flush=True)
+    print(f"   ⚙️  Режим запуска: {START_MODE}", flush=True)
     print("=" * 60, flush=True)
     print("", flush=True)
     
+    if START_MODE == "processes":
+        # Парсер, API и бот - отдельные процессы (парсинг не занимает GIL процесса API)
+        from process_supervisor import ProcessSupervisor
+        from telegram.config import BOT_TOKEN
+        
+        roles = {"parser": run_parser, "api": run_backend}
+        if BOT_TOKEN and BOT_TOKEN != "вставьте_свой_токен_сюда":
+            roles["bot"] = run_telegram_bot
+        else:
+            print("⚠️  [BOT] Telegram бот не запущен: токен не установлен", flush=True)
+        ProcessSupervisor(roles).run()
+        print("✅ Приложение остановлено")
+        sys.exit(0)
+    
     # Запускаем парсер в отдельном потоке (daemon=True - не блокирует завершение)
     parser_thread = Thread(target=run_parser, daemon=True, name="ParserThread")
     parser_thread.start()
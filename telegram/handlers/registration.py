@@ -4,11 +4,13 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 from aiogram.filters import StateFilter
 from datetime import datetime
+import asyncio
 
 from ..states import RegistrationStates
 from ..database import get_db, TelegramUser
-from ..keyboards import get_main_menu, get_confirm_fio_keyboard, get_main_menu_reply
+from ..keyboards import get_main_menu, get_confirm_fio_keyboard, get_main_menu_reply, get_fio_suggestions_keyboard
 from ..utils import safe_edit_message
+from ..utils.roster_matcher import match_fio, FIO_FOUND, FIO_SUGGEST, FIO_NOT_FOUND
 
 # Импортируем систему логирования
 import sys
@@ -63,12 +65,44 @@ async def process_full_name(message: Message, state: FSMContext):
         )
         return
     
-    # Сохраняем ФИО в состояние для подтверждения
+    # Проверяем ФИО по списку студентов (индекс в памяти, без запроса к БД на каждую попытку)
+    match = await asyncio.to_thread(match_fio, full_name)
+    
+    if match["status"] == FIO_SUGGEST:
+        # Точного совпадения нет - предлагаем похожие ФИО из списка
+        await state.update_data(full_name=full_name, suggestions=match["suggestions"])
+        await state.set_state(RegistrationStates.choosing_suggested_fio)
+        await message.answer(
+            f"🔍 ФИО <b>{full_name}</b> не найдено в списке студентов.\n\n"
+            f"Возможно, вы имели в виду:",
+            reply_markup=get_fio_suggestions_keyboard(match["suggestions"]),
+            parse_mode="HTML"
+        )
+        return
+    
+    if match["status"] == FIO_FOUND:
+        # Используем ФИО в том виде, в котором оно записано в журнале
+        full_name = match["fio"]
+        found_text = f"✅ Найдено в списке группы {match['group_name']}\n\n"
+    elif match["status"] == FIO_NOT_FOUND:
+        found_text = (
+            "⚠️ ФИО не найдено в списке студентов. Проверьте правильность ввода - "
+            "иначе оценки не будут найдены.\n\n"
+        )
+    else:
+        found_text = ""
+    
+    await _ask_fio_confirmation(message, state, full_name, found_text)
+
+
+async def _ask_fio_confirmation(message: Message, state: FSMContext, full_name: str, found_text: str = ""):
+    """Сохраняет ФИО в состояние и отправляет сообщение с подтверждением"""
     await state.update_data(full_name=full_name)
     await state.set_state(RegistrationStates.confirming_full_name)
     
     # Отправляем сообщение с подтверждением и inline кнопками
     confirm_text = (
+        f"{found_text}"
         f"📝 Проверьте введенные данные:\n\n"
         f"Ваше ФИО: <b>{full_name}</b>\n\n"
         f"Всё правильно?"
@@ -81,6 +115,46 @@ async def process_full_name(message: Message, state: FSMContext):
     )
 
 
+@router.callback_query(F.data.startswith("pick_fio:"), StateFilter(RegistrationStates.choosing_suggested_fio))
+async def pick_suggested_fio(callback: CallbackQuery, state: FSMContext):
+    """Выбор ФИО из подсказок"""
+    # Защита от спама
+    if not _check_throttle(callback.from_user.id):
+        await callback.answer("⏳ Подождите немного...", show_alert=False)
+        return
+    
+    data = await state.get_data()
+    suggestions = data.get("suggestions") or []
+    try:
+        full_name = suggestions[int(callback.data.split(":", 1)[1])]
+    except (ValueError, IndexError):
+        await callback.answer("❌ Вариант не найден, введите ФИО заново", show_alert=True)
+        await state.set_state(RegistrationStates.waiting_for_full_name)
+        return
+    
+    await callback.answer()
+    await _ask_fio_confirmation(callback.message, state, full_name, "✅ ФИО найдено в списке студентов\n\n")
+
+
+@router.callback_query(F.data == "keep_fio", StateFilter(RegistrationStates.choosing_suggested_fio))
+async def keep_entered_fio(callback: CallbackQuery, state: FSMContext):
+    """Оставить введенное ФИО без изменений (например, студента еще нет в журнале)"""
+    # Защита от спама
+    if not _check_throttle(callback.from_user.id):
+        await callback.answer("⏳ Подождите немного...", show_alert=False)
+        return
+    
+    data = await state.get_data()
+    full_name = data.get("full_name")
+    if not full_name:
+        await callback.answer("❌ Ошибка: данные не найдены", show_alert=True)
+        await state.set_state(RegistrationStates.waiting_for_full_name)
+        return
+    
+    await callback.answer()
+    await _ask_fio_confirmation(callback.message, state, full_name)
+
+
 @router.callback_query(F.data == "confirm_fio", StateFilter(RegistrationStates.confirming_full_name))
 async def confirm_fio(callback: CallbackQuery, state: FSMContext):
     """Подтверждение ФИО и завершение регистрации"""
@@ -164,7 +238,10 @@ async def confirm_fio(callback: CallbackQuery, state: FSMContext):
         await state.clear()
 
 
-@router.callback_query(F.data == "change_fio", StateFilter(RegistrationStates.confirming_full_name))
+@router.callback_query(
+    F.data == "change_fio",
+    StateFilter(RegistrationStates.confirming_full_name, RegistrationStates.choosing_suggested_fio)
+)
 async def change_fio(callback: CallbackQuery, state: FSMContext):
     """Изменение ФИО - возврат к вводу"""
     # Защита от спама
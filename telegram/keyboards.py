@@ -122,6 +122,19 @@ def get_confirm_fio_keyboard():
     return keyboard
 
 
+def get_fio_suggestions_keyboard(suggestions):
+    """Клавиатура выбора ФИО из подсказок (похожие ФИО из списка студентов)"""
+    rows = [
+        [InlineKeyboardButton(text=f"👤 {fio}", callback_data=f"pick_fio:{idx}")]
+        for idx, fio in enumerate(suggestions)
+    ]
+    rows.append([
+        InlineKeyboardButton(text="➡️ Оставить как есть", callback_data="keep_fio"),
+        InlineKeyboardButton(text="✏️ Изменить", callback_data="change_fio")
+    ])
+    return InlineKeyboardMarkup(inline_keyboard=rows)
+
+
 def get_settings_menu():
     """Меню настроек"""
     keyboard = InlineKeyboardMarkup(
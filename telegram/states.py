@@ -6,3 +6,4 @@ class RegistrationStates(StatesGroup):
     """Состояния процесса регистрации"""
     waiting_for_full_name = State()  # Ожидание ввода полного ФИО
     confirming_full_name = State()  # Подтверждение введенного ФИО
+    choosing_suggested_fio = State()  # Выбор ФИО из подсказок (ФИО не найдено в списке)
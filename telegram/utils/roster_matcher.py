@@ -0,0 +1,67 @@
+"""
+Проверка ФИО при регистрации по списку студентов
+
+Индекс студентов загружается в процессе бота один раз и перестраивается
+только после нового парсинга (см. parsing/roster_index.py), поэтому
+повторные попытки ввода ФИО не обращаются к БД.
+"""
+import sys
+from pathlib import Path
+
+# Добавляем путь к parsing для импорта индекса
+project_root = Path(__file__).parent.parent.parent
+parsing_path = project_root / "parsing"
+if str(parsing_path) not in sys.path:
+    sys.path.insert(0, str(parsing_path))
+
+from roster_index import get_roster_index
+
+# Статусы проверки ФИО
+FIO_FOUND = "found"  # ФИО есть в списке
+FIO_SUGGEST = "suggest"  # Точного совпадения нет, есть похожие ФИО
+FIO_NOT_FOUND = "not_found"  # Ничего похожего нет
+FIO_UNAVAILABLE = "unavailable"  # Список студентов пуст или недоступен
+
+
+def match_fio(full_name: str, limit: int = 3) -> dict:
+    """
+    Проверяет введенное ФИО по списку студентов
+
+    Args:
+        full_name: ФИО в любом формате ("Иванов Иван Иванович", "Иванов И.И.")
+        limit: Максимальное количество подсказок
+
+    Returns:
+        dict: {
+            "status": FIO_FOUND | FIO_SUGGEST | FIO_NOT_FOUND | FIO_UNAVAILABLE,
+            "fio": ФИО из списка (если найдено),
+            "group_name": группа (если найдено),
+            "suggestions": [ФИО из списка, ...]
+        }
+    """
+    result = {"status": FIO_UNAVAILABLE, "fio": None, "group_name": None, "suggestions": []}
+    try:
+        index = get_roster_index()
+    except Exception:
+        return result
+
+    if not len(index):
+        return result
+
+    exact = index.find_exact(full_name)
+    if exact:
+        result["status"] = FIO_FOUND
+        result["fio"] = exact[0]["fio"]
+        result["group_name"] = ", ".join(sorted({item["group_name"] for item in exact}))
+        return result
+
+    suggestions = []
+    for item in index.search(full_name, limit=limit * 3):
+        if item["fio"] not in suggestions:
+            suggestions.append(item["fio"])
+        if len(suggestions) >= limit:
+            break
+
+    result["status"] = FIO_SUGGEST if suggestions else FIO_NOT_FOUND
+    result["suggestions"] = suggestions
+    return result